@@ -0,0 +1,187 @@
+"""Running aggregates of a live run, updated with every committed batch.
+
+The group-commit writer folds each batch into the run's ``run_accumulators``
+row: per column the sample count, duration weight, weighted and plain sums,
+weighted sum of squares and maximum, plus a log-bucket histogram for the
+columns whose percentiles are reported. Histograms are mergeable (bucket weights add up) and every bucket
+spans a factor of ``HISTOGRAM_GAMMA``, so a quantile read from one is within
+``(HISTOGRAM_GAMMA - 1) / 2`` (1 %) of the true value.
+
+``GET /runs/{id}`` shows these as approximate stats while the run is going,
+and ``finish_run`` turns them into ``run_stats`` without reading the samples.
+Only runs of at most ``EXACT_STATS_MAX_SAMPLES`` samples, a few minutes at
+the default interval, are recomputed exactly from their samples instead.
+"""
+import math
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .metrics import sample_weights
+
+EXACT_STATS_MAX_SAMPLES = int(os.getenv("EXACT_STATS_MAX_SAMPLES", "5000"))
+HISTOGRAM_GAMMA = 1.02
+HISTOGRAM_MIN = 1e-3  # smaller values share the zero bucket
+ZERO_BUCKET = -(10**6)
+QUANTILE_COLUMNS = ("cpu_percent", "rss_mb", "pss_mb")
+
+_LOG_GAMMA = math.log(HISTOGRAM_GAMMA)
+
+
+def new_accumulator(run_id: int) -> models.RunAccumulator:
+    return models.RunAccumulator(run_id=run_id, sample_count=0, state={"columns": {}})
+
+
+def update_accumulators(db: Session, batches: Sequence[Tuple[int, Dict[str, np.ndarray]]]) -> None:
+    """Fold batches into their runs' accumulators, in the caller's transaction."""
+    by_run: Dict[int, list] = {}
+    for run_id, columns in batches:
+        by_run.setdefault(run_id, []).append(columns)
+    if not by_run:
+        return
+    accumulators = {
+        row.run_id: row
+        for row in db.scalars(
+            select(models.RunAccumulator)
+            .where(models.RunAccumulator.run_id.in_(by_run))
+            .with_for_update()
+        )
+    }
+    for run_id, column_sets in by_run.items():
+        accumulator = accumulators.get(run_id)
+        if accumulator is None:
+            # created with the run; a run without one started before accumulators
+            # existed and its aggregates would be partial
+            continue
+        for columns in column_sets:
+            fold_batch(accumulator, columns)
+
+
+def fold_batch(accumulator: models.RunAccumulator, columns: Dict[str, np.ndarray]) -> None:
+    order = np.argsort(columns["ts"], kind="stable")
+    ts = columns["ts"][order]
+    if not ts.size:
+        return
+    intervals = columns.get("interval_s", np.full(ts.size, np.nan))[order]
+    if accumulator.last_ts is not None:
+        # the gap to the previous batch stands in for a missing interval_s of the first sample
+        previous = accumulator.last_ts.timestamp()
+        weights = sample_weights(np.r_[previous, ts], np.r_[0.0, intervals])[1:]
+    else:
+        weights = sample_weights(ts, intervals)
+
+    state = {name: dict(values) for name, values in accumulator.state["columns"].items()}
+    for name, values in columns.items():
+        if name in ("ts", "interval_s"):
+            continue
+        values = values[order]
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        values, column_weights = values[present], weights[present]
+        entry = state.setdefault(
+            name, {"count": 0, "weight": 0.0, "weighted_sum": 0.0, "weighted_square_sum": 0.0, "sum": 0.0, "max": None}
+        )
+        entry["count"] += int(values.size)
+        entry["weight"] += float(column_weights.sum())
+        entry["weighted_sum"] += float((values * column_weights).sum())
+        entry["weighted_square_sum"] += float((values * values * column_weights).sum())
+        entry["sum"] += float(values.sum())
+        entry["max"] = max(float(values.max()), entry["max"]) if entry["max"] is not None else float(values.max())
+        if name in QUANTILE_COLUMNS:
+            histogram = dict(entry.get("histogram", {}))
+            buckets, inverse = np.unique(bucket_index(values), return_inverse=True)
+            for bucket, weight in zip(buckets.tolist(), np.bincount(inverse, weights=column_weights).tolist()):
+                histogram[str(bucket)] = histogram.get(str(bucket), 0.0) + weight
+            entry["histogram"] = histogram
+
+    accumulator.sample_count += int(ts.size)
+    first, last = (datetime.fromtimestamp(value, tz=timezone.utc) for value in (ts[0], ts[-1]))
+    accumulator.first_ts = min(first, accumulator.first_ts) if accumulator.first_ts else first
+    accumulator.last_ts = max(last, accumulator.last_ts) if accumulator.last_ts else last
+    # a new dict, so the JSON column is seen as changed
+    accumulator.state = {"columns": state}
+
+
+def bucket_index(values: np.ndarray) -> np.ndarray:
+    indexes = np.full(values.size, ZERO_BUCKET, dtype=np.int64)
+    positive = values >= HISTOGRAM_MIN
+    indexes[positive] = np.floor(np.log(values[positive]) / _LOG_GAMMA).astype(np.int64)
+    return indexes
+
+
+def histogram_quantile(histogram: Dict[str, float], q: float) -> Optional[float]:
+    """Weighted ``q``-th percentile from a histogram, as the middle of the bucket it falls in."""
+    if not histogram:
+        return None
+    buckets = np.array([int(bucket) for bucket in histogram])
+    weights = np.array(list(histogram.values()))
+    order = np.argsort(buckets)
+    buckets, cumulative = buckets[order], np.cumsum(weights[order])
+    bucket = int(buckets[min(np.searchsorted(cumulative, q / 100.0 * cumulative[-1]), buckets.size - 1)])
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    return 2 * HISTOGRAM_GAMMA ** (bucket + 1) / (HISTOGRAM_GAMMA + 1)
+
+
+def accumulated_stats(accumulator: models.RunAccumulator) -> Dict[str, Optional[float]]:
+    """``run_stats`` fields from the accumulator; duration is left to the caller."""
+    columns = accumulator.state["columns"]
+
+    def mean(name: str) -> Optional[float]:
+        entry = columns.get(name)
+        if entry is None:
+            return None
+        return entry["weighted_sum"] / entry["weight"] if entry["weight"] > 0 else entry["sum"] / entry["count"]
+
+    def maximum(name: str) -> Optional[float]:
+        return columns[name]["max"] if name in columns else None
+
+    def total(name: str) -> Optional[int]:
+        return int(round(columns[name]["sum"])) if name in columns else None
+
+    def percentile(name: str, q: float) -> Optional[float]:
+        if name not in columns:
+            return None
+        # the bucket midpoint may overshoot the largest value seen
+        return min(histogram_quantile(columns[name].get("histogram", {}), q), columns[name]["max"])
+
+    def stddev(name: str) -> Optional[float]:
+        entry = columns.get(name)
+        if entry is None or entry["weight"] <= 0:
+            return None
+        average = entry["weighted_sum"] / entry["weight"]
+        return math.sqrt(max(entry["weighted_square_sum"] / entry["weight"] - average * average, 0.0))
+
+    return {
+        "avg_cpu": mean("cpu_percent"),
+        "p50_cpu": percentile("cpu_percent", 50),
+        "p90_cpu": percentile("cpu_percent", 90),
+        "p95_cpu": percentile("cpu_percent", 95),
+        "p99_cpu": percentile("cpu_percent", 99),
+        "max_cpu": maximum("cpu_percent"),
+        "stddev_cpu": stddev("cpu_percent"),
+        "avg_rss_mb": mean("rss_mb"),
+        "p50_rss_mb": percentile("rss_mb", 50),
+        "p90_rss_mb": percentile("rss_mb", 90),
+        "p95_rss_mb": percentile("rss_mb", 95),
+        "p99_rss_mb": percentile("rss_mb", 99),
+        "max_rss_mb": maximum("rss_mb"),
+        "stddev_rss_mb": stddev("rss_mb"),
+        "total_read_bytes": total("read_bytes"),
+        "total_write_bytes": total("write_bytes"),
+        "total_ctx_switches_voluntary": total("ctx_switches_voluntary"),
+        "total_ctx_switches_involuntary": total("ctx_switches_involuntary"),
+        "max_threads": int(maximum("num_threads")) if "num_threads" in columns else None,
+        "max_fds": int(maximum("num_fds")) if "num_fds" in columns else None,
+        "avg_uss_mb": mean("uss_mb"),
+        "max_uss_mb": maximum("uss_mb"),
+        "avg_pss_mb": mean("pss_mb"),
+        "p95_pss_mb": percentile("pss_mb", 95),
+        "max_pss_mb": maximum("pss_mb"),
+    }
@@ -0,0 +1,217 @@
+"""Compressed columnar archive of finished runs' samples.
+
+A finished run's samples never change, so ``finish_run`` packs them into
+``run_sample_chunks`` rows and drops them from ``metric_samples``. Each chunk
+holds up to ``ARCHIVE_CHUNK_SAMPLES`` samples:
+
+* ``ts`` as int64 microseconds, delta-encoded (the first value is absolute),
+* counters as int64 with a packed null bitmap,
+* float metrics as int64 fixed-point (``value * FIXED_POINT_SCALE``) with a
+  null bitmap; the CLI rounds them to at most four decimals, so this is
+  lossless. A column that does not fit is stored as plain float64,
+
+every array byte-shuffled (all first bytes, then all second bytes, ...) so the
+slowly changing high bytes compress well, and the whole chunk zlib-compressed.
+Readers decode straight into NumPy arrays; most runs are a single row.
+"""
+import json
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Select, delete, exists, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .bulk import INTEGER_COLUMNS, SAMPLE_COLUMNS, merge_batches
+
+ARCHIVE_VERSION = 1
+ARCHIVE_CHUNK_SAMPLES = 65536
+ARCHIVE_COMPRESSION_LEVEL = 6
+FIXED_POINT_SCALE = 10_000
+HEADER_LENGTH = struct.Struct("<I")
+
+
+def encode_chunk(columns: Dict[str, np.ndarray]) -> bytes:
+    """Pack one chunk of float64 columns (NaN = missing, ``ts`` in epoch seconds)."""
+    count = len(columns["ts"])
+    layout: List[Tuple[str, str]] = []
+    parts: List[bytes] = []
+    for name, values in columns.items():
+        if name == "ts":
+            micros = np.round(values * 1_000_000).astype("<i8")
+            layout.append((name, "delta_i8"))
+            parts.append(_shuffle(np.diff(micros, prepend=np.int64(0)).astype("<i8")))
+            continue
+        missing = np.isnan(values)
+        values = np.where(missing, 0, values)
+        if name in INTEGER_COLUMNS:
+            layout.append((name, "i8"))
+        else:
+            scaled = np.round(values * FIXED_POINT_SCALE)
+            if not np.array_equal(scaled / FIXED_POINT_SCALE, values):
+                layout.append((name, "f8"))
+                parts.append(_shuffle(np.where(missing, np.nan, values).astype("<f8")))
+                continue
+            layout.append((name, "fixed_i8"))
+            values = scaled
+        parts.append(np.packbits(missing).tobytes())
+        parts.append(_shuffle(values.astype("<i8")))
+    header = json.dumps({"version": ARCHIVE_VERSION, "count": count, "columns": layout}, separators=(",", ":"))
+    encoded = header.encode("utf-8")
+    return zlib.compress(HEADER_LENGTH.pack(len(encoded)) + encoded + b"".join(parts), ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decode_chunk(payload: bytes) -> Dict[str, np.ndarray]:
+    data = memoryview(zlib.decompress(payload))
+    (length,) = HEADER_LENGTH.unpack_from(data, 0)
+    offset = HEADER_LENGTH.size + length
+    header = json.loads(bytes(data[HEADER_LENGTH.size : offset]))
+    if header.get("version") != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported sample chunk version: {header.get('version')}")
+    count = header["count"]
+    columns: Dict[str, np.ndarray] = {}
+    for name, kind in header["columns"]:
+        if kind == "delta_i8":
+            deltas, offset = _unshuffle(data, offset, "<i8", count)
+            columns[name] = np.cumsum(deltas) / 1_000_000
+        elif kind in ("i8", "fixed_i8"):
+            mask_size = (count + 7) // 8
+            missing = np.unpackbits(np.frombuffer(data, np.uint8, mask_size, offset), count=count).astype(bool)
+            values, offset = _unshuffle(data, offset + mask_size, "<i8", count)
+            values = values.astype(np.float64)
+            if kind == "fixed_i8":
+                values /= FIXED_POINT_SCALE
+            values[missing] = np.nan
+            columns[name] = values
+        elif kind == "f8":
+            columns[name], offset = _unshuffle(data, offset, "<f8", count)
+        else:
+            raise ValueError(f"Unknown sample chunk encoding: {kind}")
+    return columns
+
+
+def load_run_columns(
+    db: Session, run_id: int, start: Optional[float] = None, end: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """Samples of a run ordered by ``ts``, from its archive or from ``metric_samples``.
+
+    ``start``/``end`` (epoch seconds, inclusive) are applied in SQL: to the rows
+    of a live run, and to the chunk bounds of an archived one before the
+    decoded chunks are trimmed.
+    """
+    payloads = db.scalars(chunks_query(run_id, start, end)).all()
+    if payloads:
+        columns = merge_batches([(run_id, decode_chunk(payload)) for payload in payloads])[1]
+        return trim_columns(columns, start, end)
+
+    rows = db.execute(samples_query(run_id, start, end)).all()
+    if not rows:
+        return {name: np.empty(0) for name in SAMPLE_COLUMNS}
+    return columns_from_rows(rows)
+
+
+def chunks_query(run_id: int, start: Optional[float] = None, end: Optional[float] = None) -> Select:
+    """Payloads of the run's archive chunks that overlap ``[start, end]``, in order."""
+    chunks = models.RunSampleChunk
+    query = select(chunks.payload).where(chunks.run_id == run_id)
+    if start is not None:
+        query = query.where(chunks.last_ts >= datetime.fromtimestamp(start, tz=timezone.utc))
+    if end is not None:
+        query = query.where(chunks.first_ts <= datetime.fromtimestamp(end, tz=timezone.utc))
+    return query.order_by(chunks.chunk_index)
+
+
+def samples_query(run_id: int, start: Optional[float] = None, end: Optional[float] = None) -> Select:
+    """``SAMPLE_COLUMNS`` of the run's ``metric_samples`` rows within ``[start, end]``, ordered by ``ts``."""
+    table = models.MetricSample.__table__
+    query = select(*(table.c[name] for name in SAMPLE_COLUMNS)).where(table.c.run_id == run_id)
+    if start is not None:
+        query = query.where(table.c.ts >= datetime.fromtimestamp(start, tz=timezone.utc))
+    if end is not None:
+        query = query.where(table.c.ts <= datetime.fromtimestamp(end, tz=timezone.utc))
+    return query.order_by(table.c.ts)
+
+
+def columns_from_rows(rows: Sequence[Sequence]) -> Dict[str, np.ndarray]:
+    """Turn ``samples_query`` rows into float64 columns (NaN = missing, ``ts`` in epoch seconds)."""
+    values = list(zip(*rows))
+    columns = {"ts": np.array([ts.timestamp() for ts in values[0]])}
+    for name, column in zip(SAMPLE_COLUMNS[1:], values[1:]):
+        columns[name] = np.array(column, dtype=np.float64)
+    return columns
+
+
+def trim_columns(
+    columns: Dict[str, np.ndarray], start: Optional[float] = None, end: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    if start is None and end is None:
+        return columns
+    ts = columns["ts"]
+    inside = np.ones(ts.size, dtype=bool)
+    if start is not None:
+        inside &= ts >= start
+    if end is not None:
+        inside &= ts <= end
+    return {name: values[inside] for name, values in columns.items()}
+
+
+def archive_run(db: Session, run_id: int, columns: Optional[Dict[str, np.ndarray]] = None) -> int:
+    """Move a finished run's samples into ``run_sample_chunks``; returns the number archived.
+
+    ``columns`` saves reloading the samples when the caller already has them.
+    """
+    if db.scalar(select(exists().where(models.RunSampleChunk.run_id == run_id))):
+        return 0
+    if columns is None:
+        columns = load_run_columns(db, run_id)
+    count = store_chunks(db, run_id, columns)
+    if count:
+        db.execute(delete(models.MetricSample).where(models.MetricSample.run_id == run_id))
+    return count
+
+
+def store_chunks(db: Session, run_id: int, columns: Dict[str, np.ndarray]) -> int:
+    # columns that are missing everywhere are left out of the archive
+    columns = {name: values for name, values in columns.items() if name == "ts" or not np.isnan(values).all()}
+    count = len(columns["ts"])
+    db.add_all(
+        models.RunSampleChunk(
+            run_id=run_id,
+            chunk_index=index,
+            sample_count=min(ARCHIVE_CHUNK_SAMPLES, count - start),
+            first_ts=datetime.fromtimestamp(columns["ts"][start], tz=timezone.utc),
+            last_ts=datetime.fromtimestamp(columns["ts"][min(start + ARCHIVE_CHUNK_SAMPLES, count) - 1], tz=timezone.utc),
+            payload=encode_chunk({name: values[start : start + ARCHIVE_CHUNK_SAMPLES] for name, values in columns.items()}),
+        )
+        for index, start in enumerate(range(0, count, ARCHIVE_CHUNK_SAMPLES))
+    )
+    db.flush()
+    return count
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    return np.ascontiguousarray(values.view(np.uint8).reshape(-1, values.dtype.itemsize).T).tobytes()
+
+
+def _unshuffle(data: memoryview, offset: int, dtype: str, count: int) -> Tuple[np.ndarray, int]:
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(data, np.uint8, count * itemsize, offset).reshape(itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype).reshape(count), offset + count * itemsize
+
+
+if __name__ == "__main__":
+    # archive runs that finished before archiving existed
+    from .db import session_scope
+
+    with session_scope() as session:
+        finished = session.scalars(
+            select(models.TestRun.id)
+            .where(models.TestRun.status != "running")
+            .where(exists().where(models.MetricSample.run_id == models.TestRun.id))
+        ).all()
+    for finished_run_id in finished:
+        with session_scope() as session:
+            print(f"run {finished_run_id}: {archive_run(session, finished_run_id)} samples archived")
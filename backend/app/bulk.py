@@ -0,0 +1,223 @@
+"""Columnar validation and bulk writes for sample tables.
+
+Samples arrive as one array per column (the columnar ingest endpoint, ``.bpa``
+imports) and are written without building ORM objects: PostgreSQL gets a
+binary ``COPY``, other databases a single Core ``executemany``.
+"""
+import io
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+SAMPLE_COLUMNS = ("ts", "cpu_percent", "rss_mb", "interval_s") + models.EXTENDED_METRIC_COLUMNS
+REQUIRED_SAMPLE_COLUMNS = ("ts", "cpu_percent", "rss_mb")
+INTEGER_COLUMNS = {
+    name for name in SAMPLE_COLUMNS if isinstance(models.MetricSample.__table__.c[name].type, Integer)
+}
+
+# binary COPY framing, see "Binary Format" in the PostgreSQL COPY documentation
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+PG_EPOCH_OFFSET_US = 946_684_800 * 1_000_000  # 2000-01-01 in Unix microseconds
+
+
+def columns_from_lists(payload: Mapping[str, object], names: Iterable[str] = SAMPLE_COLUMNS) -> Dict[str, np.ndarray]:
+    """Turn ``{column: [values]}`` into float64 arrays; ``None`` becomes NaN, unknown keys are ignored."""
+    columns = {}
+    for name in names:
+        if name not in payload:
+            continue
+        values = payload[name]
+        if not isinstance(values, list):
+            raise ValueError(f"{name} must be a list")
+        try:
+            array = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"{name} must contain only numbers") from exc
+        if array.ndim != 1:
+            raise ValueError(f"{name} must be a flat list")
+        columns[name] = array
+    return columns
+
+
+def columns_to_lists(columns: Mapping[str, np.ndarray]) -> Dict[str, list]:
+    """The inverse of ``columns_from_lists``: NaN becomes ``None``, integer columns become ints."""
+    lists = {}
+    for name, values in columns.items():
+        missing = np.isnan(values)
+        converted = (np.where(missing, 0, values).astype(np.int64) if name in INTEGER_COLUMNS else values).astype(object)
+        converted[missing] = None
+        lists[name] = converted.tolist()
+    return lists
+
+
+def validate_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Check a column set in one pass per column; raises ``ValueError``.
+
+    Returns float64 arrays (NaN = missing) with integer columns rounded and
+    columns that are missing everywhere left out.
+    """
+    if any(name not in columns for name in REQUIRED_SAMPLE_COLUMNS):
+        raise ValueError("ts, cpu_percent and rss_mb are required")
+    count = len(columns["ts"])
+    validated = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != count:
+            raise ValueError(f"{name} has {len(values)} values, expected {count}")
+        missing = np.isnan(values)
+        if name in REQUIRED_SAMPLE_COLUMNS and missing.any():
+            raise ValueError(f"{name} has missing values")
+        present = values[~missing]
+        if not np.isfinite(present).all() or (present < 0).any():
+            raise ValueError(f"{name} values must be finite and non-negative")
+        if missing.all() and count:
+            continue
+        validated[name] = np.round(values) if name in INTEGER_COLUMNS else values
+    return validated
+
+
+def insert_samples(db: Session, run_id: int, columns: Dict[str, np.ndarray]) -> int:
+    """Write validated columns for one run inside the session's transaction."""
+    return insert_sample_batches(db, [(run_id, columns)])
+
+
+def insert_sample_batches(db: Session, batches: Sequence[Tuple[int, Dict[str, np.ndarray]]]) -> int:
+    """Write validated column sets of any number of runs with a single statement."""
+    run_ids, columns = merge_batches(batches)
+    if not len(run_ids):
+        return 0
+    connection = db.connection()
+    if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+        _copy_samples(connection, run_ids, columns)
+    else:
+        connection.execute(insert(models.MetricSample), sample_rows(run_ids, columns))
+    return len(run_ids)
+
+
+def merge_batches(batches: Sequence[Tuple[int, Dict[str, np.ndarray]]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Concatenate column sets; a column missing from one batch is NaN for its rows."""
+    names = [name for name in SAMPLE_COLUMNS if any(name in columns for _, columns in batches)]
+    counts = [len(columns["ts"]) for _, columns in batches]
+    run_ids = np.repeat(np.array([run_id for run_id, _ in batches], dtype=np.int32), counts)
+    merged = {
+        name: np.concatenate([columns.get(name, np.full(count, np.nan)) for (_, columns), count in zip(batches, counts)])
+        for name in names
+    }
+    return run_ids, merged
+
+
+def sample_rows(run_ids: np.ndarray, columns: Dict[str, np.ndarray]) -> List[Dict[str, object]]:
+    rows: Dict[str, list] = {"run_id": run_ids.tolist()}
+    rows["ts"] = [datetime.fromtimestamp(value, tz=timezone.utc) for value in columns["ts"].tolist()]
+    for name, values in columns.items():
+        if name == "ts":
+            continue
+        missing = np.isnan(values)
+        if name in INTEGER_COLUMNS:
+            values = np.where(missing, 0, values).astype(np.int64)
+        converted = values.astype(object)
+        converted[missing] = None
+        rows[name] = converted.tolist()
+    return [dict(zip(rows, values)) for values in zip(*rows.values())]
+
+
+def store_process_samples(db: Session, run_id: int, breakdown: List[Tuple[float, schemas.ProcessSampleIn]]) -> None:
+    """Store the per-process breakdown; names live once per run in ``run_processes``."""
+    if not breakdown:
+        return
+
+    identities = {(process.pid, process.cmdline_hash): process.name for _, process in breakdown}
+    known: Dict[Tuple[int, str], int] = {
+        (row.pid, row.cmdline_hash): row.id
+        for row in db.query(models.RunProcess).filter(
+            models.RunProcess.run_id == run_id,
+            models.RunProcess.pid.in_({pid for pid, _ in identities}),
+        )
+    }
+    missing = [
+        models.RunProcess(run_id=run_id, pid=pid, cmdline_hash=digest, name=name)
+        for (pid, digest), name in identities.items()
+        if (pid, digest) not in known
+    ]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        known.update({(row.pid, row.cmdline_hash): row.id for row in missing})
+
+    db.bulk_insert_mappings(
+        models.ProcessSample,
+        [
+            {
+                "process_id": known[(process.pid, process.cmdline_hash)],
+                "ts": datetime.fromtimestamp(ts, tz=timezone.utc),
+                "cpu_percent": process.cpu_percent,
+                "rss_mb": process.rss_mb,
+            }
+            for ts, process in breakdown
+        ],
+    )
+
+
+def encode_copy(run_ids: np.ndarray, columns: Dict[str, np.ndarray]) -> bytes:
+    """Encode rows as a binary ``COPY`` stream for ``("run_id", *columns)``.
+
+    Rows are grouped by which columns are NULL, so every group is a fixed-width
+    NumPy record array and no Python loop runs per row.
+    """
+    names = list(columns)
+    nulls = np.column_stack([np.isnan(columns[name]) for name in names])
+    patterns, groups = np.unique(nulls, axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+    parts = [COPY_SIGNATURE]
+    for index, pattern in enumerate(patterns):
+        rows = np.flatnonzero(groups == index)
+        fields = [("count", ">i2"), ("run_id_len", ">i4"), ("run_id", ">i4")]
+        for name, is_null in zip(names, pattern):
+            fields.append((f"{name}_len", ">i4"))
+            if not is_null:
+                fields.append((name, _copy_dtype(name)))
+        records = np.empty(len(rows), dtype=fields)
+        records["count"] = len(names) + 1
+        records["run_id_len"] = 4
+        records["run_id"] = run_ids[rows]
+        for name, is_null in zip(names, pattern):
+            if is_null:
+                records[f"{name}_len"] = -1
+                continue
+            values = columns[name][rows]
+            if name == "ts":
+                values = np.round(values * 1_000_000) - PG_EPOCH_OFFSET_US
+            records[f"{name}_len"] = np.dtype(_copy_dtype(name)).itemsize
+            records[name] = values
+        parts.append(records.tobytes())
+    parts.append(COPY_TRAILER)
+    return b"".join(parts)
+
+
+def _copy_samples(connection, run_ids: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+    statement = (
+        f"COPY {models.MetricSample.__tablename__} (run_id, {', '.join(columns)}) FROM STDIN WITH (FORMAT binary)"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, io.BytesIO(encode_copy(run_ids, columns)))
+    finally:
+        cursor.close()
+
+
+def _copy_dtype(name: str) -> str:
+    if name == "ts":
+        return ">i8"  # timestamptz: microseconds since 2000-01-01 UTC
+    column_type = models.MetricSample.__table__.c[name].type
+    if isinstance(column_type, BigInteger):
+        return ">i8"
+    if isinstance(column_type, Integer):
+        return ">i4"
+    return ">f8"
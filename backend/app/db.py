@@ -2,14 +2,43 @@ import os
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/perf_local")
+# the API routes use asyncpg; migrations, the ingest writer and imports stay on the sync driver
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(
+    drivername="postgresql+asyncpg"
+).render_as_string(hide_password=False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# the sync pool serves threadpool work (sample reads, run close) and the ingest writer;
+# both pools together stay under PostgreSQL's default max_connections of 100
+SYNC_DB_POOL_SIZE = int(os.getenv("SYNC_DB_POOL_SIZE", "10"))
+SYNC_DB_MAX_OVERFLOW = int(os.getenv("SYNC_DB_MAX_OVERFLOW", "20"))
 
-engine = create_engine(DATABASE_URL, future=True, pool_pre_ping=True)
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    pool_pre_ping=True,
+    pool_size=SYNC_DB_POOL_SIZE,
+    max_overflow=SYNC_DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -21,6 +50,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @contextmanager
 def session_scope():
     session = SessionLocal()
@@ -0,0 +1,198 @@
+"""Group-commit writer for live sample batches.
+
+Request handlers hand validated batches to one background thread, which
+merges batches from every run that arrive within ``INGEST_FLUSH_MS`` (or
+until ``INGEST_MAX_ROWS`` rows are queued) into a single transaction. A
+request is acknowledged only once the transaction holding its batch has
+committed, so hundreds of CLIs sending small batches cost Postgres one
+commit per flush instead of one per request.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .accumulators import update_accumulators
+from .bulk import insert_sample_batches, store_process_samples
+from .db import SessionLocal
+
+INGEST_FLUSH_MS = int(os.getenv("INGEST_FLUSH_MS", "10"))
+INGEST_MAX_ROWS = int(os.getenv("INGEST_MAX_ROWS", "50000"))
+INGEST_WAIT_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class RunNotFound(LookupError):
+    pass
+
+
+class RunNotRunning(ValueError):
+    pass
+
+
+class IngestBatch(NamedTuple):
+    run_id: int
+    columns: Dict[str, np.ndarray]
+    breakdown: List[Tuple[float, schemas.ProcessSampleIn]]
+    future: Future
+
+
+class GroupCommitWriter:
+    _STOP = object()
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = INGEST_FLUSH_MS / 1000,
+        max_rows: int = INGEST_MAX_ROWS,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Set[Future]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        run_id: int,
+        columns: Dict[str, np.ndarray],
+        breakdown: List[Tuple[float, schemas.ProcessSampleIn]],
+    ) -> Future:
+        """Queue a validated batch; the future resolves to the row count once committed.
+
+        Cancelling the future withdraws the batch if the writer has not taken
+        it into a transaction yet; ``cancel()`` returns ``False`` once it has.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+                self._thread.start()
+            self._pending.setdefault(run_id, set()).add(future)
+        future.add_done_callback(lambda done: self._forget(run_id, done))
+        self._queue.put(IngestBatch(run_id, columns, breakdown, future))
+        return future
+
+    async def drain(self, run_id: int, timeout: float = INGEST_WAIT_SECONDS) -> None:
+        """Wait until every batch of ``run_id`` queued so far has been written or rejected."""
+        with self._lock:
+            pending = list(self._pending.get(run_id, ()))
+        if pending:
+            await asyncio.wait([asyncio.wrap_future(future) for future in pending], timeout=timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+
+    def _forget(self, run_id: int, future: Future) -> None:
+        with self._lock:
+            pending = self._pending.get(run_id)
+            if pending is not None:
+                pending.discard(future)
+                if not pending:
+                    del self._pending[run_id]
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            batches = [item]
+            rows = len(item.columns["ts"])
+            deadline = time.monotonic() + self.flush_interval
+            while rows < self.max_rows:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batches.append(item)
+                rows += len(item.columns["ts"])
+            self._flush(self._claim(batches))
+        # batches queued behind the stop marker are still written
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                leftovers.append(item)
+        leftovers = self._claim(leftovers)
+        if leftovers:
+            self._flush(leftovers)
+
+    @staticmethod
+    def _claim(batches: List[IngestBatch]) -> List[IngestBatch]:
+        """Drop batches whose request gave up waiting; the rest can no longer be withdrawn."""
+        return [batch for batch in batches if batch.future.set_running_or_notify_cancel()]
+
+    def _flush(self, batches: List[IngestBatch]) -> None:
+        if not batches:
+            return
+        try:
+            accepted, rejected = self._write(batches)
+        except Exception:
+            if len(batches) == 1:
+                logger.exception("Sample batch for run %s could not be written", batches[0].run_id)
+                batches[0].future.set_exception(RuntimeError("Samples could not be stored"))
+                return
+            # isolate the failing batch so it does not take the others down with it
+            for batch in batches:
+                self._flush([batch])
+            return
+        for batch in accepted:
+            batch.future.set_result(len(batch.columns["ts"]))
+        for batch, error in rejected:
+            batch.future.set_exception(error)
+
+    def _write(self, batches: List[IngestBatch]) -> Tuple[List[IngestBatch], List[Tuple[IngestBatch, Exception]]]:
+        session = self.session_factory()
+        try:
+            # FOR SHARE keeps finish_run from closing a run while its samples are being written
+            statuses = dict(
+                session.query(models.TestRun.id, models.TestRun.status)
+                .filter(models.TestRun.id.in_({batch.run_id for batch in batches}))
+                .with_for_update(read=True)
+                .all()
+            )
+            accepted, rejected = [], []
+            for batch in batches:
+                status = statuses.get(batch.run_id)
+                if status is None:
+                    rejected.append((batch, RunNotFound("Run not found")))
+                elif status != "running":
+                    rejected.append((batch, RunNotRunning("Cannot add samples to a finished run")))
+                else:
+                    accepted.append(batch)
+            insert_sample_batches(session, [(batch.run_id, batch.columns) for batch in accepted])
+            update_accumulators(session, [(batch.run_id, batch.columns) for batch in accepted])
+            for batch in accepted:
+                store_process_samples(session, batch.run_id, batch.breakdown)
+            session.commit()
+            return accepted, rejected
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+writer = GroupCommitWriter()
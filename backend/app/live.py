@@ -0,0 +1,79 @@
+"""In-process fan-out of freshly committed samples to live viewers.
+
+``store_batch`` publishes every batch once the group-commit writer has
+committed it; ``GET /runs/{id}/live`` subscribers each get a bounded queue of
+ready-to-send Server-Sent Events. A batch is encoded once, however many
+viewers the run has, and nobody polls the database. A viewer that falls
+``LIVE_QUEUE_SIZE`` events behind is disconnected; ``EventSource`` reconnects
+on its own.
+
+The hub lives in the API process: with several workers, a viewer only sees
+the batches ingested by the worker serving its stream.
+"""
+import asyncio
+import json
+import os
+from typing import Dict, Mapping, Optional, Set
+
+import numpy as np
+
+from .bulk import columns_to_lists
+
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_KEEPALIVE_SECONDS = 15.0
+
+
+class LiveHub:
+    """Per-run subscriber queues; only used from the event loop thread."""
+
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set["asyncio.Queue[Optional[str]]"]] = {}
+
+    def subscribe(self, run_id: int) -> "asyncio.Queue[Optional[str]]":
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(run_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, run_id: int, queue: "asyncio.Queue[Optional[str]]") -> None:
+        subscribers = self._subscribers.get(run_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[run_id]
+
+    def publish_samples(self, run_id: int, columns: Mapping[str, np.ndarray]) -> None:
+        if run_id in self._subscribers:
+            self.publish(run_id, "samples", columns_to_lists(columns))
+
+    def publish(self, run_id: int, event: str, data: object) -> None:
+        subscribers = self._subscribers.get(run_id)
+        if not subscribers:
+            return
+        message = format_event(event, data)
+        for queue in list(subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # too slow to keep up: drop what it has not read and end its stream
+                self._disconnect(run_id, queue)
+
+    def close(self, run_id: int, event: str, data: object) -> None:
+        """Send a last event to every viewer of the run and end their streams."""
+        self.publish(run_id, event, data)
+        for queue in list(self._subscribers.get(run_id, ())):
+            self._disconnect(run_id, queue)
+
+    def _disconnect(self, run_id: int, queue: "asyncio.Queue[Optional[str]]") -> None:
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+        queue.put_nowait(None)
+        self.unsubscribe(run_id, queue)
+
+
+def format_event(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+hub = LiveHub()
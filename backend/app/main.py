@@ -1,7 +1,10 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import runs, samples, stats
+from . import ingest, partitions
+from .routers import benchmarks, phases, runs, samples, stats
 
 app = FastAPI(title="Bizim Performans Aracı API")
 
@@ -15,9 +18,26 @@ app.add_middleware(
 
 app.include_router(runs.router)
 app.include_router(samples.router)
+app.include_router(phases.router)
 app.include_router(stats.router)
+app.include_router(benchmarks.router)
+
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    app.state.partition_task = asyncio.create_task(partitions.maintain_forever())
+
+
+@app.on_event("shutdown")
+def stop_ingest_writer():
+    ingest.writer.stop()
+
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    app.state.partition_task.cancel()
 
 
 @app.get("/health")
-def healthcheck():
+async def healthcheck():
     return {"status": "ok"}
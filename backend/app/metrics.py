@@ -0,0 +1,108 @@
+"""NumPy helpers for duration-weighted sample statistics and run-to-run summaries."""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def sample_weights(timestamps: Sequence[float], intervals: Sequence[Optional[float]]) -> np.ndarray:
+    """Seconds each sample stands for.
+
+    Samples sent with ``interval_s`` use it; older samples fall back to the gap
+    since the previous sample (the median gap for the first one).
+    """
+    ts = np.asarray(timestamps, dtype=float)
+    weights = np.array(intervals, dtype=float)  # None -> NaN
+    missing = np.isnan(weights)
+    if missing.any():
+        gaps = np.diff(ts, prepend=np.nan)
+        fallback = float(np.nanmedian(gaps)) if ts.size > 1 and not np.isnan(gaps[1:]).all() else 1.0
+        gaps[np.isnan(gaps) | (gaps <= 0)] = fallback
+        weights[missing] = gaps[missing]
+    weights = np.clip(weights, 0.0, None)
+    if weights.size and weights.sum() <= 0:
+        weights = np.ones_like(weights)
+    return weights
+
+
+def weighted_mean(values: np.ndarray, weights: np.ndarray) -> float:
+    return float(np.average(values, weights=weights))
+
+
+def weighted_std(values: np.ndarray, weights: np.ndarray) -> float:
+    mean = np.average(values, weights=weights)
+    return float(np.sqrt(np.average((values - mean) ** 2, weights=weights)))
+
+
+def weighted_percentile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """Percentile where each value counts for its weight; equal weights give the usual result."""
+    if values.size == 1:
+        return float(values[0])
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    sorted_weights = weights[order]
+    cumulative = np.cumsum(sorted_weights)
+    # centre of each value's weight on the [0, 1] scale, as in Hazen's plotting positions
+    positions = (cumulative - sorted_weights / 2) / cumulative[-1]
+    return float(np.interp(q / 100.0, positions, sorted_values))
+
+
+def bootstrap_ci(
+    values: np.ndarray,
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    seed: int = 0,
+) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval of the mean.
+
+    The generator is seeded so the same runs always give the same interval.
+    """
+    if values.size == 1:
+        return float(values[0]), float(values[0])
+    rng = np.random.default_rng(seed)
+    means = values[rng.integers(0, values.size, size=(resamples, values.size))].mean(axis=1)
+    tail = (1.0 - confidence) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def lttb_indices(x: np.ndarray, series: Sequence[np.ndarray], max_points: int) -> np.ndarray:
+    """Indices of ``max_points`` samples picked by Largest-Triangle-Three-Buckets.
+
+    LTTB keeps the first and last sample and, from every bucket in between,
+    the one forming the largest triangle with the previously kept sample and
+    the next bucket's average, so spikes survive where striding drops them.
+    Each series is scaled to [0, 1] and the areas are summed, so a spike in any
+    of them is kept.
+    """
+    count = x.size
+    if max_points < 3 or count <= max_points:
+        return np.arange(count)
+    xs = x - x[0]
+    if xs[-1] > 0:
+        xs = xs / xs[-1]
+    scaled = []
+    for values in series:
+        span = np.ptp(values)
+        scaled.append((values - values.min()) / span if span > 0 else np.zeros(count))
+    ys = np.column_stack(scaled)
+
+    # max_points - 2 buckets between the first and the last sample
+    edges = np.linspace(1, count - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < edges.size:
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = count - 1, count
+        next_x = xs[next_start:next_end].mean()
+        next_y = ys[next_start:next_end].mean(axis=0)
+        areas = np.abs(
+            (xs[previous] - next_x) * (ys[start:end] - ys[previous])
+            - (xs[previous] - xs[start:end, None]) * (next_y - ys[previous])
+        ).sum(axis=1)
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
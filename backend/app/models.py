@@ -1,23 +1,47 @@
-from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from sqlalchemy.sql import func
 
 from .db import Base
 
+# optional per-sample metrics collected with ``--extended-metrics``
+EXTENDED_METRIC_COLUMNS = (
+    "read_bytes",
+    "write_bytes",
+    "ctx_switches_voluntary",
+    "ctx_switches_involuntary",
+    "num_threads",
+    "num_fds",
+    "uss_mb",
+    "pss_mb",
+    "memory_current_mb",
+)
+
 
 class TestRun(Base):
     __tablename__ = "test_runs"
+    __table_args__ = (
+        # keyset pagination of the run list, with and without a status filter
+        Index("ix_test_runs_started_at_id", "started_at", "id"),
+        Index("ix_test_runs_status_started_at_id", "status", "started_at", "id"),
+        # latest finished run of a status (the "latest-success" baseline)
+        Index("ix_test_runs_status_ended_at", "status", "ended_at"),
+        # command substring and prefix filters (needs pg_trgm)
+        Index("ix_test_runs_command_trgm", "command", postgresql_using="gin", postgresql_ops={"command": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     command = Column(Text, nullable=False)
-    started_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     ended_at = Column(DateTime(timezone=True), nullable=True)
     status = Column(String, nullable=False, default="running")
     exit_code = Column(Integer, nullable=True)
     baseline_run_id = Column(Integer, ForeignKey("test_runs.id"), nullable=True)
+    benchmark_id = Column(Integer, ForeignKey("benchmarks.id", ondelete="SET NULL"), nullable=True, index=True)
 
     baseline_run = relationship("TestRun", remote_side=[id], uselist=False)
+    benchmark = relationship("Benchmark", back_populates="runs")
     samples = relationship(
         "MetricSample",
         back_populates="run",
@@ -31,20 +55,136 @@ class TestRun(Base):
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
+    accumulator = relationship(
+        "RunAccumulator",
+        back_populates="run",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    sample_chunks = relationship(
+        "RunSampleChunk",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    sample_rollups = relationship(
+        "RunSampleRollup",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    processes = relationship(
+        "RunProcess",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    phases = relationship(
+        "RunPhase",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="RunPhase.started_at",
+    )
 
 
 class MetricSample(Base):
     __tablename__ = "metric_samples"
+    # monthly range partitions on ts, created by app/partitions.py
+    __table_args__ = (
+        Index("ix_metric_samples_run_id_ts", "run_id", "ts"),
+        Index("ix_metric_samples_ts_brin", "ts", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
 
-    id = Column(BigInteger, primary_key=True)
-    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False, index=True)
-    ts = Column(DateTime(timezone=True), nullable=False)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False)
+    ts = Column(DateTime(timezone=True), primary_key=True, nullable=False)
     cpu_percent = Column(Float, nullable=False)
     rss_mb = Column(Float, nullable=False)
+    interval_s = Column(Float, nullable=True)
+    read_bytes = Column(BigInteger, nullable=True)
+    write_bytes = Column(BigInteger, nullable=True)
+    ctx_switches_voluntary = Column(BigInteger, nullable=True)
+    ctx_switches_involuntary = Column(BigInteger, nullable=True)
+    num_threads = Column(Integer, nullable=True)
+    num_fds = Column(Integer, nullable=True)
+    uss_mb = Column(Float, nullable=True)
+    pss_mb = Column(Float, nullable=True)
+    memory_current_mb = Column(Float, nullable=True)
 
     run = relationship("TestRun", back_populates="samples")
 
 
+class RunSampleChunk(Base):
+    """Compressed columnar block of a finished run's samples (see ``app/archive.py``)."""
+
+    __tablename__ = "run_sample_chunks"
+    __table_args__ = (UniqueConstraint("run_id", "chunk_index", name="uq_run_sample_chunks_run_chunk"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    first_ts = Column(DateTime(timezone=True), nullable=False)
+    last_ts = Column(DateTime(timezone=True), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
+    run = relationship("TestRun", back_populates="sample_chunks")
+
+
+class RunSampleRollup(Base):
+    """CPU/RSS summary of a finished run's samples over one time bucket (see ``app/rollups.py``)."""
+
+    __tablename__ = "run_sample_rollups"
+
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), primary_key=True)
+    resolution_s = Column(Integer, primary_key=True)
+    bucket_ts = Column(DateTime(timezone=True), primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+    cpu_min = Column(Float, nullable=False)
+    cpu_max = Column(Float, nullable=False)
+    cpu_avg = Column(Float, nullable=False)
+    rss_min = Column(Float, nullable=False)
+    rss_max = Column(Float, nullable=False)
+    rss_avg = Column(Float, nullable=False)
+
+    run = relationship("TestRun", back_populates="sample_rollups")
+
+
+class RunProcess(Base):
+    __tablename__ = "run_processes"
+    __table_args__ = (UniqueConstraint("run_id", "pid", "cmdline_hash", name="uq_run_processes_identity"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    pid = Column(Integer, nullable=False)
+    name = Column(Text, nullable=False)
+    cmdline_hash = Column(String(16), nullable=False)
+
+    run = relationship("TestRun", back_populates="processes")
+    samples = relationship(
+        "ProcessSample",
+        back_populates="process",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class ProcessSample(Base):
+    __tablename__ = "process_samples"
+    __table_args__ = (Index("ix_process_samples_process_id_ts", "process_id", "ts"),)
+
+    id = Column(BigInteger, primary_key=True)
+    process_id = Column(Integer, ForeignKey("run_processes.id", ondelete="CASCADE"), nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False)
+    cpu_percent = Column(Float(precision=24), nullable=False)
+    rss_mb = Column(Float(precision=24), nullable=False)
+
+    process = relationship("RunProcess", back_populates="samples")
+
+
 class RunStats(Base):
     __tablename__ = "run_stats"
 
@@ -55,5 +195,83 @@ class RunStats(Base):
     avg_rss_mb = Column(Float, nullable=True)
     p95_rss_mb = Column(Float, nullable=True)
     duration_s = Column(Float, nullable=True)
+    p50_cpu = Column(Float, nullable=True)
+    p90_cpu = Column(Float, nullable=True)
+    p99_cpu = Column(Float, nullable=True)
+    stddev_cpu = Column(Float, nullable=True)
+    max_rss_mb = Column(Float, nullable=True)
+    p50_rss_mb = Column(Float, nullable=True)
+    p90_rss_mb = Column(Float, nullable=True)
+    p99_rss_mb = Column(Float, nullable=True)
+    stddev_rss_mb = Column(Float, nullable=True)
+    total_read_bytes = Column(BigInteger, nullable=True)
+    total_write_bytes = Column(BigInteger, nullable=True)
+    total_ctx_switches_voluntary = Column(BigInteger, nullable=True)
+    total_ctx_switches_involuntary = Column(BigInteger, nullable=True)
+    max_threads = Column(Integer, nullable=True)
+    max_fds = Column(Integer, nullable=True)
+    avg_uss_mb = Column(Float, nullable=True)
+    max_uss_mb = Column(Float, nullable=True)
+    avg_pss_mb = Column(Float, nullable=True)
+    p95_pss_mb = Column(Float, nullable=True)
+    max_pss_mb = Column(Float, nullable=True)
+    # exact cgroup totals reported by the CLI at finish
+    cpu_time_s = Column(Float, nullable=True)
+    peak_memory_mb = Column(Float, nullable=True)
 
     run = relationship("TestRun", back_populates="stats")
+
+
+class RunAccumulator(Base):
+    """Running aggregates of a live run's samples (see ``app/accumulators.py``)."""
+
+    __tablename__ = "run_accumulators"
+
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), primary_key=True)
+    sample_count = Column(BigInteger, nullable=False)
+    first_ts = Column(DateTime(timezone=True), nullable=True)
+    last_ts = Column(DateTime(timezone=True), nullable=True)
+    # {"columns": {name: {"count", "weight", "weighted_sum", "weighted_square_sum", "sum", "max"[, "histogram"]}}}
+    state = Column(JSON, nullable=False)
+
+    run = relationship("TestRun", back_populates="accumulator")
+
+
+class RunPhase(Base):
+    """A named step of a run reported by the monitored command, with its own stats."""
+
+    __tablename__ = "run_phases"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(Text, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=False)
+    # filled in when the run finishes
+    sample_count = Column(Integer, nullable=True)
+    avg_cpu = Column(Float, nullable=True)
+    p95_cpu = Column(Float, nullable=True)
+    max_cpu = Column(Float, nullable=True)
+    avg_rss_mb = Column(Float, nullable=True)
+    p95_rss_mb = Column(Float, nullable=True)
+    max_rss_mb = Column(Float, nullable=True)
+
+    run = relationship("TestRun", back_populates="phases")
+
+    @property
+    def duration_s(self) -> float:
+        return (self.ended_at - self.started_at).total_seconds()
+
+
+class Benchmark(Base):
+    """A group of repeated runs of one command, summarised across iterations."""
+
+    __tablename__ = "benchmarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    command = Column(Text, nullable=False)
+    iterations = Column(Integer, nullable=False)
+    warmup = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    runs = relationship("TestRun", back_populates="benchmark", order_by="TestRun.id")
@@ -0,0 +1,133 @@
+"""Monthly range partitions of ``metric_samples``.
+
+``metric_samples`` is partitioned by ``ts`` (migration ``e7b2c5a9d314``).
+Partitions are created a few months ahead so live inserts never wait on DDL;
+rows that fall outside every partition (clock skew, old ``.bpa`` imports) land
+in ``metric_samples_default`` and are moved out when their month's partition
+is created. Run ``python -m app.partitions`` from cron when the API is not
+running continuously.
+"""
+import asyncio
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from starlette.concurrency import run_in_threadpool
+
+from .db import engine
+
+SAMPLES_TABLE = "metric_samples"
+DEFAULT_PARTITION = "metric_samples_default"
+MONTHLY_PARTITION = re.compile(rf"{SAMPLES_TABLE}_p\d{{6}}")
+PARTITION_MONTHS_AHEAD = int(os.getenv("SAMPLE_PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_CHECK_SECONDS = 6 * 60 * 60
+# serialises partition DDL between API workers
+PARTITION_LOCK_ID = 0x6270615F70617274
+
+logger = logging.getLogger(__name__)
+
+
+def partition_name(month: date) -> str:
+    return f"{SAMPLES_TABLE}_p{month:%Y%m}"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_sample_partitions(
+    connection: Connection,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Create the partitions for this month and ``months_ahead`` more; returns the new ones."""
+    if connection.dialect.name != "postgresql" or not is_partitioned(connection):
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": PARTITION_LOCK_ID})
+    today = today or datetime.now(timezone.utc).date()
+    first = date(today.year, today.month, 1)
+    existing = {
+        row[0]
+        for row in connection.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:parent AS regclass)"
+            ),
+            {"parent": SAMPLES_TABLE},
+        )
+    }
+    # months before the first monthly partition belong to the partition the
+    # migration made out of the pre-partitioning table
+    monthly = sorted(name for name in existing if MONTHLY_PARTITION.fullmatch(name))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        name = partition_name(month)
+        if name in existing or (monthly and name < monthly[0]):
+            continue
+        create_month_partition(connection, month, has_default=DEFAULT_PARTITION in existing)
+        created.append(name)
+    return created
+
+
+def create_month_partition(connection: Connection, month: date, has_default: bool) -> None:
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    stray = has_default and connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE ts >= :start AND ts < :end)"),
+        _range_params(month),
+    ).scalar()
+    if not stray:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {SAMPLES_TABLE} FOR VALUES {bounds}"))
+        return
+    # rows of this month already sit in the default partition; a new partition
+    # may not overlap them, so move them over before attaching
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {SAMPLES_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE ts >= :start AND ts < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        _range_params(month),
+    )
+    connection.execute(text(f"ALTER TABLE {SAMPLES_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(
+        connection.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:parent)"), {"parent": SAMPLES_TABLE}
+        ).scalar()
+    )
+
+
+def maintain_sample_partitions() -> List[str]:
+    with engine.begin() as connection:
+        return ensure_sample_partitions(connection)
+
+
+async def maintain_forever() -> None:
+    while True:
+        try:
+            created = await run_in_threadpool(maintain_sample_partitions)
+            if created:
+                logger.info("Created sample partitions: %s", ", ".join(created))
+        except Exception:
+            logger.exception("Sample partition maintenance failed")
+        await asyncio.sleep(PARTITION_CHECK_SECONDS)
+
+
+def _range_params(month: date) -> dict:
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    end_month = add_months(month, 1)
+    return {"start": start, "end": datetime(end_month.year, end_month.month, 1, tzinfo=timezone.utc)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("\n".join(maintain_sample_partitions()) or "Partitions are up to date")
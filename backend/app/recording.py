@@ -0,0 +1,102 @@
+"""Reader for ``.bpa`` files written by the CLI's ``run --offline`` mode.
+
+The layout is documented in ``cli/bizim_performans_araci/recording.py``. A
+recording cut short by a crash is read up to its last complete block and
+comes back without a footer.
+"""
+import json
+import struct
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+BPA_MAGIC = b"BPA1"
+BPA_CONTENT_TYPE = "application/vnd.bizim-performans-araci.bpa"
+SUPPORTED_VERSIONS = {1}
+BLOCK_HEADER = struct.Struct("<cI")
+COUNT = struct.Struct("<I")
+ALLOWED_DTYPES = {"<f8", "<f4"}
+REQUIRED_COLUMNS = ("ts", "cpu_percent", "rss_mb")
+# float32 columns are rounded back to the decimals the CLI rounds them to,
+# so 12.34 does not come back as 12.34000015
+FLOAT32_DECIMALS = 2
+FLOAT32_COLUMN_DECIMALS = {"interval_s": 4}
+
+
+class Recording(NamedTuple):
+    header: Dict[str, object]
+    columns: Dict[str, np.ndarray]
+    processes: List[Tuple[float, List[Dict[str, object]]]]
+    phases: List[Dict[str, object]]
+    footer: Dict[str, object]
+
+
+def parse_recording(data: bytes) -> Recording:
+    """Decode a ``.bpa`` body; raises ``ValueError`` when it is malformed."""
+    view = memoryview(data)
+    if bytes(view[: len(BPA_MAGIC)]) != BPA_MAGIC:
+        raise ValueError("Not a .bpa recording")
+    offset = len(BPA_MAGIC)
+    header, offset = _read_json(view, offset)
+    if header.get("version") not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported recording version: {header.get('version')}")
+
+    layout = [(str(name), str(dtype)) for name, dtype in header.get("columns", [])]
+    if any(dtype not in ALLOWED_DTYPES for _, dtype in layout):
+        raise ValueError("Unsupported column type")
+    names = [name for name, _ in layout]
+    if any(name not in names for name in REQUIRED_COLUMNS):
+        raise ValueError("Recording is missing required columns")
+
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name in names}
+    processes: List[Tuple[float, List[Dict[str, object]]]] = []
+    phases: List[Dict[str, object]] = []
+    footer: Dict[str, object] = {}
+    while offset + BLOCK_HEADER.size <= len(view):
+        tag, length = BLOCK_HEADER.unpack_from(view, offset)
+        offset += BLOCK_HEADER.size
+        end = offset + length
+        if end > len(view):
+            # the writer died mid-block: keep everything before it
+            break
+        if tag == b"S":
+            _read_samples(view[offset:end], layout, chunks)
+        elif tag == b"P":
+            processes.extend(json.loads(bytes(view[offset:end])))
+        elif tag == b"M":
+            phases.extend(json.loads(bytes(view[offset:end])))
+        elif tag == b"F":
+            footer = json.loads(bytes(view[offset:end]))
+        # unknown tags are skipped so newer writers stay readable
+        offset = end
+
+    columns = {}
+    for (name, dtype), parts in zip(layout, chunks.values()):
+        values = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        if dtype == "<f4":
+            values = np.round(values.astype(np.float64), FLOAT32_COLUMN_DECIMALS.get(name, FLOAT32_DECIMALS))
+        columns[name] = values
+    return Recording(header=header, columns=columns, processes=processes, phases=phases, footer=footer)
+
+
+def _read_samples(block: memoryview, layout: List[Tuple[str, str]], chunks: Dict[str, List[np.ndarray]]) -> None:
+    if len(block) < COUNT.size:
+        raise ValueError("Truncated sample block")
+    (count,) = COUNT.unpack_from(block, 0)
+    offset = COUNT.size
+    for name, dtype in layout:
+        size = count * np.dtype(dtype).itemsize
+        if offset + size > len(block):
+            raise ValueError("Truncated sample block")
+        chunks[name].append(np.frombuffer(block, dtype=dtype, count=count, offset=offset))
+        offset += size
+
+
+def _read_json(view: memoryview, offset: int) -> Tuple[Dict[str, object], int]:
+    if offset + COUNT.size > len(view):
+        raise ValueError("Truncated header")
+    (length,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    if offset + length > len(view):
+        raise ValueError("Truncated header")
+    return json.loads(bytes(view[offset : offset + length])), offset + length
@@ -0,0 +1,130 @@
+"""Multi-resolution CPU/RSS rollups of finished runs.
+
+When a run finishes, its samples are summarised into ``run_sample_rollups``
+at every resolution in ``ROLLUP_RESOLUTIONS``: per bucket the sample count
+and the min, max and duration-weighted mean of ``cpu_percent`` and
+``rss_mb``, weighted like ``run_stats``. Buckets are
+aligned to the epoch, so the same bucket of two runs covers the same wall
+clock span. Overview charts of long runs read a few thousand rollup rows
+instead of decoding every sample.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .metrics import sample_weights
+
+ROLLUP_RESOLUTIONS = (10, 60, 600)  # seconds, finest first
+ROLLUP_SERIES = (("cpu", "cpu_percent"), ("rss", "rss_mb"))
+
+
+def compute_rollups(columns: Dict[str, np.ndarray], resolution: int) -> Dict[str, np.ndarray]:
+    """Bucket ``columns`` (as returned by ``load_run_columns``) into ``resolution``-second rollups."""
+    order = np.argsort(columns["ts"], kind="stable")
+    ts = columns["ts"][order]
+    buckets = np.floor(ts / resolution) * resolution
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if buckets.size else np.empty(0, np.int64)
+    counts = np.diff(np.r_[starts, buckets.size])
+    rollup = {"bucket_ts": buckets[starts], "sample_count": counts}
+    if starts.size:
+        weights = sample_weights(ts, columns.get("interval_s", np.full(ts.size, np.nan))[order])
+        bucket_weights = np.add.reduceat(weights, starts)
+    for prefix, name in ROLLUP_SERIES:
+        values = columns[name][order]
+        if not starts.size:
+            rollup.update({f"{prefix}_min": values, f"{prefix}_max": values, f"{prefix}_avg": values})
+            continue
+        rollup[f"{prefix}_min"] = np.minimum.reduceat(values, starts)
+        rollup[f"{prefix}_max"] = np.maximum.reduceat(values, starts)
+        # a bucket whose samples all weigh zero falls back to the plain mean
+        plain = np.add.reduceat(values, starts) / counts
+        weighted = np.add.reduceat(values * weights, starts) / np.where(bucket_weights > 0, bucket_weights, 1)
+        rollup[f"{prefix}_avg"] = np.where(bucket_weights > 0, weighted, plain)
+    return rollup
+
+
+def store_rollups(db: Session, run_id: int, columns: Dict[str, np.ndarray]) -> int:
+    """Replace the run's rollups at every resolution; returns the number of rows written."""
+    db.execute(delete(models.RunSampleRollup).where(models.RunSampleRollup.run_id == run_id))
+    rows = []
+    for resolution in ROLLUP_RESOLUTIONS:
+        rollup = compute_rollups(columns, resolution)
+        names = [name for name in rollup if name != "bucket_ts"]
+        for index, bucket in enumerate(rollup["bucket_ts"].tolist()):
+            row = {name: rollup[name][index].item() for name in names}
+            row.update(
+                run_id=run_id,
+                resolution_s=resolution,
+                bucket_ts=datetime.fromtimestamp(bucket, tz=timezone.utc),
+            )
+            rows.append(row)
+    if rows:
+        db.execute(insert(models.RunSampleRollup), rows)
+    return len(rows)
+
+
+def load_rollups(
+    db: Session,
+    run_id: int,
+    max_points: int,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Optional[Tuple[int, Dict[str, np.ndarray]]]:
+    """The coarsest rollup of the run with at least ``max_points`` buckets in range.
+
+    Returns ``(resolution_s, columns)`` with ``ts`` as the bucket start, or
+    ``None`` when the run has no rollups (still running) or even the finest
+    one is too coarse, in which case raw samples give the better picture.
+    """
+    rollups = models.RunSampleRollup
+    names = ["sample_count"] + [f"{prefix}_{kind}" for prefix, _ in ROLLUP_SERIES for kind in ("min", "max", "avg")]
+    for resolution in reversed(ROLLUP_RESOLUTIONS):
+        conditions = [rollups.run_id == run_id, rollups.resolution_s == resolution]
+        if start is not None:
+            # a bucket overlaps the range if it ends after ``start``
+            conditions.append(rollups.bucket_ts > datetime.fromtimestamp(start - resolution, tz=timezone.utc))
+        if end is not None:
+            conditions.append(rollups.bucket_ts <= datetime.fromtimestamp(end, tz=timezone.utc))
+        if db.scalar(select(func.count()).select_from(rollups).where(*conditions)) < max_points:
+            continue
+        rows = db.execute(
+            select(rollups.bucket_ts, *(getattr(rollups, name) for name in names))
+            .where(*conditions)
+            .order_by(rollups.bucket_ts)
+        ).all()
+        values = list(zip(*rows))
+        columns = {"ts": np.array([bucket.timestamp() for bucket in values[0]])}
+        for name, column in zip(names, values[1:]):
+            columns[name] = np.array(column, dtype=np.float64)
+        return resolution, columns
+    return None
+
+
+if __name__ == "__main__":
+    # roll up runs that finished before rollups existed; --rebuild redoes every finished run
+    import sys
+
+    from .archive import load_run_columns
+    from .db import session_scope
+
+    rebuild = "--rebuild" in sys.argv[1:]
+    with session_scope() as session:
+        query = (
+            select(models.TestRun.id)
+            .where(models.TestRun.status != "running")
+            .where(
+                exists().where(models.RunSampleChunk.run_id == models.TestRun.id)
+                | exists().where(models.MetricSample.run_id == models.TestRun.id)
+            )
+        )
+        if not rebuild:
+            query = query.where(~exists().where(models.RunSampleRollup.run_id == models.TestRun.id))
+        finished = session.scalars(query).all()
+    for finished_run_id in finished:
+        with session_scope() as session:
+            written = store_rollups(session, finished_run_id, load_run_columns(session, finished_run_id))
+            print(f"run {finished_run_id}: {written} rollup rows")
@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from .. import models, schemas
+from ..db import get_async_db
+from ..metrics import bootstrap_ci
+from .runs import map_run_summary
+
+router = APIRouter(prefix="/benchmarks", tags=["benchmarks"])
+
+SUMMARY_FIELDS = ("duration_s", "avg_cpu", "p95_rss_mb")
+
+
+@router.post("", response_model=schemas.BenchmarkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_benchmark(payload: schemas.BenchmarkCreate, db: AsyncSession = Depends(get_async_db)):
+    command = payload.command.strip()
+    if not command:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Command cannot be empty")
+
+    benchmark = models.Benchmark(command=command, iterations=payload.iterations, warmup=payload.warmup)
+    db.add(benchmark)
+    await db.commit()
+    await db.refresh(benchmark)
+    return schemas.BenchmarkCreateResponse(id=benchmark.id, created_at=benchmark.created_at)
+
+
+@router.get("", response_model=List[schemas.BenchmarkDetail])
+async def list_benchmarks(db: AsyncSession = Depends(get_async_db)):
+    benchmarks = await db.scalars(
+        select(models.Benchmark)
+        .options(selectinload(models.Benchmark.runs).joinedload(models.TestRun.stats))
+        .order_by(models.Benchmark.id.desc())
+        .limit(20)
+    )
+    return [map_benchmark(benchmark) for benchmark in benchmarks]
+
+
+@router.get("/{benchmark_id}", response_model=schemas.BenchmarkDetail)
+async def get_benchmark(benchmark_id: int, db: AsyncSession = Depends(get_async_db)):
+    benchmark = await db.scalar(
+        select(models.Benchmark)
+        .options(selectinload(models.Benchmark.runs).joinedload(models.TestRun.stats))
+        .filter(models.Benchmark.id == benchmark_id)
+    )
+    if benchmark is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benchmark not found")
+    return map_benchmark(benchmark)
+
+
+def map_benchmark(benchmark: models.Benchmark) -> schemas.BenchmarkDetail:
+    # failed iterations are listed but left out of the summary
+    measured = [run.stats for run in benchmark.runs if run.status == "completed" and run.stats is not None]
+    summaries = {
+        field: summarize([getattr(stats, field) for stats in measured if getattr(stats, field) is not None])
+        for field in SUMMARY_FIELDS
+    }
+    return schemas.BenchmarkDetail(
+        id=benchmark.id,
+        command=benchmark.command,
+        iterations=benchmark.iterations,
+        warmup=benchmark.warmup,
+        created_at=benchmark.created_at,
+        runs=[map_run_summary(run) for run in benchmark.runs],
+        **summaries,
+    )
+
+
+def summarize(values: List[float]) -> Optional[schemas.MetricSummary]:
+    if not values:
+        return None
+    data = np.asarray(values, dtype=float)
+    ci_low, ci_high = bootstrap_ci(data)
+    return schemas.MetricSummary(
+        n=int(data.size),
+        mean=float(data.mean()),
+        stddev=float(data.std(ddof=1)) if data.size > 1 else None,
+        ci_low=ci_low,
+        ci_high=ci_high,
+    )
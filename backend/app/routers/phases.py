@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models, schemas
+from ..db import get_async_db
+
+router = APIRouter(prefix="/runs", tags=["phases"])
+
+
+@router.post("/{run_id}/phases", status_code=status.HTTP_204_NO_CONTENT)
+async def ingest_phases(run_id: int, phases: List[schemas.PhaseIn], db: AsyncSession = Depends(get_async_db)):
+    run = await db.get(models.TestRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    if run.status != "running":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot add phases to a finished run")
+
+    store_phases(db, run_id, phases)
+    await db.commit()
+
+
+@router.get("/{run_id}/phases", response_model=schemas.RunPhasesResponse)
+async def get_phases(run_id: int, db: AsyncSession = Depends(get_async_db)):
+    run = await db.scalar(
+        select(models.TestRun).options(selectinload(models.TestRun.phases)).filter(models.TestRun.id == run_id)
+    )
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return schemas.RunPhasesResponse(phases=[schemas.PhaseOut.from_orm(phase) for phase in run.phases])
+
+
+def store_phases(db: Session | AsyncSession, run_id: int, phases: List[schemas.PhaseIn]) -> None:
+    db.add_all(
+        models.RunPhase(
+            run_id=run_id,
+            name=phase.name,
+            started_at=datetime.fromtimestamp(phase.started_at, tz=timezone.utc),
+            ended_at=datetime.fromtimestamp(phase.ended_at, tz=timezone.utc),
+        )
+        for phase in phases
+    )
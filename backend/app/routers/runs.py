@@ -1,144 +1,314 @@
+import base64
 from datetime import datetime, timezone
-from typing import List
+from typing import Dict, Optional, Tuple
 
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import ColumnElement, case, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from .. import models, schemas
-from ..db import get_db
+from .. import ingest, live, models, schemas
+from ..accumulators import EXACT_STATS_MAX_SAMPLES, accumulated_stats, new_accumulator
+from ..archive import archive_run, load_run_columns
+from ..bulk import SAMPLE_COLUMNS
+from ..db import get_async_db, session_scope
+from ..metrics import sample_weights, weighted_mean, weighted_percentile, weighted_std
+from ..rollups import store_rollups
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
+STAT_PERCENTILES = (50, 90, 95, 99)
+RUN_LIST_MAX_LIMIT = 200
+
 
 @router.post("", response_model=schemas.RunCreateResponse, status_code=status.HTTP_201_CREATED)
-def create_run(payload: schemas.RunCreate, db: Session = Depends(get_db)):
+async def create_run(payload: schemas.RunCreate, db: AsyncSession = Depends(get_async_db)):
     command = payload.command.strip()
     if not command:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Command cannot be empty")
 
-    run = models.TestRun(command=command, baseline_run_id=payload.baseline_run_id)
+    if payload.benchmark_id is not None and await db.get(models.Benchmark, payload.benchmark_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benchmark not found")
+
+    run = models.TestRun(command=command, baseline_run_id=payload.baseline_run_id, benchmark_id=payload.benchmark_id)
     db.add(run)
-    db.commit()
-    db.refresh(run)
+    await db.flush()
+    db.add(new_accumulator(run.id))
+    await db.commit()
+    await db.refresh(run)
     return schemas.RunCreateResponse(id=run.id, started_at=run.started_at)
 
 
-@router.get("", response_model=List[schemas.RunSummary])
-def list_runs(db: Session = Depends(get_db)):
-    runs = (
-        db.query(models.TestRun)
-        .options(joinedload(models.TestRun.stats))
-        .order_by(models.TestRun.started_at.desc())
-        .limit(50)
-        .all()
-    )
-    return [map_run_summary(run) for run in runs]
+@router.get("", response_model=schemas.RunListResponse)
+async def list_runs(
+    limit: int = Query(50, ge=1, le=RUN_LIST_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    run_status: Optional[str] = Query(None, alias="status"),
+    command: Optional[str] = Query(None, description="Case-insensitive substring of the command"),
+    command_prefix: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None, alias="from", description="Runs started at or after"),
+    end: Optional[datetime] = Query(None, alias="to", description="Runs started at or before"),
+    exit_code: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Runs, newest first, a page at a time.
+
+    Pages are keyset-paginated on ``(started_at, id)``: the cursor holds the
+    last run of the previous page and the next page starts right after it in
+    the index, so every page costs the same however deep it is.
+    """
+    runs = models.TestRun
+    query = select(runs).options(joinedload(runs.stats))
+    if cursor is not None:
+        query = query.where(tuple_(runs.started_at, runs.id) < decode_run_cursor(cursor))
+    if run_status is not None:
+        query = query.where(runs.status == run_status)
+    if command:
+        query = query.where(runs.command.ilike(f"%{escape_like(command)}%", escape="\\"))
+    if command_prefix:
+        query = query.where(runs.command.like(f"{escape_like(command_prefix)}%", escape="\\"))
+    if start is not None:
+        query = query.where(runs.started_at >= as_utc(start))
+    if end is not None:
+        query = query.where(runs.started_at <= as_utc(end))
+    if exit_code is not None:
+        query = query.where(runs.exit_code == exit_code)
+
+    # one extra row tells whether there is a next page
+    page = (await db.scalars(query.order_by(runs.started_at.desc(), runs.id.desc()).limit(limit + 1))).all()
+    next_cursor = encode_run_cursor(page[limit - 1]) if len(page) > limit else None
+    return schemas.RunListResponse(items=[map_run_summary(run) for run in page[:limit]], next_cursor=next_cursor)
+
+
+def encode_run_cursor(run: models.TestRun) -> str:
+    return base64.urlsafe_b64encode(f"{run.started_at.isoformat()}|{run.id}".encode()).decode()
+
+
+def decode_run_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        started_at, run_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(started_at), int(run_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def as_utc(value: datetime) -> datetime:
+    # naive query datetimes are taken as UTC, like the stored timestamps
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
 
 
 @router.get("/{run_id}", response_model=schemas.RunDetail)
-def get_run(run_id: int, db: Session = Depends(get_db)):
-    run = (
-        db.query(models.TestRun)
-        .options(joinedload(models.TestRun.stats), joinedload(models.TestRun.samples))
-        .filter(models.TestRun.id == run_id)
-        .first()
-    )
+async def get_run(run_id: int, db: AsyncSession = Depends(get_async_db)):
+    run = await load_run_detail(db, run_id)
     if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
 
+    if run.status == "running":
+        # approximate stats from the ingest-time accumulators, without reading the samples
+        accumulator = await db.get(models.RunAccumulator, run_id)
+        if accumulator is not None and accumulator.sample_count:
+            detail = map_run_detail(run)
+            detail.stats = map_accumulated_stats(run, accumulator)
+            return detail
+
     return map_run_detail(run)
 
 
 @router.patch("/{run_id}/finish", response_model=schemas.RunDetail)
-def finish_run(run_id: int, payload: schemas.RunFinishRequest, db: Session = Depends(get_db)):
-    # --- DÜZELTME BÖLÜM 1: KİLİTLE VE GÜNCELLE ---
-    
-    # 1. Önce SADECE ana satırı çek ve KİLİTLE (JOIN YOK)
-    run_to_update: models.TestRun | None = (
-        db.query(models.TestRun)
-        .filter(models.TestRun.id == run_id)
-        .with_for_update()
-        .one_or_none()
-    )
-    
-    if run_to_update is None:
+async def finish_run(
+    run_id: int,
+    payload: schemas.RunFinishRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # batches still queued in the group-commit writer belong in the stats
+    await ingest.writer.drain(run_id)
+
+    # Koşu kapatma işlemi olay döngüsünü bekletmemek için bir worker thread'de çalışır;
+    # özetler ve arşiv yanıttan sonra arka planda hazırlanır.
+    run_status, exit_code, stats_source = await run_in_threadpool(close_run, run_id, payload)
+    live.hub.close(run_id, "finished", {"status": run_status, "exit_code": exit_code})
+    background_tasks.add_task(close_run_samples, run_id, stats_source, payload.totals)
+
+    run = await load_run_detail(db, run_id)
+    if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
-
-    if run_to_update.status != "running":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Run already finished")
-
-    # 2. Değişiklikleri yap
-    run_to_update.exit_code = payload.exit_code
-    run_to_update.ended_at = datetime.now(timezone.utc)
-    run_to_update.status = "completed" if payload.exit_code == 0 else "failed"
-
-    # 3. İstatistikleri hesapla (bu fonksiyon KENDİ sorgularını yapar)
-    #    Bir önceki adımda bu fonksiyondaki NumPy hatalarını düzeltmiştik.
-    stats = compute_and_store_run_stats(db, run_to_update)
-
-    # 4. Veritabanına işle (commit)
-    db.commit()
-    # --- DÜZELTME BÖLÜM 1 BİTTİ ---
+    return map_run_detail(run)
 
 
-    # --- DÜZELTME BÖLÜM 2: YANITI HAZIRLA ---
-    # 'response_model=schemas.RunDetail' için verinin tam (JOIN'lenmiş)
-    # haline ihtiyacımız var. Veritabanından (artık kilitli değil)
-    # güncellenmiş veriyi 'get_run' fonksiyonundaki gibi çekelim.
-    
-    run_with_details = (
-        db.query(models.TestRun)
-        .options(joinedload(models.TestRun.stats), joinedload(models.TestRun.samples))
+def close_run(run_id: int, payload: schemas.RunFinishRequest) -> Tuple[str, Optional[int], str]:
+    """Mark the run finished and store its stats in one transaction.
+
+    Returns ``(status, exit_code, stats_source)``; the source, ``"exact"``,
+    ``"accumulator"`` or ``"aggregate"``, tells ``close_run_samples`` what is
+    left to compute from the samples.
+    """
+    with session_scope() as session:
+        # satırı kilitle: ingest yazıcısı kapanan koşuya örnek ekleyemez
+        run = session.scalars(
+            select(models.TestRun).filter(models.TestRun.id == run_id).with_for_update()
+        ).one_or_none()
+        if run is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+        if run.status != "running":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Run already finished")
+
+        run.exit_code = payload.exit_code
+        run.ended_at = datetime.now(timezone.utc)
+        run.status = "completed" if payload.exit_code == 0 else "failed"
+
+        # İstatistikler biriktiriciden gelir; kısa koşular örneklerden tam hesaplanır,
+        # biriktiricisi olmayan eski koşular SQL'de toplanır.
+        accumulator = session.get(models.RunAccumulator, run_id)
+        if accumulator is None:
+            stats_source = "aggregate"
+            stats = store_aggregated_stats(session, run)
+        elif accumulator.sample_count <= EXACT_STATS_MAX_SAMPLES:
+            stats_source = "exact"
+            stats = compute_and_store_run_stats(session, run, load_run_columns(session, run.id))
+        else:
+            stats_source = "accumulator"
+            stats = store_accumulated_stats(session, run, accumulator)
+        apply_run_totals(session, run, stats, payload.totals)
+        if accumulator is not None:
+            session.delete(accumulator)
+        return run.status, run.exit_code, stats_source
+
+
+async def load_run_detail(db: AsyncSession, run_id: int) -> Optional[models.TestRun]:
+    # populate_existing: the session may already hold the run from before the update
+    result = await db.scalars(
+        select(models.TestRun)
+        .options(joinedload(models.TestRun.stats))
         .filter(models.TestRun.id == run_id)
-        .one_or_none()
+        .execution_options(populate_existing=True)
     )
-    
-    if run_with_details is None:
-         # Bu olmamalı, az önce güncelledik, ama bir güvenlik kontrolü
-         raise HTTPException(status_code=404, detail="Run disappeared after update")
-
-    # 'stats_override'a gerek yok, çünkü 'run_with_details' 
-    # 'joinedload(models.TestRun.stats)' ile zaten güncel 'stats'ı çekti.
-    return map_run_detail(run_with_details)
-
-
-def compute_and_store_run_stats(db: Session, run: models.TestRun) -> models.RunStats | None:
-    samples = (
-        db.query(models.MetricSample)
-        .filter(models.MetricSample.run_id == run.id)
-        .order_by(models.MetricSample.ts.asc())
-        .all()
+    return result.one_or_none()
+
+
+def close_run_samples(run_id: int, stats_source: str, totals: schemas.RunTotals | None = None) -> None:
+    """Rollups and archive of a finished run, after the response, plus whatever
+    its ``stats_source`` left out: phase stats, or the percentiles and phase
+    stats that the SQL aggregates cannot give."""
+    with session_scope() as session:
+        run = session.get(models.TestRun, run_id)
+        columns = load_run_columns(session, run_id)
+        if stats_source == "aggregate":
+            apply_run_totals(session, run, compute_and_store_run_stats(session, run, columns), totals)
+        elif stats_source == "accumulator" and len(columns["ts"]):
+            compute_phase_stats(
+                run, columns, sample_weights(columns["ts"], columns.get("interval_s", np.full(len(columns["ts"]), np.nan)))
+            )
+        store_rollups(session, run_id, columns)
+        archive_run(session, run_id, columns)
+
+
+def store_aggregated_stats(db: Session, run: models.TestRun) -> models.RunStats | None:
+    """Duration-weighted count, mean, stddev, max and totals of a run without an accumulator, in SQL.
+
+    Samples weigh their ``interval_s`` or, when it is missing, the gap since the
+    previous sample (1 s for the first), close to ``sample_weights``; percentiles
+    need the sorted values and are left to ``close_run_samples``.
+    """
+    samples = models.MetricSample.__table__
+    gap = func.extract("epoch", samples.c.ts - func.lag(samples.c.ts).over(order_by=samples.c.ts))
+    weighted = (
+        select(
+            *(samples.c[name] for name in SAMPLE_COLUMNS if name not in ("ts", "interval_s")),
+            func.coalesce(samples.c.interval_s, case((gap > 0, gap)), 1.0).label("weight"),
+        )
+        .where(samples.c.run_id == run.id)
+        .subquery()
     )
-    if not samples:
-        existing = db.query(models.RunStats).filter(models.RunStats.run_id == run.id).first()
-        if existing:
-            db.delete(existing)
+    weight = weighted.c.weight
+
+    def mean(name: str, power: int = 1) -> ColumnElement:
+        column = weighted.c[name]
+        return func.sum(func.power(column, power) * weight) / func.nullif(func.sum(weight).filter(column.isnot(None)), 0)
+
+    def stddev(name: str) -> ColumnElement:
+        return func.sqrt(func.greatest(mean(name, 2) - func.power(mean(name), 2), 0))
+
+    row = db.execute(
+        select(
+            func.count().label("sample_count"),
+            mean("cpu_percent").label("avg_cpu"),
+            func.max(weighted.c.cpu_percent).label("max_cpu"),
+            stddev("cpu_percent").label("stddev_cpu"),
+            mean("rss_mb").label("avg_rss_mb"),
+            func.max(weighted.c.rss_mb).label("max_rss_mb"),
+            stddev("rss_mb").label("stddev_rss_mb"),
+            func.sum(weighted.c.read_bytes).label("total_read_bytes"),
+            func.sum(weighted.c.write_bytes).label("total_write_bytes"),
+            func.sum(weighted.c.ctx_switches_voluntary).label("total_ctx_switches_voluntary"),
+            func.sum(weighted.c.ctx_switches_involuntary).label("total_ctx_switches_involuntary"),
+            func.max(weighted.c.num_threads).label("max_threads"),
+            func.max(weighted.c.num_fds).label("max_fds"),
+            mean("uss_mb").label("avg_uss_mb"),
+            func.max(weighted.c.uss_mb).label("max_uss_mb"),
+            mean("pss_mb").label("avg_pss_mb"),
+            func.max(weighted.c.pss_mb).label("max_pss_mb"),
+        )
+    ).one()._asdict()
+
+    stats = db.query(models.RunStats).filter(models.RunStats.run_id == run.id).first()
+    if not row.pop("sample_count"):
+        if stats is not None:
+            db.delete(stats)
         return None
+    if stats is None:
+        stats = models.RunStats(run_id=run.id)
+        db.add(stats)
+    for name, value in row.items():
+        setattr(stats, name, value)
+    stats.duration_s = max((run.ended_at - run.started_at).total_seconds(), 0.0) if run.ended_at else None
+    db.flush()
+    return stats
 
-    # --- BAŞLANGIÇ: YENİ GÜVENLİ KOD (None filtreleme) ---
-    # None değerleri numpy'a gitmeden önce filtrele
-    cpu_samples = [s.cpu_percent for s in samples if s.cpu_percent is not None]
-    rss_samples = [s.rss_mb for s in samples if s.rss_mb is not None]
 
-    # Eğer (filtrelenmiş) geçerli veri kalmadıysa, istatistik hesaplama
-    if not cpu_samples or not rss_samples:
+def store_accumulated_stats(
+    db: Session, run: models.TestRun, accumulator: models.RunAccumulator
+) -> models.RunStats:
+    stats = db.query(models.RunStats).filter(models.RunStats.run_id == run.id).first()
+    if stats is None:
+        stats = models.RunStats(run_id=run.id)
+        db.add(stats)
+    for name, value in accumulated_stats(accumulator).items():
+        if hasattr(models.RunStats, name):
+            setattr(stats, name, value)
+    stats.duration_s = max((run.ended_at - run.started_at).total_seconds(), 0.0) if run.ended_at else None
+    db.flush()
+    return stats
+
+
+def compute_and_store_run_stats(
+    db: Session, run: models.TestRun, columns: Dict[str, np.ndarray] | None = None
+) -> models.RunStats | None:
+    if columns is None:
+        columns = load_run_columns(db, run.id)
+    if not len(columns["ts"]):
         existing = db.query(models.RunStats).filter(models.RunStats.run_id == run.id).first()
         if existing:
             db.delete(existing)
         return None
 
-    # Artık güvenli olan (None içermeyen) listelerle numpy dizilerini oluştur
-    cpu_values = np.array(cpu_samples, dtype=float)
-    rss_values = np.array(rss_samples, dtype=float)
-    # --- BİTİŞ: YENİ GÜVENLİ KOD ---
+    # Örnekler farklı süreleri temsil edebilir (uyarlamalı örnekleme); süreyle ağırlıklandır
+    weights = sample_weights(columns["ts"], columns.get("interval_s", np.full(len(columns["ts"]), np.nan)))
+    cpu_values = columns["cpu_percent"]
+    rss_values = columns["rss_mb"]
 
-    avg_cpu = float(cpu_values.mean())
-    p95_cpu = float(np.percentile(cpu_values, 95))
+    avg_cpu = weighted_mean(cpu_values, weights)
     max_cpu = float(cpu_values.max())
+    cpu_percentiles = {q: weighted_percentile(cpu_values, weights, q) for q in STAT_PERCENTILES}
 
-    avg_rss = float(rss_values.mean())
-    p95_rss = float(np.percentile(rss_values, 95))
+    avg_rss = weighted_mean(rss_values, weights)
+    rss_percentiles = {q: weighted_percentile(rss_values, weights, q) for q in STAT_PERCENTILES}
 
     duration_s = None
     if run.ended_at:
@@ -150,15 +320,105 @@ def compute_and_store_run_stats(db: Session, run: models.TestRun) -> models.RunS
         db.add(stats)
 
     stats.avg_cpu = avg_cpu
-    stats.p95_cpu = p95_cpu
+    stats.p50_cpu, stats.p90_cpu, stats.p95_cpu, stats.p99_cpu = cpu_percentiles.values()
     stats.max_cpu = max_cpu
+    stats.stddev_cpu = weighted_std(cpu_values, weights)
     stats.avg_rss_mb = avg_rss
-    stats.p95_rss_mb = p95_rss
+    stats.p50_rss_mb, stats.p90_rss_mb, stats.p95_rss_mb, stats.p99_rss_mb = rss_percentiles.values()
+    stats.max_rss_mb = float(rss_values.max())
+    stats.stddev_rss_mb = weighted_std(rss_values, weights)
     stats.duration_s = duration_s
+    apply_extended_stats(stats, columns, weights)
+    compute_phase_stats(run, columns, weights)
+
+    db.flush()
+    return stats
+
+
+def apply_extended_stats(stats: models.RunStats, columns: Dict[str, np.ndarray], weights: np.ndarray) -> None:
+    def column(name: str) -> tuple[np.ndarray, np.ndarray] | None:
+        values = columns.get(name)
+        if values is None:
+            return None
+        present = ~np.isnan(values)
+        return (values[present], weights[present]) if present.any() else None
+
+    def total(name: str) -> int | None:
+        data = column(name)
+        return int(data[0].sum()) if data is not None else None
+
+    def maximum(name: str) -> int | None:
+        data = column(name)
+        return int(data[0].max()) if data is not None else None
+
+    stats.total_read_bytes = total("read_bytes")
+    stats.total_write_bytes = total("write_bytes")
+    stats.total_ctx_switches_voluntary = total("ctx_switches_voluntary")
+    stats.total_ctx_switches_involuntary = total("ctx_switches_involuntary")
+    stats.max_threads = maximum("num_threads")
+    stats.max_fds = maximum("num_fds")
+
+    uss = column("uss_mb")
+    stats.avg_uss_mb = weighted_mean(*uss) if uss is not None else None
+    stats.max_uss_mb = float(uss[0].max()) if uss is not None else None
+    pss = column("pss_mb")
+    stats.avg_pss_mb = weighted_mean(*pss) if pss is not None else None
+    stats.p95_pss_mb = weighted_percentile(*pss, 95) if pss is not None else None
+    stats.max_pss_mb = float(pss[0].max()) if pss is not None else None
+
+
+def apply_run_totals(
+    db: Session,
+    run: models.TestRun,
+    stats: models.RunStats | None,
+    totals: schemas.RunTotals | None,
+) -> models.RunStats | None:
+    """Store exact cgroup totals; they replace the sampled I/O sums, which miss short-lived processes."""
+    if totals is None:
+        return stats
+    if stats is None:
+        # a command too short to be sampled still has exact totals
+        stats = models.RunStats(run_id=run.id)
+        if run.ended_at and run.started_at:
+            stats.duration_s = max((run.ended_at - run.started_at).total_seconds(), 0.0)
+        db.add(stats)
 
+    stats.cpu_time_s = totals.cpu_time_s
+    stats.peak_memory_mb = totals.peak_memory_mb
+    if totals.read_bytes is not None:
+        stats.total_read_bytes = totals.read_bytes
+    if totals.write_bytes is not None:
+        stats.total_write_bytes = totals.write_bytes
     db.flush()
     return stats
 
+
+def compute_phase_stats(run: models.TestRun, columns: Dict[str, np.ndarray], weights: np.ndarray) -> None:
+    if not run.phases:
+        return
+
+    ts, cpu, rss = columns["ts"], columns["cpu_percent"], columns["rss_mb"]
+    for phase in run.phases:
+        # a sample stamped ts covers (ts - weight, ts]; weight each one by how
+        # much of that span falls inside the phase, so phases shorter than the
+        # sampling interval still get the sample that covers them
+        start, end = phase.started_at.timestamp(), phase.ended_at.timestamp()
+        overlap = np.minimum(ts, end) - np.maximum(ts - weights, start)
+        inside = overlap > 0
+        phase.sample_count = int(inside.sum())
+        if not inside.any():
+            phase.avg_cpu = phase.p95_cpu = phase.max_cpu = None
+            phase.avg_rss_mb = phase.p95_rss_mb = phase.max_rss_mb = None
+            continue
+        phase_weights = overlap[inside]
+        phase.avg_cpu = weighted_mean(cpu[inside], phase_weights)
+        phase.p95_cpu = weighted_percentile(cpu[inside], phase_weights, 95)
+        phase.max_cpu = float(cpu[inside].max())
+        phase.avg_rss_mb = weighted_mean(rss[inside], phase_weights)
+        phase.p95_rss_mb = weighted_percentile(rss[inside], phase_weights, 95)
+        phase.max_rss_mb = float(rss[inside].max())
+
+
 def map_run_summary(run: models.TestRun) -> schemas.RunSummary:
     stats = map_stats(run)
     return schemas.RunSummary(
@@ -169,13 +429,22 @@ def map_run_summary(run: models.TestRun) -> schemas.RunSummary:
         status=run.status,
         exit_code=run.exit_code,
         baseline_run_id=run.baseline_run_id,
+        benchmark_id=run.benchmark_id,
         stats=stats,
     )
 
 
+def map_accumulated_stats(run: models.TestRun, accumulator: models.RunAccumulator) -> schemas.RunStats:
+    return schemas.RunStats(
+        run_id=run.id,
+        duration_s=max((datetime.now(timezone.utc) - run.started_at).total_seconds(), 0.0),
+        approximate=True,
+        **accumulated_stats(accumulator),
+    )
+
+
 def map_run_detail(run: models.TestRun, stats_override: models.RunStats | None = None) -> schemas.RunDetail:
     stats = map_stats(run, override=stats_override)
-    stats = enrich_stats_with_samples(run, stats)
     return schemas.RunDetail(
         id=run.id,
         command=run.command,
@@ -184,6 +453,7 @@ def map_run_detail(run: models.TestRun, stats_override: models.RunStats | None =
         status=run.status,
         exit_code=run.exit_code,
         baseline_run_id=run.baseline_run_id,
+        benchmark_id=run.benchmark_id,
         stats=stats,
     )
 
@@ -200,33 +470,27 @@ def map_stats(run: models.TestRun, override: models.RunStats | None = None) -> s
         avg_rss_mb=stats_model.avg_rss_mb,
         p95_rss_mb=stats_model.p95_rss_mb,
         duration_s=stats_model.duration_s,
-        max_rss_mb=None,
+        max_rss_mb=stats_model.max_rss_mb,
+        p50_cpu=stats_model.p50_cpu,
+        p90_cpu=stats_model.p90_cpu,
+        p99_cpu=stats_model.p99_cpu,
+        stddev_cpu=stats_model.stddev_cpu,
+        p50_rss_mb=stats_model.p50_rss_mb,
+        p90_rss_mb=stats_model.p90_rss_mb,
+        p99_rss_mb=stats_model.p99_rss_mb,
+        stddev_rss_mb=stats_model.stddev_rss_mb,
+        total_read_bytes=stats_model.total_read_bytes,
+        total_write_bytes=stats_model.total_write_bytes,
+        total_ctx_switches_voluntary=stats_model.total_ctx_switches_voluntary,
+        total_ctx_switches_involuntary=stats_model.total_ctx_switches_involuntary,
+        max_threads=stats_model.max_threads,
+        max_fds=stats_model.max_fds,
+        avg_uss_mb=stats_model.avg_uss_mb,
+        max_uss_mb=stats_model.max_uss_mb,
+        avg_pss_mb=stats_model.avg_pss_mb,
+        p95_pss_mb=stats_model.p95_pss_mb,
+        max_pss_mb=stats_model.max_pss_mb,
+        cpu_time_s=stats_model.cpu_time_s,
+        peak_memory_mb=stats_model.peak_memory_mb,
     )
     return stats
-
-
-def enrich_stats_with_samples(run: models.TestRun, stats: schemas.RunStats | None) -> schemas.RunStats | None:
-    samples = getattr(run, "samples", None)
-    if not samples:
-        return stats
-
-    max_cpu = max(sample.cpu_percent for sample in samples)
-    max_rss = max(sample.rss_mb for sample in samples)
-
-    if stats is None:
-        stats = schemas.RunStats(
-            run_id=run.id,
-            avg_cpu=None,
-            p95_cpu=None,
-            max_cpu=float(max_cpu),
-            avg_rss_mb=None,
-            p95_rss_mb=None,
-            duration_s=None,
-            max_rss_mb=float(max_rss),
-        )
-    else:
-        if stats.max_cpu is None:
-            stats.max_cpu = float(max_cpu)
-        if max_rss is not None:
-            stats.max_rss_mb = float(max_rss)
-    return stats
@@ -1,72 +1,350 @@
+import asyncio
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+import numpy as np
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
-from .. import models, schemas
-from ..db import get_db
+from .. import ingest, live, models, schemas
+from ..archive import load_run_columns, store_chunks
+from ..bulk import SAMPLE_COLUMNS, columns_from_lists, columns_to_lists, store_process_samples, validate_columns
+from ..db import AsyncSessionLocal, get_async_db, get_db, session_scope
+from ..export import EXPORT_MEDIA_TYPES, encode_batch, encode_header, iter_sample_batches
+from ..metrics import lttb_indices
+from ..recording import BPA_CONTENT_TYPE, Recording, parse_recording
+from ..rollups import load_rollups, store_rollups
+from ..routing import GzipRoute
+from .phases import store_phases
+from .runs import apply_run_totals, compute_and_store_run_stats, map_run_detail
 
-router = APIRouter(prefix="/runs", tags=["samples"])
+router = APIRouter(prefix="/runs", tags=["samples"], route_class=GzipRoute)
 
 
 @router.post("/{run_id}/samples", status_code=status.HTTP_204_NO_CONTENT)
-def ingest_samples(run_id: int, samples: List[schemas.MetricSampleIn], db: Session = Depends(get_db)):
+async def ingest_samples(run_id: int, samples: List[schemas.MetricSampleIn]):
     if not samples:
         return
 
-    run = db.query(models.TestRun).filter(models.TestRun.id == run_id).first()
-    if run is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
-    if run.status != "running":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot add samples to a finished run")
-
-    entities = []
-    for sample in samples:
-        ts = datetime.fromtimestamp(sample.ts, tz=timezone.utc)
-        entities.append(
-            models.MetricSample(
-                run_id=run_id,
-                ts=ts,
-                cpu_percent=sample.cpu_percent,
-                rss_mb=sample.rss_mb,
-            )
-        )
+    columns = {name: np.array([getattr(sample, name) for sample in samples], dtype=np.float64) for name in SAMPLE_COLUMNS}
+    try:
+        columns = validate_columns(columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    await store_batch(run_id, columns, [(sample.ts, process) for sample in samples for process in sample.processes or ()])
+
+
+@router.post("/{run_id}/samples/columnar", status_code=status.HTTP_204_NO_CONTENT)
+async def ingest_columnar_samples(run_id: int, payload: Dict[str, Any] = Body(...)):
+    """Fast ingest path: one list per column instead of one object per sample.
+
+    Values are checked with NumPy and written with ``COPY``, so no Pydantic or
+    ORM object is built per row. ``processes`` optionally carries the top-process
+    breakdown as ``[[ts, [process, ...]], ...]``.
+    """
+    try:
+        columns = validate_columns(columns_from_lists(payload))
+        breakdown = [
+            (float(sample_ts), schemas.ProcessSampleIn.parse_obj(process))
+            for sample_ts, processes in payload.get("processes") or ()
+            for process in processes
+        ]
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid samples: {exc}") from exc
+
+    if len(columns["ts"]):
+        await store_batch(run_id, columns, breakdown)
 
-    db.bulk_save_objects(entities)
+
+@router.post("/import", response_model=schemas.RunDetail, status_code=status.HTTP_201_CREATED)
+def import_recording(
+    data: bytes = Body(..., media_type=BPA_CONTENT_TYPE),
+    db: Session = Depends(get_db),
+):
+    """Create a finished run with its samples and stats from an offline ``.bpa`` recording."""
+    # sync on purpose: one large transaction that writes through psycopg2's COPY
+    try:
+        recording = parse_recording(data)
+        run, columns, breakdown = validate_recording(recording)
+        phases = [schemas.PhaseIn.parse_obj(phase) for phase in recording.phases]
+        totals = schemas.RunTotals.parse_obj(recording.footer["totals"]) if recording.footer.get("totals") else None
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid recording: {exc}") from exc
+
+    if run.baseline_run_id is not None and db.get(models.TestRun, run.baseline_run_id) is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Baseline run not found")
+
+    db.add(run)
+    db.flush()
+    # an imported run is already finished, so its samples go straight to the archive
+    store_chunks(db, run.id, columns)
+    store_rollups(db, run.id, columns)
+    store_process_samples(db, run.id, breakdown)
+    store_phases(db, run.id, phases)
+    db.flush()
+    apply_run_totals(db, run, compute_and_store_run_stats(db, run), totals)
     db.commit()
 
+    imported = (
+        db.query(models.TestRun)
+        .options(joinedload(models.TestRun.stats))
+        .filter(models.TestRun.id == run.id)
+        .one()
+    )
+    return map_run_detail(imported)
+
 
 @router.get("/{run_id}/samples", response_model=schemas.RunSamplesResponse)
-def get_samples(
+async def get_samples(
     run_id: int,
     downsample: bool = Query(False),
     step: int = Query(1, ge=1),
-    db: Session = Depends(get_db),
+    max_points: Optional[int] = Query(None, ge=3),
+    start: Optional[float] = Query(None, alias="from"),
+    end: Optional[float] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    run = db.query(models.TestRun).filter(models.TestRun.id == run_id).first()
+    run = await db.get(models.TestRun, run_id)
     if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
 
-    query = (
-        db.query(models.MetricSample)
-        .filter(models.MetricSample.run_id == run_id)
-        .order_by(models.MetricSample.ts.asc())
+    # decoding, downsampling and encoding a long run is CPU-bound: it all happens in a worker
+    # thread, and returning a Response keeps FastAPI from validating it again on the event loop
+    body = await run_in_threadpool(lambda: read_samples(run_id, downsample, step, max_points, start, end).json())
+    return Response(body, media_type="application/json")
+
+
+def read_samples(
+    run_id: int,
+    downsample: bool,
+    step: int,
+    max_points: Optional[int],
+    start: Optional[float],
+    end: Optional[float],
+) -> schemas.RunSamplesResponse:
+    with session_scope() as session:
+        if max_points is not None:
+            # long finished runs are answered from their precomputed rollups
+            rollup = load_rollups(session, run_id, max_points, start, end)
+            if rollup is not None:
+                return serialize_rollup(*rollup, max_points)
+
+        # finished runs are read from their compressed archive, running ones from metric_samples
+        columns = load_run_columns(session, run_id, start, end)
+
+    if max_points is not None:
+        # LTTB keeps the spikes of the charted series that striding would drop
+        keep = lttb_indices(columns["ts"], [columns["cpu_percent"], columns["rss_mb"]], max_points)
+        columns = {name: values[keep] for name, values in columns.items()}
+    elif downsample and step > 1:
+        columns = {name: values[::step] for name, values in columns.items()}
+
+    values = columns_to_lists(columns)
+    serialized = [schemas.MetricSampleOut(**dict(zip(values, row))) for row in zip(*values.values())]
+
+    return schemas.RunSamplesResponse(samples=serialized)
+
+
+def serialize_rollup(resolution: int, columns: Dict[str, np.ndarray], max_points: int) -> schemas.RunSamplesResponse:
+    # buckets are picked by their maxima, so a short spike still wins its bucket
+    keep = lttb_indices(columns["ts"], [columns["cpu_max"], columns["rss_max"]], max_points)
+    columns = {name: values[keep].tolist() for name, values in columns.items()}
+    samples, buckets = [], []
+    for index, ts in enumerate(columns["ts"]):
+        samples.append(
+            schemas.MetricSampleOut(
+                ts=ts, cpu_percent=columns["cpu_avg"][index], rss_mb=columns["rss_avg"][index], interval_s=resolution
+            )
+        )
+        buckets.append(
+            schemas.SampleBucketOut(
+                sample_count=columns["sample_count"][index],
+                cpu_min=columns["cpu_min"][index],
+                cpu_max=columns["cpu_max"][index],
+                rss_min=columns["rss_min"][index],
+                rss_max=columns["rss_max"][index],
+            )
+        )
+    return schemas.RunSamplesResponse(samples=samples, resolution_s=resolution, buckets=buckets)
+
+
+@router.get("/{run_id}/samples/export")
+async def export_samples(
+    run_id: int,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    start: Optional[float] = Query(None, alias="from"),
+    end: Optional[float] = Query(None, alias="to"),
+):
+    """Every sample at full resolution, streamed as NDJSON or CSV."""
+    if await get_run_briefly(run_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+
+    async def stream():
+        # the only connection held while the body streams
+        async with AsyncSessionLocal() as session:
+            yield encode_header(export_format)
+            async for columns in iter_sample_batches(session, run_id, start, end):
+                yield encode_batch(columns, export_format)
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="run-{run_id}-samples.{export_format}"'},
+    )
+
+
+async def get_run_briefly(run_id: int) -> Optional[models.TestRun]:
+    """The run from a session closed before returning.
+
+    Streaming endpoints use this instead of ``get_async_db``: a dependency's
+    session is only closed after the last chunk is sent, so it would hold a
+    pooled connection, idle in transaction, for the whole stream.
+    """
+    async with AsyncSessionLocal() as session:
+        return await session.get(models.TestRun, run_id)
+
+
+@router.get("/{run_id}/live")
+async def live_samples(run_id: int):
+    """Server-Sent Events: a ``samples`` event per committed batch, then ``finished``.
+
+    No database connection is held while the stream is open.
+    """
+    # subscribe before reading the status, so a finish in between is not missed
+    queue = live.hub.subscribe(run_id)
+    run = await get_run_briefly(run_id)
+    if run is None or run.status != "running":
+        live.hub.unsubscribe(run_id, queue)
+        if run is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+        queue = asyncio.Queue()
+        queue.put_nowait(live.format_event("finished", {"status": run.status, "exit_code": run.exit_code}))
+        queue.put_nowait(None)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=live.LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            live.hub.unsubscribe(run_id, queue)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{run_id}/processes", response_model=schemas.RunProcessesResponse)
+async def get_processes(run_id: int, db: AsyncSession = Depends(get_async_db)):
+    run = await db.get(models.TestRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+
+    processes = await db.scalars(
+        select(models.RunProcess)
+        .filter(models.RunProcess.run_id == run_id)
+        .order_by(models.RunProcess.id.asc())
     )
-    all_samples = query.all()
-
-    if downsample and step > 1:
-        filtered = all_samples[::step]
-    else:
-        filtered = all_samples
-
-    serialized = [
-        schemas.MetricSampleIn(
-            ts=sample.ts.timestamp(),
-            cpu_percent=sample.cpu_percent,
-            rss_mb=sample.rss_mb,
+    series: Dict[int, schemas.ProcessSeries] = {
+        process.id: schemas.ProcessSeries(
+            pid=process.pid,
+            name=process.name,
+            cmdline_hash=process.cmdline_hash,
+            ts=[],
+            cpu_percent=[],
+            rss_mb=[],
         )
-        for sample in filtered
+        for process in processes
+    }
+    if series:
+        rows = await db.execute(
+            select(
+                models.ProcessSample.process_id,
+                models.ProcessSample.ts,
+                models.ProcessSample.cpu_percent,
+                models.ProcessSample.rss_mb,
+            )
+            .filter(models.ProcessSample.process_id.in_(list(series)))
+            .order_by(models.ProcessSample.process_id.asc(), models.ProcessSample.ts.asc())
+        )
+        for process_id, ts, cpu_percent, rss_mb in rows:
+            entry = series[process_id]
+            entry.ts.append(ts.timestamp())
+            entry.cpu_percent.append(cpu_percent)
+            entry.rss_mb.append(rss_mb)
+
+    return schemas.RunProcessesResponse(processes=list(series.values()))
+
+
+def validate_recording(
+    recording: Recording,
+) -> Tuple[models.TestRun, Dict[str, np.ndarray], List[Tuple[float, schemas.ProcessSampleIn]]]:
+    header, footer = recording.header, recording.footer
+    command = header.get("command")
+    if not isinstance(command, str) or not command.strip():
+        raise ValueError("command cannot be empty")
+    if footer and not isinstance(footer.get("exit_code"), int):
+        raise ValueError("footer has no exit code")
+
+    columns = validate_columns({name: recording.columns[name] for name in SAMPLE_COLUMNS if name in recording.columns})
+
+    breakdown = [
+        (float(sample_ts), schemas.ProcessSampleIn.parse_obj(process))
+        for sample_ts, processes in recording.processes
+        for process in processes
     ]
 
-    return schemas.RunSamplesResponse(samples=serialized)
+    started_at = header.get("started_at")
+    if started_at is None and columns["ts"].size:
+        started_at = float(columns["ts"].min())
+    ended_at = footer.get("ended_at")
+    if not footer and columns["ts"].size:
+        # no footer: the recorder was cut short, so the run ends at its last sample
+        ended_at = float(columns["ts"].max())
+    exit_code = footer.get("exit_code")
+    run = models.TestRun(
+        command=command.strip(),
+        baseline_run_id=header.get("baseline_run_id"),
+        started_at=datetime.fromtimestamp(started_at, tz=timezone.utc) if started_at is not None else datetime.now(timezone.utc),
+        ended_at=datetime.fromtimestamp(ended_at, tz=timezone.utc) if ended_at is not None else None,
+        # a recording without a footer imports as a failed run without an exit code
+        status="completed" if exit_code == 0 else "failed",
+        exit_code=exit_code,
+    )
+    return run, columns, breakdown
+
+
+async def store_batch(
+    run_id: int,
+    columns: Dict[str, np.ndarray],
+    breakdown: List[Tuple[float, schemas.ProcessSampleIn]],
+) -> None:
+    """Hand a batch to the group-commit writer and return once it is committed."""
+    future = ingest.writer.submit(run_id, columns, breakdown)
+    try:
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=ingest.INGEST_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                # withdrawn before it was written, so the client's retry cannot duplicate it
+                raise
+            # already in a transaction: the client must hear how that ends
+            await asyncio.wrap_future(future)
+    except ingest.RunNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ingest.RunNotRunning as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except (RuntimeError, asyncio.TimeoutError) as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Samples could not be stored") from exc
+    live.hub.publish_samples(run_id, columns)
@@ -1,38 +1,25 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from .. import models, schemas
-from ..db import get_db
+from ..db import get_async_db
 from .runs import map_run_summary
 
 router = APIRouter(tags=["stats"])
 
 
 @router.get("/compare", response_model=schemas.ComparisonResponse)
-def compare_runs(
+async def compare_runs(
     current: int = Query(..., description="Run id to compare"),
     baseline: Optional[str] = Query("latest-success", description="Baseline run id or 'latest-success'"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    current_run = (
-        db.query(models.TestRun)
-        .options(joinedload(models.TestRun.stats))
-        .filter(models.TestRun.id == current)
-        .first()
-    )
-    if current_run is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Current run not found")
-    if current_run.stats is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current run has no stats yet")
-
-    baseline_run = resolve_baseline(db, baseline, exclude_run_id=current_run.id)
-    if baseline_run is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Baseline run not found")
-    if baseline_run.stats is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Baseline run has no stats yet")
+    current_run, baseline_run = await load_comparison_runs(db, current, baseline)
 
     current_stats = current_run.stats
     baseline_stats = baseline_run.stats
@@ -74,31 +61,169 @@ def compare_runs(
         )
     )
 
+    messages.append(
+        format_ram_message(
+            "p95 PSS",
+            baseline_stats.p95_pss_mb,
+            current_stats.p95_pss_mb,
+        )
+    )
+
     if current_stats.avg_cpu is not None and current_stats.avg_cpu > 80:
         messages.append("Uyarı: Ortalama CPU %80 üzerinde, yüksek yük tespit edildi.")
 
+    phases = compare_phases(baseline_run.phases, current_run.phases)
+    messages.append(format_phase_message(phases))
+
     return schemas.ComparisonResponse(
         current_run=map_run_summary(current_run),
         baseline_run=map_run_summary(baseline_run),
         messages=[msg for msg in messages if msg],
+        metrics=compare_metrics(baseline_stats, current_stats),
+        phases=phases,
+    )
+
+
+@router.post("/compare/gate", response_model=schemas.GateResponse)
+async def gate_run(payload: schemas.GateRequest, db: AsyncSession = Depends(get_async_db)):
+    """Compare a run against its baseline and check each metric against its budget."""
+    current_run, baseline_run = await load_comparison_runs(
+        db, payload.current, payload.baseline, same_command=True
+    )
+    metrics = compare_metrics(baseline_run.stats, current_run.stats, payload.budgets)
+    return schemas.GateResponse(
+        passed=all(metric.passed is not False for metric in metrics),
+        current_run_id=current_run.id,
+        baseline_run_id=baseline_run.id,
+        metrics=metrics,
+    )
+
+
+async def load_comparison_runs(
+    db: AsyncSession, current: int, baseline: Optional[str], same_command: bool = False
+) -> Tuple[models.TestRun, models.TestRun]:
+    current_run = await db.scalar(
+        select(models.TestRun)
+        .options(joinedload(models.TestRun.stats), selectinload(models.TestRun.phases))
+        .filter(models.TestRun.id == current)
+    )
+    if current_run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Current run not found")
+    if current_run.stats is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current run has no stats yet")
+
+    baseline_run = await resolve_baseline(db, baseline, current_run, same_command)
+    if baseline_run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Baseline run not found")
+    if baseline_run.stats is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Baseline run has no stats yet")
+    return current_run, baseline_run
+
+
+def compare_phases(
+    baseline_phases: List[models.RunPhase],
+    current_phases: List[models.RunPhase],
+) -> List[schemas.PhaseComparison]:
+    """Pair phases by name and occurrence (the 2nd "tapOn" with the 2nd "tapOn") and diff each pair."""
+    baseline_by_key = dict(number_phases(baseline_phases))
+    return [
+        schemas.PhaseComparison(
+            name=key[0],
+            occurrence=key[1],
+            metrics=compare_metrics(baseline_by_key[key], phase, metrics=schemas.PHASE_METRICS),
+        )
+        for key, phase in number_phases(current_phases)
+        if key in baseline_by_key
+    ]
+
+
+def number_phases(phases: List[models.RunPhase]) -> List[Tuple[Tuple[str, int], models.RunPhase]]:
+    seen: Dict[str, int] = {}
+    numbered = []
+    for phase in phases:
+        occurrence = seen.get(phase.name, 0)
+        seen[phase.name] = occurrence + 1
+        numbered.append(((phase.name, occurrence), phase))
+    return numbered
+
+
+def format_phase_message(phases: List[schemas.PhaseComparison]) -> Optional[str]:
+    slowest = None
+    for phase in phases:
+        duration = next(metric for metric in phase.metrics if metric.metric == "duration_s")
+        if duration.relative_pct is not None and duration.relative_pct > 0:
+            if slowest is None or duration.relative_pct > slowest[1].relative_pct:
+                slowest = (phase, duration)
+    if slowest is None:
+        return None
+    phase, duration = slowest
+    return (
+        f"En çok yavaşlayan aşama **{phase.name}**: **{duration.baseline:.2f} s** → "
+        f"**{duration.current:.2f} s** (~%{duration.relative_pct:.0f})."
     )
 
 
-def resolve_baseline(db: Session, baseline: Optional[str], exclude_run_id: Optional[int]) -> Optional[models.TestRun]:
-    query = db.query(models.TestRun).options(joinedload(models.TestRun.stats))
+def compare_metrics(
+    baseline_stats: object,
+    current_stats: object,
+    budgets: Optional[Dict[str, float]] = None,
+    metrics: Tuple[str, ...] = schemas.GATE_METRICS,
+) -> List[schemas.MetricComparison]:
+    budgets = budgets or {}
+    results = []
+    for metric in metrics:
+        base = getattr(baseline_stats, metric)
+        current = getattr(current_stats, metric)
+        budget = budgets.get(metric)
+        delta = relative = passed = None
+        if base is not None and current is not None:
+            delta = current - base
+            relative = delta / base * 100 if base else None
+            if budget is not None:
+                # a zero baseline has no relative change; any increase fails
+                passed = relative <= budget if relative is not None else delta <= 0
+        elif budget is not None:
+            # a budget that cannot be checked fails rather than passing silently
+            passed = False
+        results.append(
+            schemas.MetricComparison(
+                metric=metric,
+                baseline=base,
+                current=current,
+                delta=delta,
+                relative_pct=relative,
+                budget_pct=budget,
+                passed=passed,
+            )
+        )
+    return results
+
+
+async def resolve_baseline(
+    db: AsyncSession, baseline: Optional[str], current_run: models.TestRun, same_command: bool = False
+) -> Optional[models.TestRun]:
+    """An explicit run id, or the latest other completed run.
+
+    With ``same_command`` (the gate) only runs of the same command, and the same
+    benchmark when the run has one, are considered.
+    """
+    query = select(models.TestRun).options(joinedload(models.TestRun.stats), selectinload(models.TestRun.phases))
     if baseline is None or baseline == "latest-success":
         q = (
             query.filter(models.TestRun.status == "completed")
+            .filter(models.TestRun.id != current_run.id)
             .order_by(models.TestRun.ended_at.desc())
         )
-        if exclude_run_id is not None:
-            q = q.filter(models.TestRun.id != exclude_run_id)
-        return q.first()
+        if same_command:
+            q = q.filter(models.TestRun.command == current_run.command)
+            if current_run.benchmark_id is not None:
+                q = q.filter(models.TestRun.benchmark_id == current_run.benchmark_id)
+        return await db.scalar(q.limit(1))
     try:
         run_id = int(baseline)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid baseline id") from exc
-    return query.filter(models.TestRun.id == run_id).first()
+    return await db.scalar(query.filter(models.TestRun.id == run_id))
 
 
 def format_cpu_message(label: str, base: Optional[float], current: Optional[float]) -> Optional[str]:
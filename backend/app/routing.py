@@ -0,0 +1,41 @@
+import zlib
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+MAX_DECOMPRESSED_BODY_BYTES = 64 * 1024 * 1024
+
+
+class GzipRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                body = decompress_gzip(body)
+            self._body = body
+        return self._body
+
+
+class GzipRoute(APIRoute):
+    """Route class that accepts ``Content-Encoding: gzip`` request bodies."""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request) -> Response:
+            request = GzipRequest(request.scope, request.receive)
+            return await original_route_handler(request)
+
+        return custom_route_handler
+
+
+def decompress_gzip(body: bytes) -> bytes:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, MAX_DECOMPRESSED_BODY_BYTES)
+    except zlib.error as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid gzip body") from exc
+    if decompressor.unconsumed_tail:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Decompressed body too large")
+    return data
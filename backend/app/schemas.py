@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
 
+# run_stats fields that /compare reports and /compare/gate can budget
+GATE_METRICS = ("duration_s", "avg_cpu", "p95_cpu", "max_cpu", "avg_rss_mb", "p95_rss_mb", "p95_pss_mb")
+PHASE_METRICS = ("duration_s", "avg_cpu", "p95_cpu", "max_cpu", "avg_rss_mb", "p95_rss_mb")
+
+
 class RunCreate(BaseModel):
     command: str = Field(..., min_length=1)
     baseline_run_id: Optional[int] = None
+    benchmark_id: Optional[int] = None
 
 
 class RunBase(BaseModel):
@@ -19,6 +25,7 @@ class RunBase(BaseModel):
     status: str
     exit_code: Optional[int]
     baseline_run_id: Optional[int]
+    benchmark_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -32,7 +39,30 @@ class RunStats(BaseModel):
     avg_rss_mb: Optional[float]
     p95_rss_mb: Optional[float]
     duration_s: Optional[float]
-    max_rss_mb: Optional[float] = None  # derived value
+    max_rss_mb: Optional[float] = None
+    p50_cpu: Optional[float] = None
+    p90_cpu: Optional[float] = None
+    p99_cpu: Optional[float] = None
+    stddev_cpu: Optional[float] = None
+    p50_rss_mb: Optional[float] = None
+    p90_rss_mb: Optional[float] = None
+    p99_rss_mb: Optional[float] = None
+    stddev_rss_mb: Optional[float] = None
+    total_read_bytes: Optional[int] = None
+    total_write_bytes: Optional[int] = None
+    total_ctx_switches_voluntary: Optional[int] = None
+    total_ctx_switches_involuntary: Optional[int] = None
+    max_threads: Optional[int] = None
+    max_fds: Optional[int] = None
+    avg_uss_mb: Optional[float] = None
+    max_uss_mb: Optional[float] = None
+    avg_pss_mb: Optional[float] = None
+    p95_pss_mb: Optional[float] = None
+    max_pss_mb: Optional[float] = None
+    cpu_time_s: Optional[float] = None
+    peak_memory_mb: Optional[float] = None
+    # true while a run is going: the values come from ingest-time running aggregates
+    approximate: bool = False
 
     class Config:
         orm_mode = True
@@ -42,6 +72,12 @@ class RunSummary(RunBase):
     stats: Optional[RunStats]
 
 
+class RunListResponse(BaseModel):
+    items: List[RunSummary]
+    # pass as ``cursor`` for the next (older) page; null on the last page
+    next_cursor: Optional[str]
+
+
 class RunDetail(RunBase):
     stats: Optional[RunStats]
 
@@ -51,12 +87,24 @@ class RunCreateResponse(BaseModel):
     started_at: datetime
 
 
+class RunTotals(BaseModel):
+    """Exact whole-run totals from the CLI's cgroup accounting mode."""
+
+    cpu_time_s: Optional[float] = Field(None, ge=0)
+    peak_memory_mb: Optional[float] = Field(None, ge=0)
+    read_bytes: Optional[int] = Field(None, ge=0)
+    write_bytes: Optional[int] = Field(None, ge=0)
+
+
 class RunFinishRequest(BaseModel):
     exit_code: int
+    totals: Optional[RunTotals] = None
 
 
-class MetricSampleIn(BaseModel):
-    ts: float
+class ProcessSampleIn(BaseModel):
+    pid: int
+    name: str = Field(..., max_length=255)
+    cmdline_hash: str = Field(..., max_length=16)
     cpu_percent: float
     rss_mb: float
 
@@ -67,8 +115,105 @@ class MetricSampleIn(BaseModel):
         return value
 
 
+class MetricSampleOut(BaseModel):
+    ts: float
+    cpu_percent: float
+    rss_mb: float
+    interval_s: Optional[float] = None
+    read_bytes: Optional[int] = None
+    write_bytes: Optional[int] = None
+    ctx_switches_voluntary: Optional[int] = None
+    ctx_switches_involuntary: Optional[int] = None
+    num_threads: Optional[int] = None
+    num_fds: Optional[int] = None
+    uss_mb: Optional[float] = None
+    pss_mb: Optional[float] = None
+    memory_current_mb: Optional[float] = None
+
+
+class MetricSampleIn(MetricSampleOut):
+    processes: Optional[List[ProcessSampleIn]] = None
+
+    @validator(
+        "cpu_percent",
+        "rss_mb",
+        "interval_s",
+        "read_bytes",
+        "write_bytes",
+        "ctx_switches_voluntary",
+        "ctx_switches_involuntary",
+        "num_threads",
+        "num_fds",
+        "uss_mb",
+        "pss_mb",
+        "memory_current_mb",
+    )
+    def non_negative(cls, value: Optional[float]) -> Optional[float]:
+        if value is not None and value < 0:
+            raise ValueError("Metric values must be non-negative")
+        return value
+
+
+class SampleBucketOut(BaseModel):
+    sample_count: int
+    cpu_min: float
+    cpu_max: float
+    rss_min: float
+    rss_max: float
+
+
 class RunSamplesResponse(BaseModel):
-    samples: List[MetricSampleIn]
+    samples: List[MetricSampleOut]
+    # set when the samples are rollup buckets: ``samples`` then hold the bucket
+    # means and ``buckets`` the matching count and extremes
+    resolution_s: Optional[int] = None
+    buckets: Optional[List[SampleBucketOut]] = None
+
+
+class ProcessSeries(BaseModel):
+    pid: int
+    name: str
+    cmdline_hash: str
+    ts: List[float]
+    cpu_percent: List[float]
+    rss_mb: List[float]
+
+
+class RunProcessesResponse(BaseModel):
+    processes: List[ProcessSeries]
+
+
+class PhaseIn(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    started_at: float
+    ended_at: float
+
+    @validator("ended_at")
+    def ends_after_start(cls, value: float, values: dict) -> float:
+        if "started_at" in values and value < values["started_at"]:
+            raise ValueError("Phase cannot end before it starts")
+        return value
+
+
+class PhaseOut(BaseModel):
+    name: str
+    started_at: datetime
+    ended_at: datetime
+    duration_s: float
+    sample_count: Optional[int]
+    avg_cpu: Optional[float]
+    p95_cpu: Optional[float]
+    max_cpu: Optional[float]
+    avg_rss_mb: Optional[float]
+    p95_rss_mb: Optional[float]
+    max_rss_mb: Optional[float]
+
+    class Config:
+        orm_mode = True
+
+
+class RunPhasesResponse(BaseModel):
+    phases: List[PhaseOut]
 
 
 class ComparisonMetrics(BaseModel):
@@ -80,7 +225,79 @@ class ComparisonMetrics(BaseModel):
     duration_s: Optional[float]
 
 
+class MetricComparison(BaseModel):
+    metric: str
+    baseline: Optional[float]
+    current: Optional[float]
+    delta: Optional[float]
+    relative_pct: Optional[float]  # None when the baseline is zero or missing
+    budget_pct: Optional[float] = None
+    passed: Optional[bool] = None  # None when there is no budget; False when budgeted but without data
+
+
+class PhaseComparison(BaseModel):
+    name: str
+    occurrence: int  # 0 for the first phase with this name, 1 for the second...
+    metrics: List[MetricComparison]
+
+
 class ComparisonResponse(BaseModel):
     current_run: RunSummary
     baseline_run: RunSummary
     messages: List[str]
+    metrics: List[MetricComparison] = []
+    phases: List[PhaseComparison] = []
+
+
+class GateRequest(BaseModel):
+    current: int
+    baseline: str = "latest-success"
+    # allowed relative increase per metric, in percent
+    budgets: Dict[str, float]
+
+    @validator("budgets")
+    def known_metrics(cls, value: Dict[str, float]) -> Dict[str, float]:
+        unknown = set(value) - set(GATE_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        if any(budget < 0 for budget in value.values()):
+            raise ValueError("Budgets must be non-negative")
+        return value
+
+
+class GateResponse(BaseModel):
+    passed: bool
+    current_run_id: int
+    baseline_run_id: int
+    metrics: List[MetricComparison]
+
+
+class BenchmarkCreate(BaseModel):
+    command: str = Field(..., min_length=1)
+    iterations: int = Field(..., ge=1)
+    warmup: int = Field(0, ge=0)
+
+
+class BenchmarkCreateResponse(BaseModel):
+    id: int
+    created_at: datetime
+
+
+class MetricSummary(BaseModel):
+    n: int
+    mean: float
+    stddev: Optional[float]
+    ci_low: float
+    ci_high: float
+
+
+class BenchmarkDetail(BaseModel):
+    id: int
+    command: str
+    iterations: int
+    warmup: int
+    created_at: datetime | None
+    runs: List[RunSummary]
+    duration_s: Optional[MetricSummary]
+    avg_cpu: Optional[MetricSummary]
+    p95_rss_mb: Optional[MetricSummary]
@@ -0,0 +1,41 @@
+"""Add benchmarks grouping repeated runs
+
+Revision ID: a3d6f0b8c951
+Revises: f5c8e1d7a2b4
+Create Date: 2026-10-17 13:02:17.552940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d6f0b8c951'
+down_revision = 'f5c8e1d7a2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'benchmarks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('command', sa.Text(), nullable=False),
+        sa.Column('iterations', sa.Integer(), nullable=False),
+        sa.Column('warmup', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(op.f('ix_benchmarks_id'), 'benchmarks', ['id'], unique=False)
+    op.add_column('test_runs', sa.Column('benchmark_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'test_runs_benchmark_id_fkey', 'test_runs', 'benchmarks', ['benchmark_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_test_runs_benchmark_id'), 'test_runs', ['benchmark_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_test_runs_benchmark_id'), table_name='test_runs')
+    op.drop_constraint('test_runs_benchmark_id_fkey', 'test_runs', type_='foreignkey')
+    op.drop_column('test_runs', 'benchmark_id')
+    op.drop_index(op.f('ix_benchmarks_id'), table_name='benchmarks')
+    op.drop_table('benchmarks')
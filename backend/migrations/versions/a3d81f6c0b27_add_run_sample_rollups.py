@@ -0,0 +1,39 @@
+"""Add run_sample_rollups table
+
+Revision ID: a3d81f6c0b27
+Revises: f2c9a6d1e8b5
+Create Date: 2026-10-17 21:36:02.517930
+
+Runs that finished earlier get their rollups from `python -m app.rollups`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d81f6c0b27'
+down_revision = 'f2c9a6d1e8b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_sample_rollups',
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('resolution_s', sa.Integer(), nullable=False),
+        sa.Column('bucket_ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('cpu_min', sa.Float(), nullable=False),
+        sa.Column('cpu_max', sa.Float(), nullable=False),
+        sa.Column('cpu_avg', sa.Float(), nullable=False),
+        sa.Column('rss_min', sa.Float(), nullable=False),
+        sa.Column('rss_max', sa.Float(), nullable=False),
+        sa.Column('rss_avg', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('run_id', 'resolution_s', 'bucket_ts'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('run_sample_rollups')
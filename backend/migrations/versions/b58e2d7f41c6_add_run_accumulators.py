@@ -0,0 +1,34 @@
+"""Add run_accumulators table
+
+Revision ID: b58e2d7f41c6
+Revises: a3d81f6c0b27
+Create Date: 2026-10-17 22:48:19.263054
+
+Runs that are live during the upgrade only have the batches ingested after
+it in their accumulators; they finish through the exact path.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b58e2d7f41c6'
+down_revision = 'a3d81f6c0b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_accumulators',
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('sample_count', sa.BigInteger(), nullable=False),
+        sa.Column('first_ts', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_ts', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('state', sa.JSON(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('run_accumulators')
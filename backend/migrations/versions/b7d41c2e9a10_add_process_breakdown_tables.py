@@ -0,0 +1,46 @@
+"""Add per-process breakdown tables
+
+Revision ID: b7d41c2e9a10
+Revises: 5a83dd831d49
+Create Date: 2026-10-17 09:12:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41c2e9a10'
+down_revision = '5a83dd831d49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_processes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('pid', sa.Integer(), nullable=False),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('cmdline_hash', sa.String(length=16), nullable=False),
+        sa.UniqueConstraint('run_id', 'pid', 'cmdline_hash', name='uq_run_processes_identity'),
+    )
+    op.create_index(op.f('ix_run_processes_run_id'), 'run_processes', ['run_id'], unique=False)
+
+    op.create_table(
+        'process_samples',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('process_id', sa.Integer(), sa.ForeignKey('run_processes.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('cpu_percent', sa.Float(precision=24), nullable=False),
+        sa.Column('rss_mb', sa.Float(precision=24), nullable=False),
+    )
+    op.create_index('ix_process_samples_process_id_ts', 'process_samples', ['process_id', 'ts'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_process_samples_process_id_ts', table_name='process_samples')
+    op.drop_table('process_samples')
+    op.drop_index(op.f('ix_run_processes_run_id'), table_name='run_processes')
+    op.drop_table('run_processes')
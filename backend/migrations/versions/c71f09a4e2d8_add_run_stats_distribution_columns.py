@@ -0,0 +1,61 @@
+"""Add percentile, stddev and max_rss_mb columns to run_stats
+
+Revision ID: c71f09a4e2d8
+Revises: b58e2d7f41c6
+Create Date: 2026-10-17 23:54:31.840217
+
+max_rss_mb used to be recomputed from the samples on every detail request;
+it is backfilled here in SQL, from metric_samples or, for archived runs, the
+rollups. The new percentiles and stddevs are filled in as runs finish.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71f09a4e2d8'
+down_revision = 'b58e2d7f41c6'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = (
+    'p50_cpu',
+    'p90_cpu',
+    'p99_cpu',
+    'stddev_cpu',
+    'max_rss_mb',
+    'p50_rss_mb',
+    'p90_rss_mb',
+    'p99_rss_mb',
+    'stddev_rss_mb',
+)
+
+
+def upgrade() -> None:
+    for name in NEW_COLUMNS:
+        op.add_column('run_stats', sa.Column(name, sa.Float(), nullable=True))
+
+    op.execute(
+        """
+        UPDATE run_stats SET max_rss_mb = peaks.max_rss_mb
+        FROM (SELECT run_id, max(rss_mb) AS max_rss_mb FROM metric_samples GROUP BY run_id) AS peaks
+        WHERE run_stats.run_id = peaks.run_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE run_stats SET max_rss_mb = peaks.max_rss_mb
+        FROM (
+            SELECT run_id, max(rss_max) AS max_rss_mb FROM run_sample_rollups
+            WHERE resolution_s = (SELECT max(resolution_s) FROM run_sample_rollups)
+            GROUP BY run_id
+        ) AS peaks
+        WHERE run_stats.run_id = peaks.run_id AND run_stats.max_rss_mb IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    for name in reversed(NEW_COLUMNS):
+        op.drop_column('run_stats', name)
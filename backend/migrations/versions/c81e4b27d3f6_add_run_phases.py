@@ -0,0 +1,40 @@
+"""Add run phases reported through markers
+
+Revision ID: c81e4b27d3f6
+Revises: a3d6f0b8c951
+Create Date: 2026-10-17 14:40:03.871226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81e4b27d3f6'
+down_revision = 'a3d6f0b8c951'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_phases',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ended_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=True),
+        sa.Column('avg_cpu', sa.Float(), nullable=True),
+        sa.Column('p95_cpu', sa.Float(), nullable=True),
+        sa.Column('max_cpu', sa.Float(), nullable=True),
+        sa.Column('avg_rss_mb', sa.Float(), nullable=True),
+        sa.Column('p95_rss_mb', sa.Float(), nullable=True),
+        sa.Column('max_rss_mb', sa.Float(), nullable=True),
+    )
+    op.create_index(op.f('ix_run_phases_run_id'), 'run_phases', ['run_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_run_phases_run_id'), table_name='run_phases')
+    op.drop_table('run_phases')
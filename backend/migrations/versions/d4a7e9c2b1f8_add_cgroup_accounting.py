@@ -0,0 +1,28 @@
+"""Add cgroup accounting columns
+
+Revision ID: d4a7e9c2b1f8
+Revises: c81e4b27d3f6
+Create Date: 2026-10-17 15:58:36.209417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7e9c2b1f8'
+down_revision = 'c81e4b27d3f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('metric_samples', sa.Column('memory_current_mb', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('cpu_time_s', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('peak_memory_mb', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('run_stats', 'peak_memory_mb')
+    op.drop_column('run_stats', 'cpu_time_s')
+    op.drop_column('metric_samples', 'memory_current_mb')
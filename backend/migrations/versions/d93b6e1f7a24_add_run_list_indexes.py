@@ -0,0 +1,50 @@
+"""Add run list indexes for keyset pagination and filtering
+
+Revision ID: d93b6e1f7a24
+Revises: c71f09a4e2d8
+Create Date: 2026-10-17 23:58:12.406913
+
+started_at becomes NOT NULL so (started_at, id) is a total order; the few
+imported runs without one get their end time, or the migration time. The
+trigram index on command needs the pg_trgm contrib extension and is skipped
+when the server does not ship it; command filters then scan the table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93b6e1f7a24'
+down_revision = 'c71f09a4e2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('UPDATE test_runs SET started_at = coalesce(ended_at, now()) WHERE started_at IS NULL')
+    op.alter_column('test_runs', 'started_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+    op.create_index('ix_test_runs_started_at_id', 'test_runs', ['started_at', 'id'], unique=False)
+    op.create_index('ix_test_runs_status_started_at_id', 'test_runs', ['status', 'started_at', 'id'], unique=False)
+    op.create_index('ix_test_runs_status_ended_at', 'test_runs', ['status', 'ended_at'], unique=False)
+
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar():
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_test_runs_command_trgm',
+            'test_runs',
+            ['command'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'command': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_test_runs_command_trgm')
+    op.drop_index('ix_test_runs_status_ended_at', table_name='test_runs')
+    op.drop_index('ix_test_runs_status_started_at_id', table_name='test_runs')
+    op.drop_index('ix_test_runs_started_at_id', table_name='test_runs')
+    op.alter_column('test_runs', 'started_at', existing_type=sa.DateTime(timezone=True), nullable=True)
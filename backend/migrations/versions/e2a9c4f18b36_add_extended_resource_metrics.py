@@ -0,0 +1,67 @@
+"""Add extended resource metrics
+
+Revision ID: e2a9c4f18b36
+Revises: b7d41c2e9a10
+Create Date: 2026-10-17 10:03:27.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9c4f18b36'
+down_revision = 'b7d41c2e9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('metric_samples', sa.Column('read_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('metric_samples', sa.Column('write_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('metric_samples', sa.Column('ctx_switches_voluntary', sa.BigInteger(), nullable=True))
+    op.add_column('metric_samples', sa.Column('ctx_switches_involuntary', sa.BigInteger(), nullable=True))
+    op.add_column('metric_samples', sa.Column('num_threads', sa.Integer(), nullable=True))
+    op.add_column('metric_samples', sa.Column('num_fds', sa.Integer(), nullable=True))
+    op.add_column('metric_samples', sa.Column('uss_mb', sa.Float(), nullable=True))
+    op.add_column('metric_samples', sa.Column('pss_mb', sa.Float(), nullable=True))
+
+    op.add_column('run_stats', sa.Column('total_read_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('run_stats', sa.Column('total_write_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('run_stats', sa.Column('total_ctx_switches_voluntary', sa.BigInteger(), nullable=True))
+    op.add_column('run_stats', sa.Column('total_ctx_switches_involuntary', sa.BigInteger(), nullable=True))
+    op.add_column('run_stats', sa.Column('max_threads', sa.Integer(), nullable=True))
+    op.add_column('run_stats', sa.Column('max_fds', sa.Integer(), nullable=True))
+    op.add_column('run_stats', sa.Column('avg_uss_mb', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('max_uss_mb', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('avg_pss_mb', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('p95_pss_mb', sa.Float(), nullable=True))
+    op.add_column('run_stats', sa.Column('max_pss_mb', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for column in (
+        'max_pss_mb',
+        'p95_pss_mb',
+        'avg_pss_mb',
+        'max_uss_mb',
+        'avg_uss_mb',
+        'max_fds',
+        'max_threads',
+        'total_ctx_switches_involuntary',
+        'total_ctx_switches_voluntary',
+        'total_write_bytes',
+        'total_read_bytes',
+    ):
+        op.drop_column('run_stats', column)
+    for column in (
+        'pss_mb',
+        'uss_mb',
+        'num_fds',
+        'num_threads',
+        'ctx_switches_involuntary',
+        'ctx_switches_voluntary',
+        'write_bytes',
+        'read_bytes',
+    ):
+        op.drop_column('metric_samples', column)
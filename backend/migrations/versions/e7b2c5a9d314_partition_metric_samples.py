@@ -0,0 +1,99 @@
+"""Partition metric_samples by month with BRIN and (run_id, ts) indexes
+
+Revision ID: e7b2c5a9d314
+Revises: d4a7e9c2b1f8
+Create Date: 2026-10-17 18:41:05.372611
+
+The existing table is not copied: it is renamed to metric_samples_legacy and
+attached as the first partition, covering everything up to the end of the
+month of its newest row. Monthly partitions follow, plus a default partition
+for out-of-range timestamps. app/partitions.py keeps creating future months.
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2c5a9d314'
+down_revision = 'd4a7e9c2b1f8'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute('DROP INDEX IF EXISTS ix_metric_samples_run_id')
+    op.execute('DROP INDEX IF EXISTS ix_metric_samples_ts')
+    op.execute('ALTER TABLE metric_samples RENAME TO metric_samples_legacy')
+    op.execute('ALTER TABLE metric_samples_legacy DROP CONSTRAINT metric_samples_pkey')
+
+    op.create_table(
+        'metric_samples',
+        sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('metric_samples_id_seq'::regclass)"), nullable=False),
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('cpu_percent', sa.Float(), nullable=False),
+        sa.Column('rss_mb', sa.Float(), nullable=False),
+        sa.Column('read_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('write_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('ctx_switches_voluntary', sa.BigInteger(), nullable=True),
+        sa.Column('ctx_switches_involuntary', sa.BigInteger(), nullable=True),
+        sa.Column('num_threads', sa.Integer(), nullable=True),
+        sa.Column('num_fds', sa.Integer(), nullable=True),
+        sa.Column('uss_mb', sa.Float(), nullable=True),
+        sa.Column('pss_mb', sa.Float(), nullable=True),
+        sa.Column('interval_s', sa.Float(), nullable=True),
+        sa.Column('memory_current_mb', sa.Float(), nullable=True),
+        # the partition key has to be part of the primary key
+        sa.PrimaryKeyConstraint('id', 'ts', name='metric_samples_pkey'),
+        postgresql_partition_by='RANGE (ts)',
+    )
+    op.execute('ALTER SEQUENCE metric_samples_id_seq OWNED BY metric_samples.id')
+    # per-run reads are (run_id, ts) range scans; BRIN on the insert-ordered ts
+    # column is a few pages instead of a B-tree that every insert has to update
+    op.create_index('ix_metric_samples_run_id_ts', 'metric_samples', ['run_id', 'ts'], unique=False)
+    op.create_index('ix_metric_samples_ts_brin', 'metric_samples', ['ts'], unique=False, postgresql_using='brin')
+
+    newest = bind.execute(sa.text('SELECT max(ts) FROM metric_samples_legacy')).scalar()
+    now = datetime.now(timezone.utc)
+    last = max(newest, now) if newest is not None else now
+    boundary = _add_months(date(last.year, last.month, 1), 1)
+    # attaching builds the partitioned indexes on the legacy rows and checks the range once
+    op.execute(
+        f"ALTER TABLE metric_samples ATTACH PARTITION metric_samples_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()} 00:00:00+00')"
+    )
+
+    month = boundary
+    last_month = max(boundary, _add_months(date(now.year, now.month, 1), MONTHS_AHEAD))
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE metric_samples_p{month:%Y%m} PARTITION OF metric_samples "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = _add_months(month, 1)
+    op.execute('CREATE TABLE metric_samples_default PARTITION OF metric_samples DEFAULT')
+
+
+def downgrade() -> None:
+    op.execute('CREATE TABLE metric_samples_flat (LIKE metric_samples INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO metric_samples_flat SELECT * FROM metric_samples')
+    op.execute('ALTER SEQUENCE metric_samples_id_seq OWNED BY NONE')
+    op.execute('DROP TABLE metric_samples')
+    op.execute('ALTER TABLE metric_samples_flat RENAME TO metric_samples')
+    op.execute('ALTER SEQUENCE metric_samples_id_seq OWNED BY metric_samples.id')
+    op.create_primary_key('metric_samples_pkey', 'metric_samples', ['id'])
+    op.create_foreign_key(
+        'metric_samples_run_id_fkey', 'metric_samples', 'test_runs', ['run_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_index('ix_metric_samples_run_id', 'metric_samples', ['run_id'], unique=False)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
@@ -0,0 +1,38 @@
+"""Add run_sample_chunks archive table
+
+Revision ID: f2c9a6d1e8b5
+Revises: e7b2c5a9d314
+Create Date: 2026-10-17 20:12:48.904137
+
+Downgrading drops the archived samples of finished runs with the table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a6d1e8b5'
+down_revision = 'e7b2c5a9d314'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_sample_chunks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('test_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('first_ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.UniqueConstraint('run_id', 'chunk_index', name='uq_run_sample_chunks_run_chunk'),
+    )
+    # payloads are already compressed; skip TOAST's pglz pass
+    op.execute("ALTER TABLE run_sample_chunks ALTER COLUMN payload SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table('run_sample_chunks')
@@ -0,0 +1,24 @@
+"""Add effective sample interval
+
+Revision ID: f5c8e1d7a2b4
+Revises: e2a9c4f18b36
+Create Date: 2026-10-17 11:26:51.004318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c8e1d7a2b4'
+down_revision = 'e2a9c4f18b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('metric_samples', sa.Column('interval_s', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('metric_samples', 'interval_s')
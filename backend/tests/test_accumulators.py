@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app import accumulators, metrics
+
+
+def sample_columns(count: int, seed: int = 3) -> dict:
+    rng = np.random.default_rng(seed)
+    intervals = rng.uniform(0.1, 2.0, count).round(4)
+    ts = 1_714_980_000.0 + np.cumsum(intervals)
+    # samples without interval_s fall back to the gap, also across batch boundaries
+    intervals[1::7] = np.nan
+    return {
+        "ts": ts,
+        "interval_s": intervals,
+        "cpu_percent": rng.lognormal(3.0, 0.8, count).round(2),
+        "rss_mb": rng.uniform(100, 2000, count).round(2),
+    }
+
+
+def split(columns: dict, sizes: list) -> list:
+    bounds = np.cumsum([0] + sizes)
+    return [{name: values[start:end] for name, values in columns.items()} for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("q", [50, 90, 95, 99])
+def test_histogram_quantile_is_within_one_percent(q):
+    values = np.random.default_rng(5).lognormal(4.0, 1.0, 50_000)
+    weights = np.random.default_rng(6).uniform(0.5, 2.0, values.size)
+    buckets, inverse = np.unique(accumulators.bucket_index(values), return_inverse=True)
+    histogram = {str(bucket): weight for bucket, weight in zip(buckets.tolist(), np.bincount(inverse, weights=weights))}
+
+    exact = metrics.weighted_percentile(values, weights, q)
+
+    assert accumulators.histogram_quantile(histogram, q) == pytest.approx(exact, rel=0.01)
+
+
+def test_histogram_quantile_of_zeros_and_empty_histograms():
+    zeros = np.zeros(10)
+    histogram = {str(bucket): 1.0 for bucket in accumulators.bucket_index(zeros)}
+
+    assert accumulators.histogram_quantile(histogram, 95) == 0.0
+    assert accumulators.histogram_quantile({}, 95) is None
+
+
+def test_folding_batches_matches_the_exact_weighted_stats():
+    columns = sample_columns(3000)
+    accumulator = accumulators.new_accumulator(run_id=1)
+
+    for batch in split(columns, [1, 999, 1500, 500]):
+        accumulators.fold_batch(accumulator, batch)
+    stats = accumulators.accumulated_stats(accumulator)
+
+    weights = metrics.sample_weights(columns["ts"], columns["interval_s"])
+    assert accumulator.sample_count == 3000
+    assert stats["avg_cpu"] == pytest.approx(metrics.weighted_mean(columns["cpu_percent"], weights))
+    assert stats["stddev_rss_mb"] == pytest.approx(metrics.weighted_std(columns["rss_mb"], weights))
+    assert stats["max_cpu"] == columns["cpu_percent"].max()
+    assert stats["p95_cpu"] == pytest.approx(metrics.weighted_percentile(columns["cpu_percent"], weights, 95), rel=0.01)
+    assert stats["p99_rss_mb"] <= columns["rss_mb"].max()
@@ -0,0 +1,85 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from app import archive
+from app.bulk import merge_batches
+
+
+def chunk_layout(payload: bytes) -> dict:
+    data = zlib.decompress(payload)
+    (length,) = archive.HEADER_LENGTH.unpack_from(data, 0)
+    header = json.loads(data[archive.HEADER_LENGTH.size : archive.HEADER_LENGTH.size + length])
+    return dict(header["columns"])
+
+
+def sample_columns(count: int) -> dict:
+    rng = np.random.default_rng(7)
+    ts = 1_714_980_000.0 + np.cumsum(rng.uniform(0.05, 2.0, count).round(6))
+    cpu = rng.uniform(0, 400, count).round(2)
+    cpu[::5] = np.nan
+    rss = rng.uniform(10, 4000, count).round(2)
+    interval = rng.uniform(0.05, 2.0, count).round(4)
+    interval[0] = np.nan
+    read_bytes = rng.integers(0, 2**40, count).astype(np.float64)
+    read_bytes[-1] = np.nan
+    return {"ts": ts, "cpu_percent": cpu, "rss_mb": rss, "interval_s": interval, "read_bytes": read_bytes}
+
+
+@pytest.mark.parametrize("count", [1, 13, 1000])
+def test_chunk_round_trip_is_lossless(count):
+    columns = sample_columns(count)
+    payload = archive.encode_chunk(columns)
+
+    decoded = archive.decode_chunk(payload)
+
+    assert list(decoded) == list(columns)
+    np.testing.assert_allclose(decoded["ts"], columns["ts"], rtol=0, atol=1e-6)
+    for name in ("cpu_percent", "rss_mb", "interval_s", "read_bytes"):
+        np.testing.assert_array_equal(decoded[name], columns[name])
+    assert chunk_layout(payload) == {
+        "ts": "delta_i8",
+        "cpu_percent": "fixed_i8",
+        "rss_mb": "fixed_i8",
+        "interval_s": "fixed_i8",
+        "read_bytes": "i8",
+    }
+
+
+def test_unrounded_floats_fall_back_to_float64():
+    columns = {"ts": np.array([1.0, 2.0, 3.0]), "cpu_percent": np.array([1 / 3, np.nan, 2 / 3])}
+    payload = archive.encode_chunk(columns)
+
+    assert chunk_layout(payload)["cpu_percent"] == "f8"
+    np.testing.assert_array_equal(archive.decode_chunk(payload)["cpu_percent"], columns["cpu_percent"])
+
+
+def test_all_null_column_stays_null():
+    columns = {"ts": np.arange(10.0), "pss_mb": np.full(10, np.nan), "num_fds": np.full(10, np.nan)}
+
+    decoded = archive.decode_chunk(archive.encode_chunk(columns))
+
+    assert np.isnan(decoded["pss_mb"]).all()
+    assert np.isnan(decoded["num_fds"]).all()
+
+
+def test_columns_missing_from_a_chunk_are_null_after_merge():
+    first = {"ts": np.array([1.0, 2.0]), "cpu_percent": np.array([10.0, 20.0]), "pss_mb": np.array([5.5, 6.5])}
+    second = {"ts": np.array([3.0]), "cpu_percent": np.array([30.0])}
+    chunks = [archive.decode_chunk(archive.encode_chunk(columns)) for columns in (first, second)]
+
+    assert set(chunks[1]) == {"ts", "cpu_percent"}
+    _, merged = merge_batches([(1, chunk) for chunk in chunks])
+    np.testing.assert_array_equal(merged["cpu_percent"], [10.0, 20.0, 30.0])
+    np.testing.assert_array_equal(merged["pss_mb"], [5.5, 6.5, np.nan])
+
+
+def test_unknown_version_is_rejected():
+    header = json.dumps({"version": archive.ARCHIVE_VERSION + 1, "count": 0, "columns": []}).encode("utf-8")
+    payload = zlib.compress(struct.pack("<I", len(header)) + header)
+
+    with pytest.raises(ValueError):
+        archive.decode_chunk(payload)
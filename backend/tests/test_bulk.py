@@ -0,0 +1,80 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app import bulk
+
+
+def decode_copy(payload: bytes, names: list) -> list:
+    """Rows of a binary COPY stream, parsed as PostgreSQL reads it."""
+    assert payload.startswith(bulk.COPY_SIGNATURE)
+    offset = len(bulk.COPY_SIGNATURE)
+    rows = []
+    while True:
+        (count,) = struct.unpack_from(">h", payload, offset)
+        offset += 2
+        if count == -1:
+            break
+        assert count == len(names) + 1
+        row = {}
+        for name in ["run_id"] + names:
+            (length,) = struct.unpack_from(">i", payload, offset)
+            offset += 4
+            if length == -1:
+                row[name] = None
+                continue
+            dtype = np.dtype(">i4" if name == "run_id" else bulk._copy_dtype(name))
+            assert length == dtype.itemsize
+            row[name] = np.frombuffer(payload, dtype, 1, offset)[0].item()
+            offset += length
+        rows.append(row)
+    assert offset == len(payload)
+    return rows
+
+
+def test_copy_stream_round_trips_values_and_nulls():
+    ts = np.array([1_714_980_000.25, 1_714_980_001.5, 1_714_980_002.0, 1_714_980_003.125])
+    columns = {
+        "ts": ts,
+        "cpu_percent": np.array([12.5, np.nan, 99.75, 0.0]),
+        "rss_mb": np.array([100.0, 101.5, np.nan, 103.25]),
+        "read_bytes": np.array([2.0**40, 0.0, np.nan, 7.0]),
+        "num_threads": np.array([4.0, 5.0, 6.0, np.nan]),
+    }
+    run_ids = np.array([1, 1, 2, 2], dtype=np.int32)
+
+    rows = decode_copy(bulk.encode_copy(run_ids, columns), list(columns))
+
+    # rows come out grouped by their NULL pattern
+    rows.sort(key=lambda row: row["ts"])
+    assert [row["run_id"] for row in rows] == [1, 1, 2, 2]
+    assert [(row["ts"] + bulk.PG_EPOCH_OFFSET_US) / 1_000_000 for row in rows] == ts.tolist()
+    for name in ("cpu_percent", "rss_mb", "read_bytes", "num_threads"):
+        expected = [None if np.isnan(value) else value for value in columns[name]]
+        assert [row[name] for row in rows] == expected
+    assert isinstance(rows[0]["read_bytes"], int)
+
+
+def test_copy_stream_without_nulls_is_one_fixed_width_block():
+    count = 1000
+    columns = {
+        "ts": 1_714_980_000.0 + np.arange(count) * 0.5,
+        "cpu_percent": np.linspace(0, 100, count).round(2),
+        "rss_mb": np.full(count, 512.0),
+    }
+    run_ids = np.full(count, 9, dtype=np.int32)
+
+    payload = bulk.encode_copy(run_ids, columns)
+
+    row_size = 2 + (4 + 4) + 3 * (4 + 8)
+    assert len(payload) == len(bulk.COPY_SIGNATURE) + count * row_size + len(bulk.COPY_TRAILER)
+    rows = decode_copy(payload, list(columns))
+    assert [row["cpu_percent"] for row in rows] == columns["cpu_percent"].tolist()
+
+
+def test_validate_columns_rejects_missing_required_columns():
+    columns = bulk.columns_from_lists({"ts": [1.0, 2.0], "cpu_percent": [1.0, 2.0]})
+
+    with pytest.raises(ValueError):
+        bulk.validate_columns(columns)
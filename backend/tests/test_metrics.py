@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from app import metrics
+
+
+@pytest.mark.parametrize("count, max_points", [(10, 3), (1000, 100), (1001, 1000), (5000, 7)])
+def test_lttb_keeps_endpoints_and_returns_max_points(count, max_points):
+    x = np.arange(count, dtype=np.float64)
+    y = np.sin(x / 17.0)
+
+    indices = metrics.lttb_indices(x, [y], max_points)
+
+    assert indices.size == max_points
+    assert indices[0] == 0 and indices[-1] == count - 1
+    assert (np.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize("count, max_points", [(50, 50), (50, 100), (50, 2), (0, 10)])
+def test_lttb_returns_every_sample_when_nothing_to_drop(count, max_points):
+    x = np.arange(count, dtype=np.float64)
+
+    np.testing.assert_array_equal(metrics.lttb_indices(x, [x], max_points), np.arange(count))
+
+
+def test_lttb_keeps_a_spike_in_any_series():
+    x = np.arange(10_000, dtype=np.float64)
+    flat = np.ones(x.size)
+    spiky = np.ones(x.size)
+    spiky[6_543] = 50.0
+
+    indices = metrics.lttb_indices(x, [flat, spiky], 100)
+
+    assert 6_543 in indices
+
+
+def test_lttb_handles_constant_series_and_timestamps():
+    x = np.full(100, 1_714_980_000.0)
+
+    indices = metrics.lttb_indices(x, [np.zeros(100)], 10)
+
+    assert indices.size == 10 and indices[0] == 0 and indices[-1] == 99
+
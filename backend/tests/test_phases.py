@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from app.routers.stats import compare_phases, format_phase_message
+
+START = datetime(2024, 5, 6, 12, 0, tzinfo=timezone.utc)
+
+
+def phase(name: str, seconds: float, avg_cpu: float = 10.0) -> models.RunPhase:
+    return models.RunPhase(name=name, started_at=START, ended_at=START + timedelta(seconds=seconds), avg_cpu=avg_cpu)
+
+
+def test_phases_pair_by_name_and_occurrence():
+    baseline = [phase("launchApp", 4.0), phase("tapOn", 1.0), phase("tapOn", 2.0)]
+    current = [phase("tapOn", 1.5), phase("launchApp", 5.0), phase("tapOn", 2.0), phase("tapOn", 9.0)]
+
+    compared = compare_phases(baseline, current)
+
+    # the third "tapOn" has no counterpart in the baseline
+    assert [(item.name, item.occurrence) for item in compared] == [("tapOn", 0), ("launchApp", 0), ("tapOn", 1)]
+    durations = [next(m for m in item.metrics if m.metric == "duration_s") for item in compared]
+    assert [(m.baseline, m.current) for m in durations] == [(1.0, 1.5), (4.0, 5.0), (2.0, 2.0)]
+
+
+def test_phase_message_names_the_most_slowed_phase():
+    compared = compare_phases([phase("launchApp", 4.0), phase("tapOn", 1.0)], [phase("launchApp", 5.0), phase("tapOn", 1.5)])
+
+    assert "**tapOn**" in format_phase_message(compared)
+    assert format_phase_message(compare_phases([phase("tapOn", 2.0)], [phase("tapOn", 1.0)])) is None
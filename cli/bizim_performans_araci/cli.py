@@ -1,56 +1,148 @@
 import argparse
+import gzip
+import json
 import os
+import queue
 import subprocess
 import sys
+import threading
 import time
-from typing import Dict, List, Optional, Set
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import psutil
 import requests
+from requests.adapters import HTTPAdapter
+
+from .cgroups import CgroupScope, CgroupUnavailable
+from .collectors import COLLECTOR_CHOICES, DEFAULT_TOP_PROCESSES, create_collector
+from .markers import MARKER_KINDS, MarkerListener, send_marker
+from .recording import BPA_CONTENT_TYPE, OfflineRecorder, read_header
+from .sampling import DEFAULT_MAX_INTERVAL_SECONDS, DEFAULT_TOLERANCE, AdaptiveSettings, Sampler
+from .spool import SampleSpool, SpoolLocked, list_spooled_runs, spool_directory
 
 DEFAULT_BACKEND_URL = "http://localhost:8000"
 BATCH_SIZE = 10
 SAMPLE_INTERVAL_SECONDS = 1.0
+MIN_SAMPLE_INTERVAL_SECONDS = 0.05
 MAX_SAMPLE_RETRY_ATTEMPTS = 3
+UPLOAD_QUEUE_SIZE = 10000
+UPLOAD_FLUSH_INTERVAL_SECONDS = 2.0
+UPLOAD_SHUTDOWN_TIMEOUT_SECONDS = 30.0
+REPLAY_BATCH_SIZE = 1000
+HTTP_POOL_SIZE = 4
+GZIP_MIN_BYTES = 256
+GZIP_LEVEL = 6
+IMPORT_TIMEOUT_SECONDS = 120.0
+MATRIX_POLL_SECONDS = 0.2
+GATE_FAILED_EXIT_CODE = 1
+GATE_ERROR_EXIT_CODE = 2
+# client errors that are worth retrying; any other 4xx rejects the batch for good
+RETRYABLE_STATUS_CODES = (408, 429)
+
+
+class SamplesRejected(Exception):
+    """Raised when the backend refuses a sample batch; sending it again cannot succeed."""
 
 
 class ApiClient:
-    def __init__(self, base_url: Optional[str] = None, timeout: float = 5.0):
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 5.0, compress: bool = True):
         self.base_url = (base_url or os.getenv("BIZIM_BACKEND_URL") or DEFAULT_BACKEND_URL).rstrip("/")
         self.timeout = timeout
+        self.compress = compress
+        # one keep-alive pool shared by the main thread and the uploader thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def create_run(self, command: str, baseline_run_id: Optional[int] = None) -> Dict:
+    def create_run(self, command: str, baseline_run_id: Optional[int] = None, benchmark_id: Optional[int] = None) -> Dict:
         payload: Dict[str, object] = {"command": command}
         if baseline_run_id is not None:
             payload["baseline_run_id"] = baseline_run_id
+        if benchmark_id is not None:
+            payload["benchmark_id"] = benchmark_id
 
         response = self._request("POST", "/runs", json=payload)
         return response.json()
 
     def post_samples(self, run_id: int, samples: List[Dict[str, float]]) -> bool:
+        """False if the batch could not be delivered yet; raises SamplesRejected on a permanent 4xx."""
         if not samples:
             return True
 
-        endpoint = f"/runs/{run_id}/samples"
+        endpoint = f"/runs/{run_id}/samples/columnar"
+        body, headers = self._encode_json(to_columns(samples))
         for attempt in range(MAX_SAMPLE_RETRY_ATTEMPTS):
             try:
-                response = self._request("POST", endpoint, json=samples)
+                response = self._request("POST", endpoint, data=body, headers=headers)
                 if response.status_code in (204, 200):
                     return True
+            except requests.HTTPError as exc:
+                code = exc.response.status_code if exc.response is not None else None
+                if code is not None and 400 <= code < 500 and code not in RETRYABLE_STATUS_CODES:
+                    raise SamplesRejected(f"HTTP {code}") from exc
+                backoff_seconds = 2 ** attempt
+                _log(f"Örnek gönderimi başarısız (deneme {attempt + 1}): {exc}; {backoff_seconds}s sonra yeniden denenecek.")
+                time.sleep(backoff_seconds)
             except requests.RequestException as exc:
                 backoff_seconds = 2 ** attempt
                 _log(f"Örnek gönderimi başarısız (deneme {attempt + 1}): {exc}; {backoff_seconds}s sonra yeniden denenecek.")
                 time.sleep(backoff_seconds)
         return False
 
-    def finish_run(self, run_id: int, exit_code: int) -> Dict:
-        response = self._request("PATCH", f"/runs/{run_id}/finish", json={"exit_code": exit_code})
+    def get_run(self, run_id: int) -> Dict:
+        response = self._request("GET", f"/runs/{run_id}")
+        return response.json()
+
+    def finish_run(self, run_id: int, exit_code: int, totals: Optional[Dict[str, float]] = None) -> Dict:
+        payload: Dict[str, object] = {"exit_code": exit_code}
+        if totals:
+            payload["totals"] = totals
+        response = self._request("PATCH", f"/runs/{run_id}/finish", json=payload)
+        return response.json()
+
+    def create_benchmark(self, command: str, iterations: int, warmup: int) -> Dict:
+        payload = {"command": command, "iterations": iterations, "warmup": warmup}
+        response = self._request("POST", "/benchmarks", json=payload)
         return response.json()
 
-    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+    def get_benchmark(self, benchmark_id: int) -> Dict:
+        response = self._request("GET", f"/benchmarks/{benchmark_id}")
+        return response.json()
+
+    def post_phases(self, run_id: int, phases: List[Dict[str, object]]) -> None:
+        self._request("POST", f"/runs/{run_id}/phases", json=phases)
+
+    def gate(self, run_id: int, baseline: str, budgets: Dict[str, float]) -> Dict:
+        payload = {"current": run_id, "baseline": baseline, "budgets": budgets}
+        response = self._request("POST", "/compare/gate", json=payload)
+        return response.json()
+
+    def import_recording(self, data: bytes) -> Dict:
+        body, headers = self._encode(data, BPA_CONTENT_TYPE)
+        response = self._request("POST", "/runs/import", data=body, headers=headers, timeout=IMPORT_TIMEOUT_SECONDS)
+        return response.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _encode_json(self, payload: object) -> Tuple[bytes, Dict[str, str]]:
+        return self._encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"), "application/json")
+
+    def _encode(self, body: bytes, content_type: str) -> Tuple[bytes, Dict[str, str]]:
+        headers = {"Content-Type": content_type}
+        if self.compress and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
         url = f"{self.base_url}{path}"
         try:
-            response = requests.request(method, url, timeout=self.timeout, **kwargs)
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
             response.raise_for_status()
             return response
         except requests.HTTPError:
@@ -61,6 +153,174 @@ class ApiClient:
             raise
 
 
+class SampleUploader(threading.Thread):
+    """Sends samples to the backend from a background thread.
+
+    The sampling loop only calls :meth:`submit`, which never blocks; batching,
+    retries and the final flush happen on this thread so a slow backend cannot
+    stall the sampling cadence. With a spool every sample is written to disk
+    first and only the acknowledged prefix is marked as sent, so samples that
+    overflow the queue are re-read from the spool instead of being lost.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        api: ApiClient,
+        run_id: int,
+        batch_size: int = BATCH_SIZE,
+        max_queue_size: int = UPLOAD_QUEUE_SIZE,
+        flush_interval: float = UPLOAD_FLUSH_INTERVAL_SECONDS,
+        spool: Optional[SampleSpool] = None,
+    ):
+        super().__init__(name=f"sample-uploader-{run_id}", daemon=True)
+        self.api = api
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.max_pending = max_queue_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.dropped = 0
+        self.rejected = 0
+        self.unsent = 0
+        self._overflow = False
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max_queue_size)
+
+    def submit(self, sample: Dict[str, float]) -> None:
+        start = end = None
+        if self.spool is not None:
+            try:
+                start, end = self.spool.append(sample)
+            except OSError as exc:
+                _log(f"Örnek diske yazılamadı, biriktirme kapatılıyor: {exc}")
+                self.spool = None
+        try:
+            self._queue.put_nowait((sample, start, end))
+        except queue.Full:
+            if end is not None:
+                return  # still in the spool; the sender reads it back from there
+            if self.dropped == 0:
+                _log("Gönderim kuyruğu dolu; backend yanıt vermiyor, yeni örnekler atlanıyor.")
+            self.dropped += 1
+
+    def close(self, timeout: float = UPLOAD_SHUTDOWN_TIMEOUT_SECONDS) -> bool:
+        """Flush what is left and stop the thread; returns True if everything reached the backend."""
+        if self.is_alive():
+            self._queue.put(self._STOP)
+            self.join(timeout)
+            if self.is_alive():
+                _log("Örnek gönderimi zaman aşımına uğradı; kalan örnekler gönderilemedi.")
+                return False
+        if self.rejected:
+            _log(f"{self.rejected} örnek backend tarafından reddedildi ve atlandı.")
+        if self.spool is not None:
+            return self.spool.is_drained()
+        if self.dropped:
+            _log(f"{self.dropped} örnek gönderim kuyruğu dolu olduğu için atlandı.")
+        return self.dropped == 0 and self.unsent == 0
+
+    def run(self) -> None:
+        # With a spool, pending always holds a contiguous slice of it that
+        # starts at the acknowledged offset and ends at next_offset.
+        pending: List[Tuple[Dict[str, float], Optional[int]]] = []
+        next_offset = self.spool.acked if self.spool is not None else 0
+        deadline: Optional[float] = None
+        retrying = False
+        closing = False
+
+        while not closing:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            gap = False
+            while item is not None:
+                if item is self._STOP:
+                    closing = True
+                    break
+                sample, start, end = item  # type: ignore[misc]
+                if end is None:
+                    pending.append((sample, None))
+                elif start == next_offset:
+                    pending.append((sample, end))
+                    next_offset = end
+                elif start > next_offset:
+                    gap = True
+                if len(pending) >= self.batch_size and not retrying:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if self.spool is not None and (gap or closing):
+                next_offset = self._read_spool(pending, next_offset)
+
+            if not pending:
+                continue
+
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + self.flush_interval
+            if closing or now >= deadline or (len(pending) >= self.batch_size and not retrying):
+                try:
+                    delivered = self.api.post_samples(self.run_id, [sample for sample, _ in pending])
+                except SamplesRejected as exc:
+                    # resending cannot succeed; drop the batch so later ones are not held up
+                    if self.rejected == 0:
+                        _log(f"Backend örnek grubunu reddetti ({exc}); reddedilen gruplar atlanacak.")
+                    self.rejected += len(pending)
+                    delivered = True
+                if delivered:
+                    if self.spool is not None:
+                        self.spool.ack(next_offset)
+                    pending.clear()
+                    deadline = None
+                    retrying = False
+                else:
+                    retrying = True
+                    deadline = time.monotonic() + self.flush_interval
+                    if len(pending) > self.max_pending:
+                        next_offset = self._trim(pending, next_offset)
+
+        if pending:
+            _log("Kalan örnekler gönderilemedi.")
+            self.unsent = len(pending)
+
+    def _read_spool(self, pending: List[Tuple[Dict[str, float], Optional[int]]], next_offset: int) -> int:
+        # Samples that did not fit into the queue only exist in the spool.
+        limit = self.max_pending - len(pending)
+        if limit <= 0:
+            return next_offset
+        entries = self.spool.read_pending(start=next_offset, limit=limit)
+        pending.extend(entries)
+        return entries[-1][1] if entries else next_offset
+
+    def _trim(self, pending: List[Tuple[Dict[str, float], Optional[int]]], next_offset: int) -> int:
+        overflow = len(pending) - self.max_pending
+        if self.spool is not None:
+            # keep the oldest samples so acknowledgements stay contiguous; the
+            # newest ones are re-read from the spool once there is room
+            del pending[self.max_pending:]
+            return pending[-1][1]
+        del pending[:overflow]
+        self.dropped += overflow
+        return next_offset
+
+
+def to_columns(samples: List[Dict[str, object]]) -> Dict[str, list]:
+    """Pivot sample dicts into one list per metric for the columnar ingest endpoint."""
+    names = dict.fromkeys(name for sample in samples for name in sample if name != "processes")
+    columns: Dict[str, list] = {name: [sample.get(name) for sample in samples] for name in names}
+    breakdown = [[sample["ts"], sample["processes"]] for sample in samples if sample.get("processes")]
+    if breakdown:
+        columns["processes"] = breakdown
+    return columns
+
+
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
@@ -76,154 +336,721 @@ def build_parser() -> argparse.ArgumentParser:
         description="Komut çalıştırıp CPU/RAM metriklerini backend'e gönderen CLI kaplaması.",
     )
     parser.add_argument("--backend", help="Backend taban URL'si (varsayılan: http://localhost:8000)")
+    parser.add_argument("--no-compress", action="store_true", help="Örnek gövdelerini gzip ile sıkıştırma")
 
     subparsers = parser.add_subparsers(dest="command")
 
     run_parser = subparsers.add_parser("run", help="Komutu performans takibiyle çalıştır")
     run_parser.add_argument("target_command", help="Çalıştırılacak komut (ör. \"maestro test senaryolarim.yml\")")
     run_parser.add_argument("--baseline", type=int, help="Karşılaştırma için baz koşu ID'si (opsiyonel)")
-    run_parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL_SECONDS, help="Örnekleme aralığı (saniye)")
-    run_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Backend'e toplu gönderim boyutu")
+    add_sampling_arguments(run_parser)
+    run_parser.add_argument(
+        "--offline",
+        metavar="DOSYA",
+        help="Backend'e bağlanmadan örnekleri bu .bpa dosyasına yaz; sonra 'upload' ile gönderin",
+    )
+    run_parser.add_argument("--repeat", type=int, default=1, help="Komutu N kez çalıştırıp koşuları tek bir benchmark altında topla")
+    run_parser.add_argument("--warmup", type=int, default=0, help="Ölçülmeden önce atılacak ısınma çalıştırması sayısı")
+    run_parser.add_argument(
+        "--gate",
+        metavar="YAPILANDIRMA",
+        help="Koşu bitince bu JSON dosyasındaki bütçelerle performans kapısını çalıştır; aşılırsa sıfırdan farklı çık",
+    )
     run_parser.set_defaults(func=execute_run)
 
+    replay_parser = subparsers.add_parser("replay", help="Diskte bekleyen örnekleri backend'e gönder")
+    replay_parser.add_argument("--spool-dir", help="Biriktirme klasörü (varsayılan: ~/.bizim-performans-araci/spool)")
+    replay_parser.add_argument("--batch-size", type=int, default=REPLAY_BATCH_SIZE, help="İstek başına gönderilecek örnek sayısı")
+    replay_parser.set_defaults(func=execute_replay)
+
+    matrix_parser = subparsers.add_parser(
+        "matrix",
+        help="Birden çok komutu paralel çalıştır; her komut ayrı bir koşu olarak kaydedilir",
+    )
+    matrix_parser.add_argument("commands", nargs="*", help="Çalıştırılacak komutlar")
+    matrix_parser.add_argument("--file", help="Her satırda bir komut içeren dosya ('#' ile başlayan satırlar atlanır)")
+    matrix_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Aynı anda çalışacak en fazla komut sayısı")
+    matrix_parser.add_argument(
+        "--pin",
+        action="store_true",
+        help="Her paralel işi ayrık bir CPU kümesine sabitle (sched_setaffinity, yalnızca Linux)",
+    )
+    add_sampling_arguments(matrix_parser)
+    matrix_parser.set_defaults(func=execute_matrix)
+
+    mark_parser = subparsers.add_parser(
+        "mark",
+        help="İzlenen komutun içinden bir aşamanın başladığını/bittiğini bildir",
+    )
+    mark_parser.add_argument("kind", choices=MARKER_KINDS, help="begin: aşama başladı, end: aşama bitti")
+    mark_parser.add_argument("phase", help="Aşama adı (boşluksuz, ör. launchApp)")
+    mark_parser.set_defaults(func=execute_mark)
+
+    gate_parser = subparsers.add_parser("gate", help="Bir koşuyu baz koşuyla karşılaştırıp bütçe aşımında hata ver")
+    gate_parser.add_argument("--run", type=int, required=True, help="Denetlenecek koşu ID'si")
+    gate_parser.add_argument("--config", required=True, help="Metrik bütçelerini içeren JSON dosyası")
+    gate_parser.add_argument("--baseline", help="Baz koşu ID'si veya 'latest-success' (varsayılan: yapılandırmadaki değer)")
+    gate_parser.set_defaults(func=execute_gate)
+
+    upload_parser = subparsers.add_parser("upload", help="Çevrimdışı kaydedilen .bpa dosyalarını backend'e aktar")
+    upload_parser.add_argument("files", nargs="+", help="Gönderilecek .bpa dosyaları")
+    upload_parser.set_defaults(func=execute_upload)
+
     return parser
 
 
+def add_sampling_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by every subcommand that samples a command."""
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL_SECONDS, help="Örnekleme aralığı (saniye)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Backend'e toplu gönderim boyutu")
+    parser.add_argument(
+        "--collector",
+        choices=COLLECTOR_CHOICES,
+        default="auto",
+        help=(
+            "Metrik toplayıcı: Linux'ta /proc okuyan 'procfs', diğer platformlarda 'psutil' (varsayılan: auto); "
+            "'cgroup' komutu geçici bir cgroup v2 grubunda çalıştırıp CPU, bellek zirvesi ve G/Ç'yi tam sayar"
+        ),
+    )
+    parser.add_argument(
+        "--top-processes",
+        type=int,
+        default=DEFAULT_TOP_PROCESSES,
+        help="Her örnekte CPU ve RAM'e göre en yoğun N süreci ayrıca kaydet (0: kapalı)",
+    )
+    parser.add_argument(
+        "--extended-metrics",
+        action="store_true",
+        help="Disk G/Ç, bağlam değişimi, thread, dosya tanımlayıcı ve USS/PSS metriklerini de topla",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Metrikler değişirken --interval ile hızlı, sabitken --max-interval'e kadar seyrek örnekle",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=DEFAULT_MAX_INTERVAL_SECONDS,
+        help="Uyarlamalı modda en uzun örnekleme aralığı (saniye)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Uyarlamalı modda değişmemiş sayılan göreli fark; bu sınırdaki örnekler birleştirilir (varsayılan: 0.05)",
+    )
+    parser.add_argument("--spool-dir", help="Gönderilmemiş örneklerin biriktirileceği klasör (varsayılan: ~/.bizim-performans-araci/spool)")
+    parser.add_argument("--no-spool", action="store_true", help="Örnekleri diske biriktirme")
+
+
 def execute_run(args: argparse.Namespace) -> None:
-    api = ApiClient(args.backend)
+    repeat = max(args.repeat, 1)
+    warmup = max(args.warmup, 0)
+    if args.offline:
+        if repeat > 1 or warmup or args.gate:
+            _log("--offline, --repeat/--warmup/--gate ile birlikte kullanılamaz.")
+            sys.exit(2)
+        execute_offline_run(args)
+        return
+    if args.gate and (repeat > 1 or warmup):
+        _log("--gate tek bir koşu için kullanılabilir; --repeat/--warmup ile birlikte kullanılamaz.")
+        sys.exit(2)
+
+    gate_config = load_gate_config(args.gate) if args.gate else None
+    api = ApiClient(args.backend, compress=not args.no_compress)
+    if repeat == 1 and not warmup:
+        run_id, exit_code = perform_run(api, args)
+        if gate_config is not None:
+            if exit_code != 0:
+                _log("Komut başarısız olduğu için performans kapısı çalıştırılmadı.")
+                sys.exit(exit_code or 1)
+            sys.exit(run_gate(api, run_id, gate_config["baseline"], gate_config["budgets"]))
+        return
+
     command = args.target_command
-    _log(f"Komut için koşu oluşturuluyor: {command}")
+    try:
+        benchmark = api.create_benchmark(command, iterations=repeat, warmup=warmup)
+    except requests.RequestException:
+        _log("Benchmark oluşturulamadı; çıkılıyor.")
+        sys.exit(1)
+    benchmark_id = benchmark["id"]
+    _log(f"Benchmark #{benchmark_id}: {warmup} ısınma + {repeat} ölçülen çalıştırma.")
+
+    for index in range(warmup):
+        exit_code = subprocess.call(command, shell=True)
+        _log(f"Isınma {index + 1}/{warmup} bitti; çıkış kodu {exit_code} (kaydedilmedi).")
+    for index in range(repeat):
+        _log(f"Çalıştırma {index + 1}/{repeat}")
+        if perform_run(api, args, benchmark_id=benchmark_id)[1] is None:
+            _log("Benchmark yarıda kesildi; tamamlanan çalıştırmalar özetleniyor.")
+            break
 
     try:
-        creation = api.create_run(command, baseline_run_id=args.baseline)
+        log_benchmark_summary(api.get_benchmark(benchmark_id))
     except requests.RequestException:
-        _log("Koşu başlatılamadı; çıkılıyor.")
+        _log("Benchmark özeti alınamadı.")
+
+
+def perform_run(
+    api: ApiClient, args: argparse.Namespace, benchmark_id: Optional[int] = None
+) -> Tuple[int, Optional[int]]:
+    """Run the command once under monitoring; returns the run id and exit code (None if interrupted)."""
+    command = args.target_command
+    run_id, spool, uploader = open_run(api, command, args, baseline_run_id=args.baseline, benchmark_id=benchmark_id)
+    if run_id is None:
         sys.exit(1)
 
+    markers = start_marker_listener()
+    process, scope = spawn_monitored(command, args.collector, env=markers.environment() if markers else None)
+    exit_code = 0
+    interrupted = False
+    try:
+        exit_code = monitor_from_args(process, uploader, args, scope=scope)
+    except KeyboardInterrupt:
+        _log("Kullanıcı tarafından kesildi; süreç sonlandırılıyor...")
+        interrupted = True
+        process.terminate()
+        exit_code = process.wait()
+    finally:
+        phases = markers.close() if markers else None
+        close_run(api, run_id, uploader, spool, exit_code, phases=phases, totals=release_cgroup(scope))
+
+    return run_id, None if interrupted else exit_code
+
+
+def open_run(
+    api: ApiClient,
+    command: str,
+    args: argparse.Namespace,
+    baseline_run_id: Optional[int] = None,
+    benchmark_id: Optional[int] = None,
+) -> Tuple[Optional[int], Optional[SampleSpool], Optional[SampleUploader]]:
+    """Create the backend run and start its spool and uploader; run id is None on failure."""
+    _log(f"Komut için koşu oluşturuluyor: {command}")
+    try:
+        creation = api.create_run(command, baseline_run_id=baseline_run_id, benchmark_id=benchmark_id)
+    except requests.RequestException:
+        _log("Koşu başlatılamadı; çıkılıyor.")
+        return None, None, None
+
     run_id = creation["id"]
     _log(f"Koşu #{run_id} başlatıldı ({creation['started_at']}).")
 
-    process = subprocess.Popen(command, shell=True)
+    spool = None
+    if not args.no_spool:
+        try:
+            spool = SampleSpool(spool_directory(args.spool_dir), run_id)
+        except (OSError, SpoolLocked) as exc:
+            _log(f"Örnek biriktirme dosyası açılamadı, biriktirme olmadan devam ediliyor: {exc}")
+
+    uploader = SampleUploader(api, run_id, batch_size=max(args.batch_size, 1), spool=spool)
+    uploader.start()
+    return run_id, spool, uploader
+
+
+def close_run(
+    api: ApiClient,
+    run_id: int,
+    uploader: SampleUploader,
+    spool: Optional[SampleSpool],
+    exit_code: int,
+    phases: Optional[List[Dict[str, object]]] = None,
+    totals: Optional[Dict[str, float]] = None,
+) -> None:
+    delivered = uploader.close()
+    if spool is not None and not delivered:
+        # finishing now would make the backend reject the spooled samples
+        spool.record_finish(exit_code, phases, totals)
+        spool.close()
+        _log(f"Gönderilemeyen örnekler {spool.path} dosyasında; 'bizim-performans-araci replay' ile gönderin.")
+        return
+
+    try:
+        if phases:
+            api.post_phases(run_id, phases)
+        summary = api.finish_run(run_id, exit_code, totals)
+        _log(f"Koşu #{run_id} tamamlandı; çıkış kodu {exit_code}.")
+        log_summary(summary)
+        if spool is not None:
+            spool.remove()
+    except requests.RequestException:
+        _log("Koşu bitişi backend'e bildirilemedi.")
+        if spool is not None:
+            spool.record_finish(exit_code, phases, totals)
+            spool.close()
+
+
+def spawn_monitored(
+    command: str,
+    collector_kind: str,
+    env: Optional[Dict[str, str]] = None,
+    cpus: Optional[set] = None,
+) -> Tuple[subprocess.Popen, Optional[CgroupScope]]:
+    """Start the command, inside its own cgroup when ``--collector cgroup`` is usable."""
+    scope = None
+    if collector_kind == "cgroup":
+        try:
+            scope = CgroupScope.create()
+        except CgroupUnavailable as exc:
+            _log(f"cgroup kullanılamıyor ({exc}); süreç ağacı örneklemesine dönülüyor.")
+
+    process = spawn_pinned(scope.wrap(command) if scope else command, cpus, env=env)
+    if scope is not None and not scope.wait_attached(process.pid):
+        _log("Süreç cgroup'a taşınamadı; süreç ağacı örneklemesine dönülüyor.")
+        scope.remove()
+        scope = None
+    return process, scope
+
+
+def release_cgroup(scope: Optional[CgroupScope]) -> Optional[Dict[str, float]]:
+    if scope is None:
+        return None
+    totals = scope.totals()
+    if not scope.remove():
+        _log(f"{scope.path} içinde hâlâ süreç var; cgroup silinmedi.")
+    return totals
+
+
+def start_marker_listener() -> Optional[MarkerListener]:
+    """Open the phase marker socket for the child; None where Unix sockets are unavailable."""
+    try:
+        listener = MarkerListener()
+    except (AttributeError, OSError) as exc:
+        _log(f"Aşama işaretçisi soketi açılamadı; aşamalar kaydedilmeyecek: {exc}")
+        return None
+    listener.start()
+    return listener
+
+
+def execute_offline_run(args: argparse.Namespace) -> None:
+    command = args.target_command
+    path = Path(args.offline)
+    try:
+        recorder = OfflineRecorder(path, command, baseline_run_id=args.baseline)
+    except OSError as exc:
+        _log(f"Kayıt dosyası açılamadı: {exc}")
+        sys.exit(1)
+    _log(f"Çevrimdışı kayıt başlatıldı: {path}")
+
+    markers = start_marker_listener()
+    process, scope = spawn_monitored(command, args.collector, env=markers.environment() if markers else None)
     exit_code = 0
-    buffer: List[Dict[str, float]] = []
     try:
-        exit_code = monitor_process(
-            process,
-            run_id,
-            api,
-            buffer=buffer,
-            interval=max(args.interval, 0.1),
-            batch_size=max(args.batch_size, 1),
-        )
+        exit_code = monitor_from_args(process, recorder, args, scope=scope)
     except KeyboardInterrupt:
         _log("Kullanıcı tarafından kesildi; süreç sonlandırılıyor...")
         process.terminate()
         exit_code = process.wait()
     finally:
-        if buffer:
-            if api.post_samples(run_id, list(buffer)):
-                buffer.clear()
-            else:
-                _log("Kalan örnekler gönderilemedi.")
+        recorder.finish(exit_code, markers.close() if markers else None, release_cgroup(scope))
+        _log(f"{recorder.count} örnek {path} dosyasına yazıldı; çıkış kodu {exit_code}.")
+
 
+def sampling_settings(args: argparse.Namespace) -> Tuple[float, Optional[AdaptiveSettings]]:
+    interval = max(args.interval, MIN_SAMPLE_INTERVAL_SECONDS)
+    adaptive = None
+    if args.adaptive:
+        adaptive = AdaptiveSettings(max_interval=max(args.max_interval, interval), tolerance=max(args.tolerance, 0.0))
+    return interval, adaptive
+
+
+def monitor_from_args(
+    process: subprocess.Popen, sink, args: argparse.Namespace, scope: Optional[CgroupScope] = None
+) -> int:
+    interval, adaptive = sampling_settings(args)
+    return monitor_process(
+        process,
+        sink,
+        interval=interval,
+        collector_kind=args.collector,
+        top_processes=max(args.top_processes, 0),
+        extended_metrics=args.extended_metrics,
+        adaptive=adaptive,
+        scope=scope,
+    )
+
+
+class MatrixJob:
+    """One command of a matrix run and the state the shared sampling loop keeps for it."""
+
+    def __init__(
+        self,
+        command: str,
+        run_id: int,
+        spool: Optional[SampleSpool],
+        uploader: SampleUploader,
+        process: subprocess.Popen,
+        sampler: Optional[Sampler],
+        markers: Optional[MarkerListener],
+        scope: Optional[CgroupScope],
+    ):
+        self.command = command
+        self.run_id = run_id
+        self.spool = spool
+        self.uploader = uploader
+        self.process = process
+        self.sampler = sampler
+        self.markers = markers
+        self.scope = scope
+
+
+def execute_matrix(args: argparse.Namespace) -> None:
+    commands = list(args.commands)
+    if args.file:
+        try:
+            with open(args.file, encoding="utf-8") as handle:
+                commands.extend(line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#"))
+        except OSError as exc:
+            _log(f"Komut dosyası okunamadı: {exc}")
+            sys.exit(2)
+    if not commands:
+        _log("Çalıştırılacak komut yok.")
+        sys.exit(2)
+
+    jobs = max(1, min(args.jobs, len(commands)))
+    cpu_sets = plan_cpu_sets(jobs) if args.pin else [None] * jobs
+    api = ApiClient(args.backend, compress=not args.no_compress)
+    interval, adaptive = sampling_settings(args)
+    _log(f"{len(commands)} komut en fazla {jobs} paralel işle çalıştırılacak.")
+
+    pending = deque(commands)
+    free_slots = list(range(jobs))
+    active: Dict[int, MatrixJob] = {}
+    failures = 0
+    # closing a run waits for its uploader, so it happens off the sampling loop
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="matrix-finish") as finisher:
+        finishing = []
         try:
-            summary = api.finish_run(run_id, exit_code)
-            _log(f"Koşu #{run_id} tamamlandı; çıkış kodu {exit_code}.")
-            if summary.get("stats"):
-                stats = summary["stats"]
-                avg_cpu = stats.get("avg_cpu")
-                duration = stats.get("duration_s")
-                _log(
-                    f"Özet - ort. CPU: {avg_cpu:.1f}% | süre: {duration:.1f}s"
-                    if avg_cpu is not None and duration is not None
-                    else "Özet bilgisi mevcut değil."
+            while pending or active:
+                while pending and free_slots:
+                    slot = free_slots.pop(0)
+                    job = start_matrix_job(api, pending.popleft(), args, cpu_sets[slot], interval, adaptive)
+                    if job is None:
+                        failures += 1
+                        free_slots.insert(0, slot)
+                    else:
+                        active[slot] = job
+                if not active:
+                    continue
+
+                samplers = [job.sampler for job in active.values() if job.sampler is not None]
+                due = min((sampler.next_due for sampler in samplers), default=time.monotonic())
+                delay = min(due - time.monotonic(), MATRIX_POLL_SECONDS)
+                if delay > 0:
+                    time.sleep(delay)
+
+                now = time.monotonic()
+                for slot, job in list(active.items()):
+                    if job.process.poll() is not None:
+                        exit_code, phases, totals = finish_matrix_job(job)
+                        if exit_code != 0:
+                            failures += 1
+                        finishing.append(
+                            finisher.submit(
+                                close_run, api, job.run_id, job.uploader, job.spool, exit_code, phases, totals
+                            )
+                        )
+                        del active[slot]
+                        free_slots.append(slot)
+                    elif job.sampler is not None and job.sampler.next_due <= now:
+                        job.sampler.tick()
+        except KeyboardInterrupt:
+            _log("Kullanıcı tarafından kesildi; süreçler sonlandırılıyor...")
+            for job in active.values():
+                job.process.terminate()
+            for job in active.values():
+                exit_code, phases, totals = finish_matrix_job(job)
+                finishing.append(
+                    finisher.submit(close_run, api, job.run_id, job.uploader, job.spool, exit_code, phases, totals)
                 )
-        except requests.RequestException:
-            _log("Koşu bitişi backend'e bildirilemedi.")
+            failures += len(active) + len(pending)
+        for future in finishing:
+            future.result()
 
+    if failures:
+        _log(f"{failures}/{len(commands)} komut başarısız oldu ya da çalıştırılamadı.")
+        sys.exit(1)
 
-def monitor_process(
-    process: subprocess.Popen,
-    run_id: int,
+
+def plan_cpu_sets(jobs: int) -> List[Optional[set]]:
+    """Split the CPUs we may run on into ``jobs`` disjoint, equally sized sets."""
+    if not hasattr(os, "sched_getaffinity"):
+        _log("Bu platformda CPU sabitleme desteklenmiyor; --pin yok sayılıyor.")
+        return [None] * jobs
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < jobs:
+        _log(f"{len(cpus)} CPU {jobs} işe ayrılamıyor; --pin yok sayılıyor.")
+        return [None] * jobs
+    size = len(cpus) // jobs
+    return [set(cpus[index * size : (index + 1) * size]) for index in range(jobs)]
+
+
+def start_matrix_job(
     api: ApiClient,
-    buffer: List[Dict[str, float]],
+    command: str,
+    args: argparse.Namespace,
+    cpus: Optional[set],
     interval: float,
-    batch_size: int,
-) -> int:
+    adaptive: Optional[AdaptiveSettings],
+) -> Optional[MatrixJob]:
+    run_id, spool, uploader = open_run(api, command, args)
+    if run_id is None:
+        return None
+
+    markers = start_marker_listener()
+    process, scope = spawn_monitored(command, args.collector, env=markers.environment() if markers else None, cpus=cpus)
     try:
-        proc = psutil.Process(process.pid)
-    except psutil.NoSuchProcess:
-        return process.wait()
+        collector = create_collector(
+            process.pid,
+            args.collector,
+            top_n=max(args.top_processes, 0),
+            extended=args.extended_metrics,
+            scope=scope,
+        )
+        sampler = Sampler(collector, uploader, interval, adaptive=adaptive)
+    except (psutil.NoSuchProcess, OSError):
+        sampler = None
+    return MatrixJob(command, run_id, spool, uploader, process, sampler, markers, scope)
 
-    primed: Set[int] = set()
-    prime_process(proc, primed)
 
-    while True:
-        if process.poll() is not None:
-            break
+def spawn_pinned(command: str, cpus: Optional[set], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    if cpus is None:
+        return subprocess.Popen(command, shell=True, env=env)
+    # On Linux affinity is per thread and inherited by fork, so pinning the
+    # calling thread around Popen pins the child from its first instruction
+    # without a preexec_fn (which is unsafe with the uploader threads running).
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        return subprocess.Popen(command, shell=True, env=env)
+    finally:
+        os.sched_setaffinity(0, previous)
 
-        time.sleep(interval)
-        sample = collect_sample(proc, primed)
-        if sample:
-            buffer.append(sample)
-        if len(buffer) >= batch_size:
-            flush_buffer(api, run_id, buffer)
 
-    # capture one more snapshot after the process stops to get final memory usage
-    final_sample = collect_sample(proc, primed)
-    if final_sample:
-        buffer.append(final_sample)
-        flush_buffer(api, run_id, buffer)
+def finish_matrix_job(job: MatrixJob) -> Tuple[int, Optional[List[Dict[str, object]]], Optional[Dict[str, float]]]:
+    exit_code = job.process.wait()
+    if job.sampler is not None:
+        # one more snapshot after the process stops, as in monitor_process
+        job.sampler.tick()
+        job.sampler.flush()
+    return exit_code, job.markers.close() if job.markers else None, release_cgroup(job.scope)
 
-    return process.wait()
+
+def execute_mark(args: argparse.Namespace) -> None:
+    # outside a monitored run this is a no-op so scripts work either way
+    if not send_marker(args.kind, args.phase):
+        _log("İzlenen bir koşu içinde değil; işaretçi yok sayıldı.")
+
+
+def execute_gate(args: argparse.Namespace) -> None:
+    config = load_gate_config(args.config)
+    api = ApiClient(args.backend, compress=not args.no_compress)
+    sys.exit(run_gate(api, args.run, args.baseline or config["baseline"], config["budgets"]))
+
+
+def load_gate_config(path: str) -> Dict:
+    """Read ``{"baseline": ..., "budgets": {"p95_cpu": 10, ...}}``; budgets are allowed increases in percent."""
+    try:
+        with open(path, encoding="utf-8") as handle:
+            config = json.load(handle)
+    except (OSError, ValueError) as exc:
+        _log(f"Kapı yapılandırması okunamadı: {exc}")
+        sys.exit(2)
+    budgets = config.get("budgets") if isinstance(config, dict) else None
+    if not isinstance(budgets, dict) or not budgets:
+        _log("Kapı yapılandırmasında 'budgets' bulunmalı (ör. {\"p95_cpu\": 10}).")
+        sys.exit(2)
+    return {"baseline": str(config.get("baseline", "latest-success")), "budgets": budgets}
 
 
-def collect_sample(proc: psutil.Process, primed: Set[int]) -> Optional[Dict[str, float]]:
-    processes = [proc]
+def run_gate(api: ApiClient, run_id: int, baseline: str, budgets: Dict[str, float]) -> int:
+    """Check ``run_id`` against its budgets; returns the process exit code (0 pass, 1 fail, 2 error)."""
     try:
-        processes.extend(proc.children(recursive=True))
-    except (psutil.Error, Exception):
-        pass
-
-    total_cpu = 0.0
-    total_rss = 0
-    measured = False
-    timestamp = time.time()
-
-    for p in processes:
-        if p.pid not in primed:
-            prime_process(p, primed)
+        result = api.gate(run_id, baseline, budgets)
+    except requests.RequestException:
+        _log("Performans kapısı değerlendirilemedi.")
+        return GATE_ERROR_EXIT_CODE
+
+    _log(f"Performans kapısı: koşu #{result['current_run_id']} ↔ baz koşu #{result['baseline_run_id']}")
+    for metric in result["metrics"]:
+        if metric["budget_pct"] is None:
             continue
+        if metric["delta"] is None:
+            _log(f"  KALDI {metric['metric']}: veri yok")
+            continue
+        verdict = "GEÇTİ" if metric["passed"] else "KALDI"
+        relative = metric["relative_pct"]
+        change = f"{relative:+.1f}%" if relative is not None else f"{metric['delta']:+.2f}"
+        _log(
+            f"  {verdict} {metric['metric']}: {metric['baseline']:.2f} → {metric['current']:.2f} "
+            f"({change}, bütçe %{metric['budget_pct']:g})"
+        )
+    if result["passed"]:
+        _log("Performans kapısı geçildi.")
+        return 0
+    _log("Performans kapısı başarısız: bütçe aşıldı veya ölçülemedi.")
+    return GATE_FAILED_EXIT_CODE
+
+
+def execute_upload(args: argparse.Namespace) -> None:
+    api = ApiClient(args.backend, compress=not args.no_compress)
+    failed = 0
+    for name in args.files:
+        path = Path(name)
         try:
-            cpu = p.cpu_percent(interval=None)
-            mem = p.memory_info().rss
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            header = read_header(path)
+            data = path.read_bytes()
+        except (OSError, ValueError) as exc:
+            _log(f"{path} okunamadı: {exc}")
+            failed += 1
             continue
-        total_cpu += cpu
-        total_rss += mem
-        measured = True
+        try:
+            summary = api.import_recording(data)
+        except requests.RequestException:
+            _log(f"{path} gönderilemedi.")
+            failed += 1
+            continue
+        _log(f"{path} -> koşu #{summary['id']} ({header.get('command')})")
+        log_summary(summary)
 
-    if not measured:
-        return None
+    if failed:
+        _log(f"{failed} dosya aktarılamadı.")
+        sys.exit(1)
+
+
+def execute_replay(args: argparse.Namespace) -> None:
+    api = ApiClient(args.backend, compress=not args.no_compress)
+    directory = spool_directory(args.spool_dir)
+    run_ids = list_spooled_runs(directory)
+    if not run_ids:
+        _log(f"{directory} içinde bekleyen örnek yok.")
+        return
 
-    rss_mb = round(total_rss / (1024 * 1024), 2)
-    return {"ts": timestamp, "cpu_percent": round(total_cpu, 2), "rss_mb": rss_mb}
+    failed = 0
+    for run_id in run_ids:
+        try:
+            spool = SampleSpool(directory, run_id)
+        except SpoolLocked:
+            _log(f"Koşu #{run_id} hâlâ çalışıyor; atlanıyor.")
+            continue
+        try:
+            if not replay_spool(api, spool, batch_size=max(args.batch_size, 1)):
+                failed += 1
+        finally:
+            spool.close()
+
+    if failed:
+        _log(f"{failed} koşunun örnekleri gönderilemedi; daha sonra tekrar deneyin.")
+        sys.exit(1)
 
 
-def prime_process(proc: psutil.Process, primed: Set[int]) -> None:
+def replay_spool(api: ApiClient, spool: SampleSpool, batch_size: int) -> bool:
+    run_id = spool.run_id
     try:
-        proc.cpu_percent(interval=None)
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return
-    primed.add(proc.pid)
+        run = api.get_run(run_id)
+    except requests.HTTPError as exc:
+        if exc.response is not None and exc.response.status_code == 404:
+            _log(f"Koşu #{run_id} backend'de bulunamadı; biriktirilen örnekler siliniyor.")
+            spool.remove()
+            return True
+        return False
+    except requests.RequestException:
+        return False
 
+    if run.get("status") != "running":
+        _log(f"Koşu #{run_id} zaten tamamlanmış; biriktirilen örnekler eklenemez, siliniyor.")
+        spool.remove()
+        return True
 
-def flush_buffer(api: ApiClient, run_id: int, buffer: List[Dict[str, float]]) -> None:
-    if not buffer:
-        return
-    payload = list(buffer)
-    if api.post_samples(run_id, payload):
-        buffer.clear()
+    sent = rejected = 0
+    while True:
+        entries = spool.read_pending(limit=batch_size)
+        if not entries:
+            break
+        try:
+            if not api.post_samples(run_id, [sample for sample, _ in entries]):
+                _log(f"Koşu #{run_id} için örnek gönderimi başarısız ({sent} örnek gönderildi).")
+                return False
+            sent += len(entries)
+        except SamplesRejected:
+            rejected += len(entries)
+        spool.ack(entries[-1][1])
+    if rejected:
+        _log(f"Koşu #{run_id}: backend {rejected} örneği reddetti; bunlar atlandı.")
+
+    record = spool.finish_record()
+    if record is not None:
+        try:
+            if record["phases"]:
+                api.post_phases(run_id, record["phases"])
+            api.finish_run(run_id, record["exit_code"], record["totals"])
+        except requests.RequestException:
+            return False
+    else:
+        _log(f"Koşu #{run_id} için çıkış kodu kaydı yok; koşu backend'de açık kalacak.")
+    spool.remove()
+    _log(f"Koşu #{run_id}: {sent} örnek gönderildi.")
+    return True
+
+
+def log_summary(summary: Dict) -> None:
+    if summary.get("stats"):
+        stats = summary["stats"]
+        avg_cpu = stats.get("avg_cpu")
+        duration = stats.get("duration_s")
+        _log(
+            f"Özet - ort. CPU: {avg_cpu:.1f}% | süre: {duration:.1f}s"
+            if avg_cpu is not None and duration is not None
+            else "Özet bilgisi mevcut değil."
+        )
+        if stats.get("cpu_time_s") is not None:
+            peak = stats.get("peak_memory_mb")
+            peak_text = f" | bellek zirvesi: {peak:.1f} MB" if peak is not None else ""
+            _log(f"cgroup - toplam CPU zamanı: {stats['cpu_time_s']:.2f}s{peak_text}")
+
+
+def log_benchmark_summary(benchmark: Dict) -> None:
+    labels = (("duration_s", "süre", "s"), ("avg_cpu", "ort. CPU", "%"), ("p95_rss_mb", "p95 RAM", " MB"))
+    for field, label, unit in labels:
+        summary = benchmark.get(field)
+        if not summary:
+            continue
+        stddev = summary.get("stddev")
+        spread = f" ± {stddev:.2f}" if stddev is not None else ""
+        _log(
+            f"{label}: {summary['mean']:.2f}{unit}{spread} "
+            f"(%95 GA: {summary['ci_low']:.2f}-{summary['ci_high']:.2f}, n={summary['n']})"
+        )
+
+
+def monitor_process(
+    process: subprocess.Popen,
+    sink: "SampleUploader | OfflineRecorder",
+    interval: float,
+    collector_kind: str = "auto",
+    top_processes: int = 0,
+    extended_metrics: bool = False,
+    adaptive: Optional[AdaptiveSettings] = None,
+    scope: Optional[CgroupScope] = None,
+) -> int:
+    try:
+        collector = create_collector(
+            process.pid, collector_kind, top_n=top_processes, extended=extended_metrics, scope=scope
+        )
+    except (psutil.NoSuchProcess, OSError):
+        return process.wait()
+
+    sampler = Sampler(collector, sink, interval, adaptive=adaptive)
+    while process.poll() is None:
+        sampler.wait()
+        sampler.tick()
+
+    # capture one more snapshot after the process stops to get final memory usage
+    sampler.tick()
+    sampler.flush()
+
+    return process.wait()
 
 
 def _log(message: str) -> None:
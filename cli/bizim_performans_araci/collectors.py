@@ -0,0 +1,474 @@
+import hashlib
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import psutil
+
+PROCFS_ROOT = "/proc"
+PROCFS_RESCAN_SECONDS = 1.0
+COLLECTOR_CHOICES = ("auto", "procfs", "psutil", "cgroup")
+DEFAULT_TOP_PROCESSES = 5
+# cumulative per-process counters, reported as deltas over the sample interval
+EXTENDED_COUNTERS = ("read_bytes", "write_bytes", "ctx_switches_voluntary", "ctx_switches_involuntary")
+
+
+class PsutilCollector:
+    """Portable collector: walks the process tree with psutil on every tick."""
+
+    def __init__(self, pid: int, top_n: int = 0, extended: bool = False):
+        self.proc = psutil.Process(pid)
+        self.top_n = top_n
+        self.extended = extended
+        self.primed: Set[int] = set()
+        self._identities: Dict[Tuple[int, float], Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[int, float], Dict[str, int]] = {}
+        prime_process(self.proc, self.primed)
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        wants_breakdown = self.top_n > 0 or self.extended
+        breakdown: Optional[List[Tuple[psutil.Process, float, int]]] = [] if wants_breakdown else None
+        sample = collect_sample(self.proc, self.primed, breakdown=breakdown)
+        if sample and self.extended:
+            sample.update(self._extended_metrics([proc for proc, _, _ in breakdown]))
+        if sample and breakdown and self.top_n > 0:
+            sample["processes"] = [
+                describe_process(pid, *self._identify(proc), cpu, rss)
+                for proc, pid, cpu, rss in top_processes(
+                    [(proc, proc.pid, cpu, rss) for proc, cpu, rss in breakdown], self.top_n
+                )
+            ]
+        return sample
+
+    def _identify(self, proc: psutil.Process) -> Tuple[str, str]:
+        try:
+            key = (proc.pid, proc.create_time())
+            if key not in self._identities:
+                self._identities[key] = (proc.name(), cmdline_hash(proc.cmdline()))
+            return self._identities[key]
+        except psutil.Error:
+            return "?", cmdline_hash([])
+
+    def _extended_metrics(self, processes: List[psutil.Process]) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        counters: Dict[Tuple[int, float], Dict[str, int]] = {}
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    key = (proc.pid, proc.create_time())
+                    current: Dict[str, int] = {}
+                    if hasattr(proc, "io_counters"):
+                        io = proc.io_counters()
+                        current["read_bytes"] = io.read_bytes
+                        current["write_bytes"] = io.write_bytes
+                    ctx = proc.num_ctx_switches()
+                    current["ctx_switches_voluntary"] = ctx.voluntary
+                    current["ctx_switches_involuntary"] = ctx.involuntary
+                    _add(totals, "num_threads", proc.num_threads())
+                    if hasattr(proc, "num_fds"):
+                        _add(totals, "num_fds", proc.num_fds())
+                    memory = proc.memory_full_info()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            _add(totals, "uss_mb", getattr(memory, "uss", None))
+            _add(totals, "pss_mb", getattr(memory, "pss", None))
+            counters[key] = current
+            previous = self._counters.get(key, {})
+            for name, value in current.items():
+                _add(totals, name, max(value - previous.get(name, 0), 0))
+        self._counters = counters
+        return finalize_extended(totals)
+
+
+class _ProcState:
+    __slots__ = ("starttime", "jiffies", "child_jiffies", "seen_at", "identity", "counters")
+
+    def __init__(self, starttime: int, seen_at: float):
+        self.starttime = starttime
+        self.jiffies = 0
+        self.child_jiffies = 0
+        self.seen_at = seen_at
+        self.identity: Optional[Tuple[str, str]] = None
+        self.counters: Dict[str, int] = {}
+
+
+class ProcfsCollector:
+    """Linux collector that reads ``/proc/<pid>/stat`` directly.
+
+    The tree is cached as a pid -> parent map: each tick reads one ``stat``
+    file per tracked process and the ``children`` file of its main thread to
+    pick up new children; all of ``/proc`` is scanned only every
+    ``rescan_interval`` seconds to catch processes forked from other threads
+    (on kernels without ``children`` it is the only way new processes are
+    found). CPU is computed from raw jiffies deltas, including the ``cutime``/``cstime`` of reaped children so
+    short-lived processes that exit between ticks are still counted.
+
+    With ``extended`` it also reads ``io``, ``status``, ``smaps_rollup`` and
+    ``fd/`` of every tracked process, which costs noticeably more per tick.
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        top_n: int = 0,
+        extended: bool = False,
+        rescan_interval: float = PROCFS_RESCAN_SECONDS,
+    ):
+        self.root_pid = pid
+        self.top_n = top_n
+        self.extended = extended
+        self.rescan_interval = rescan_interval
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._parents: Dict[int, int] = {}
+        self._states: Dict[int, _ProcState] = {}
+        self._last_rescan = float("-inf")
+        self._children_supported = os.path.exists(f"{PROCFS_ROOT}/{pid}/task/{pid}/children")
+        self._last_tick: Optional[float] = None
+        if read_proc_stat(pid) is None:
+            raise psutil.NoSuchProcess(pid)
+        self._parents[pid] = 0
+        self.sample()  # establishes the baseline, like psutil's priming call
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        now = _boot_clock()
+        timestamp = time.time()
+        if now - self._last_rescan >= self.rescan_interval:
+            self._rescan()
+            self._last_rescan = now
+        elif self._children_supported:
+            self._discover_children()
+
+        total_jiffies = 0
+        total_rss_pages = 0
+        measured = False
+        breakdown: List[Tuple[_ProcState, int, int, int]] = []
+        extended: Dict[str, float] = {}
+        for pid in list(self._parents):
+            stat = read_proc_stat(pid)
+            if stat is None:
+                continue
+            state = self._states.get(pid)
+            if state is not None and stat.starttime != state.starttime:
+                # pid was reused; the old process is gone
+                total_jiffies -= state.jiffies + state.child_jiffies
+                state = None
+            if state is None:
+                state = _ProcState(stat.starttime, now)
+                self._states[pid] = state
+            if state.identity is None and self.top_n > 0:
+                state.identity = (stat.comm, "")
+            own_delta = stat.jiffies - state.jiffies
+            total_jiffies += own_delta + (stat.child_jiffies - state.child_jiffies)
+            total_rss_pages += stat.rss_pages
+            if self.top_n > 0:
+                breakdown.append((state, pid, own_delta, stat.rss_pages))
+            if self.extended:
+                _add(extended, "num_threads", stat.num_threads)
+                self._read_extended(pid, state, extended)
+            state.jiffies = stat.jiffies
+            state.child_jiffies = stat.child_jiffies
+            state.seen_at = now
+            measured = True
+
+        # a vanished process' final times are folded into its parent's cutime;
+        # subtract what we already counted for it
+        for pid in [pid for pid, state in self._states.items() if state.seen_at < now]:
+            total_jiffies -= self._states[pid].jiffies + self._states[pid].child_jiffies
+            self._forget(pid)
+
+        previous_tick, self._last_tick = self._last_tick, now
+        if not measured or previous_tick is None:
+            return None
+
+        elapsed = max(now - previous_tick, 1e-6)
+        cpu_percent = max(total_jiffies, 0) / self._clock_ticks / elapsed * 100.0
+        rss_mb = round(total_rss_pages * self._page_size / (1024 * 1024), 2)
+        sample: Dict[str, object] = {"ts": timestamp, "cpu_percent": round(cpu_percent, 2), "rss_mb": rss_mb}
+        if self.extended:
+            sample.update(finalize_extended(extended))
+        if breakdown:
+            jiffies_to_percent = 100.0 / self._clock_ticks / elapsed
+            sample["processes"] = [
+                describe_process(pid, *self._identify(pid, state), delta * jiffies_to_percent, rss_pages * self._page_size)
+                for state, pid, delta, rss_pages in top_processes(breakdown, self.top_n)
+            ]
+        return sample
+
+    def _identify(self, pid: int, state: _ProcState) -> Tuple[str, str]:
+        name, digest = state.identity or ("?", "")
+        if not digest:
+            # cmdline is read once per process, and only for processes in the top-N
+            try:
+                with open(f"{PROCFS_ROOT}/{pid}/cmdline", "rb") as handle:
+                    args = handle.read().rstrip(b"\0").split(b"\0")
+            except OSError:
+                args = []
+            digest = cmdline_hash([arg.decode("utf-8", "replace") for arg in args if arg])
+            state.identity = (name, digest)
+        return name, digest
+
+    def _read_extended(self, pid: int, state: _ProcState, totals: Dict[str, float]) -> None:
+        base = f"{PROCFS_ROOT}/{pid}"
+        current = dict(state.counters)
+        current.update(_read_key_values(f"{base}/io", {"read_bytes": "read_bytes", "write_bytes": "write_bytes"}))
+        current.update(
+            _read_key_values(
+                f"{base}/status",
+                {
+                    "voluntary_ctxt_switches": "ctx_switches_voluntary",
+                    "nonvoluntary_ctxt_switches": "ctx_switches_involuntary",
+                },
+            )
+        )
+        for name, value in current.items():
+            _add(totals, name, max(value - state.counters.get(name, 0), 0))
+        state.counters = current
+
+        memory = _read_key_values(
+            f"{base}/smaps_rollup",
+            {"Pss": "pss", "Private_Clean": "private_clean", "Private_Dirty": "private_dirty"},
+        )
+        if memory:
+            _add(totals, "pss_mb", memory.get("pss", 0) * 1024)
+            _add(totals, "uss_mb", (memory.get("private_clean", 0) + memory.get("private_dirty", 0)) * 1024)
+        try:
+            _add(totals, "num_fds", len(os.listdir(f"{base}/fd")))
+        except OSError:
+            pass
+
+    def _discover_children(self) -> None:
+        pending = list(self._parents)
+        while pending:
+            pid = pending.pop()
+            for child in read_proc_children(pid):
+                if child not in self._parents:
+                    self._parents[child] = pid
+                    pending.append(child)
+
+    def _rescan(self) -> None:
+        ppids: Dict[int, int] = {}
+        try:
+            entries = os.listdir(PROCFS_ROOT)
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            if pid in self._parents:
+                continue
+            stat = read_proc_stat(pid)
+            if stat is not None:
+                ppids[pid] = stat.ppid
+
+        added = True
+        while added:
+            added = False
+            for pid, ppid in list(ppids.items()):
+                if ppid in self._parents:
+                    self._parents[pid] = ppid
+                    del ppids[pid]
+                    added = True
+
+    def _forget(self, pid: int) -> None:
+        self._states.pop(pid, None)
+        if pid != self.root_pid:
+            self._parents.pop(pid, None)
+
+
+class CgroupCollector:
+    """Exact CPU, memory and I/O of the run's cgroup layered over a process-tree collector.
+
+    CPU comes from the group's ``cpu.stat``, so processes that lived between two
+    ticks are charged too; RSS, the top-process breakdown and per-process
+    extended metrics still come from the wrapped collector.
+    """
+
+    def __init__(self, scope, inner):
+        self.scope = scope
+        self.inner = inner
+        self._last_usage = scope.usage_usec()
+        self._last_io = scope.io_bytes()
+        self._last_tick = time.monotonic()
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        sample = self.inner.sample()
+        now = time.monotonic()
+        usage = self.scope.usage_usec()
+        io = self.scope.io_bytes()
+        memory = self.scope.memory_current()
+        elapsed = max(now - self._last_tick, 1e-6)
+        cpu_percent = (usage - self._last_usage) / 1e6 / elapsed * 100.0
+        previous_io = self._last_io
+        self._last_usage, self._last_io, self._last_tick = usage, io, now
+        if sample is None:
+            return None
+
+        sample["cpu_percent"] = round(max(cpu_percent, 0.0), 2)
+        if memory is not None:
+            sample["memory_current_mb"] = round(memory / (1024 * 1024), 2)
+        if io is not None and previous_io is not None:
+            sample["read_bytes"] = max(io[0] - previous_io[0], 0)
+            sample["write_bytes"] = max(io[1] - previous_io[1], 0)
+        return sample
+
+
+class ProcStat:
+    __slots__ = ("comm", "ppid", "jiffies", "child_jiffies", "num_threads", "starttime", "rss_pages")
+
+    def __init__(self, comm: str, fields: List[bytes]):
+        # fields start at "state" (field 3 in proc(5))
+        self.comm = comm
+        self.ppid = int(fields[1])
+        self.jiffies = int(fields[11]) + int(fields[12])
+        self.child_jiffies = int(fields[13]) + int(fields[14])
+        self.num_threads = int(fields[17])
+        self.starttime = int(fields[19])
+        self.rss_pages = int(fields[21])
+
+
+def read_proc_stat(pid: int) -> Optional[ProcStat]:
+    try:
+        with open(f"{PROCFS_ROOT}/{pid}/stat", "rb") as handle:
+            data = handle.read()
+    except OSError:
+        return None
+    # comm may contain spaces or parentheses; it ends at the last ')'
+    start = data.find(b"(")
+    end = data.rfind(b")")
+    if start < 0 or end < 0:
+        return None
+    try:
+        return ProcStat(data[start + 1:end].decode("utf-8", "replace"), data[end + 2:].split())
+    except (IndexError, ValueError):
+        return None
+
+
+def read_proc_children(pid: int) -> List[int]:
+    try:
+        with open(f"{PROCFS_ROOT}/{pid}/task/{pid}/children", "rb") as handle:
+            return [int(child) for child in handle.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def procfs_available() -> bool:
+    return sys.platform.startswith("linux") and os.path.exists(f"{PROCFS_ROOT}/self/stat")
+
+
+def create_collector(pid: int, kind: str = "auto", top_n: int = 0, extended: bool = False, scope=None):
+    if scope is not None:
+        return CgroupCollector(scope, create_collector(pid, "auto", top_n=top_n, extended=extended))
+    if kind == "procfs" or (kind == "auto" and procfs_available()):
+        try:
+            return ProcfsCollector(pid, top_n=top_n, extended=extended)
+        except (OSError, psutil.NoSuchProcess):
+            if kind == "procfs":
+                raise
+    return PsutilCollector(pid, top_n=top_n, extended=extended)
+
+
+def finalize_extended(totals: Dict[str, float]) -> Dict[str, float]:
+    """Convert summed extended metrics to their wire form (bytes -> MB for USS/PSS)."""
+    result: Dict[str, float] = {}
+    for name, value in totals.items():
+        if name in ("uss_mb", "pss_mb"):
+            result[name] = round(value / (1024 * 1024), 2)
+        else:
+            result[name] = int(value)
+    return result
+
+
+def top_processes(entries: List[tuple], top_n: int) -> List[tuple]:
+    """Union of the top-N entries by CPU (index 2) and by RSS (index 3), busiest first."""
+    by_cpu = sorted(entries, key=lambda entry: entry[2], reverse=True)[:top_n]
+    by_rss = sorted(entries, key=lambda entry: entry[3], reverse=True)[:top_n]
+    chosen = {entry[1]: entry for entry in by_cpu + by_rss}
+    return sorted(chosen.values(), key=lambda entry: entry[2], reverse=True)
+
+
+def describe_process(pid: int, name: str, digest: str, cpu_percent: float, rss_bytes: int) -> Dict[str, object]:
+    return {
+        "pid": pid,
+        "name": name,
+        "cmdline_hash": digest,
+        "cpu_percent": round(max(cpu_percent, 0.0), 2),
+        "rss_mb": round(rss_bytes / (1024 * 1024), 2),
+    }
+
+
+def cmdline_hash(cmdline: Sequence[str]) -> str:
+    return hashlib.blake2b("\0".join(cmdline).encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+
+def collect_sample(
+    proc: psutil.Process,
+    primed: Set[int],
+    breakdown: Optional[List[Tuple[psutil.Process, float, int]]] = None,
+) -> Optional[Dict[str, float]]:
+    processes = [proc]
+    try:
+        processes.extend(proc.children(recursive=True))
+    except (psutil.Error, Exception):
+        pass
+
+    total_cpu = 0.0
+    total_rss = 0
+    measured = False
+    timestamp = time.time()
+
+    for p in processes:
+        if p.pid not in primed:
+            prime_process(p, primed)
+            continue
+        try:
+            cpu = p.cpu_percent(interval=None)
+            mem = p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+        total_cpu += cpu
+        total_rss += mem
+        measured = True
+        if breakdown is not None:
+            breakdown.append((p, cpu, mem))
+
+    if not measured:
+        return None
+
+    rss_mb = round(total_rss / (1024 * 1024), 2)
+    return {"ts": timestamp, "cpu_percent": round(total_cpu, 2), "rss_mb": rss_mb}
+
+
+def prime_process(proc: psutil.Process, primed: Set[int]) -> None:
+    try:
+        proc.cpu_percent(interval=None)
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return
+    primed.add(proc.pid)
+
+
+def _add(totals: Dict[str, float], name: str, value: Optional[float]) -> None:
+    if value is not None:
+        totals[name] = totals.get(name, 0) + value
+
+
+def _read_key_values(path: str, wanted: Dict[str, str]) -> Dict[str, int]:
+    """Parse ``Key: value [kB]`` lines of a /proc file, keeping the ``wanted`` keys."""
+    values: Dict[str, int] = {}
+    try:
+        with open(path, "rb") as handle:
+            for line in handle:
+                key, _, rest = line.partition(b":")
+                name = wanted.get(key.decode("ascii", "replace"))
+                if name is not None:
+                    values[name] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        return {}
+    return values
+
+
+def _boot_clock() -> float:
+    # CLOCK_BOOTTIME shares its origin with the starttime field of /proc/<pid>/stat
+    return time.clock_gettime(time.CLOCK_BOOTTIME)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+MARKER_SOCKET_ENV = "BIZIM_MARKER_SOCKET"
+MAX_MARKER_BYTES = 1024
+MARKER_KINDS = ("begin", "end")
+
+
+class MarkerListener(threading.Thread):
+    """Receives ``begin <phase>`` / ``end <phase>`` datagrams from the monitored command.
+
+    The socket path is handed to the child in ``BIZIM_MARKER_SOCKET``; anything
+    that can write to a Unix datagram socket (``bizim-performans-araci mark``,
+    ``socat``, a test framework hook) can annotate the run. Each datagram may
+    carry an epoch timestamp as a third field; otherwise the receive time is used.
+    """
+
+    def __init__(self):
+        super().__init__(name="marker-listener", daemon=True)
+        self._directory = tempfile.mkdtemp(prefix="bpa-markers-")
+        self.path = os.path.join(self._directory, "markers.sock")
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        self._socket.settimeout(0.2)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._open: Dict[str, List[float]] = {}
+        self._phases: List[Dict[str, object]] = []
+
+    def environment(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env[MARKER_SOCKET_ENV] = self.path
+        return env
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                data = self._socket.recv(MAX_MARKER_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._handle(data.decode("utf-8", "replace"), time.time())
+
+    def close(self) -> List[Dict[str, object]]:
+        """Stop listening and return the phases in start order; open phases end now."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self._socket.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+        now = time.time()
+        with self._lock:
+            for name, starts in self._open.items():
+                self._phases.extend({"name": name, "started_at": start, "ended_at": now} for start in starts)
+            self._open.clear()
+            return sorted(self._phases, key=lambda phase: phase["started_at"])
+
+    def _handle(self, message: str, received_at: float) -> None:
+        parsed = parse_marker(message)
+        if parsed is None:
+            return
+        kind, name, ts = parsed
+        ts = received_at if ts is None else ts
+        with self._lock:
+            if kind == "begin":
+                self._open.setdefault(name, []).append(ts)
+                return
+            starts = self._open.get(name)
+            if not starts:
+                return  # an end without a begin carries no interval
+            self._phases.append({"name": name, "started_at": starts.pop(), "ended_at": ts})
+            if not starts:
+                del self._open[name]
+
+
+def parse_marker(message: str) -> Optional[tuple]:
+    parts = message.strip().split(None, 2)
+    if len(parts) < 2 or parts[0] not in MARKER_KINDS:
+        return None
+    kind, name = parts[0], parts[1]
+    ts = None
+    if len(parts) == 3:
+        try:
+            ts = float(parts[2])
+        except ValueError:
+            return None
+    return kind, name, ts
+
+
+def send_marker(kind: str, name: str, path: Optional[str] = None) -> bool:
+    """Send one marker to the CLI that is monitoring us; returns False when not monitored."""
+    path = path or os.getenv(MARKER_SOCKET_ENV)
+    if not path:
+        return False
+    message = f"{kind} {name} {time.time():.6f}".encode("utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+        try:
+            client.sendto(message, path)
+        except OSError:
+            return False
+    return True
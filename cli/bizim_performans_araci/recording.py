@@ -0,0 +1,120 @@
+import json
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# .bpa layout (little-endian):
+#   b"BPA1" | u32 header length | JSON header
+#   then blocks, each: 1-byte tag | u32 payload length | payload
+#     b"S": u32 row count, then one fixed-width array per header column
+#           (missing values are NaN)
+#     b"P": JSON list of [ts, processes] for the top-process breakdown
+#     b"M": JSON list of phase markers ({name, started_at, ended_at})
+#     b"F": JSON footer with exit code, end time and cgroup totals, written last
+# Blocks are length-prefixed so a recording cut short by a crash still reads
+# up to its last complete block; it imports as a failed run without an exit code.
+BPA_MAGIC = b"BPA1"
+BPA_VERSION = 1
+BPA_CONTENT_TYPE = "application/vnd.bizim-performans-araci.bpa"
+BLOCK_SAMPLES = 1024
+BLOCK_HEADER = struct.Struct("<cI")
+COUNT = struct.Struct("<I")
+# (name, array typecode): 'd' = float64, 'f' = float32
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "d"),
+    ("interval_s", "f"),
+    ("cpu_percent", "f"),
+    ("rss_mb", "f"),
+    ("uss_mb", "f"),
+    ("pss_mb", "f"),
+    ("memory_current_mb", "f"),
+    ("read_bytes", "d"),
+    ("write_bytes", "d"),
+    ("ctx_switches_voluntary", "d"),
+    ("ctx_switches_involuntary", "d"),
+    ("num_threads", "f"),
+    ("num_fds", "f"),
+)
+_DTYPES = {"d": "<f8", "f": "<f4"}
+
+
+class OfflineRecorder:
+    """Writes samples to a ``.bpa`` file instead of sending them to the backend.
+
+    It has the same ``submit`` interface as :class:`SampleUploader`; samples are
+    buffered and written one columnar block at a time.
+    """
+
+    def __init__(self, path: Path, command: str, baseline_run_id: Optional[int] = None, block_size: int = BLOCK_SAMPLES):
+        self.path = path
+        self.block_size = block_size
+        self.count = 0
+        self._rows: List[Dict[str, object]] = []
+        self._processes: List[Tuple[float, List[Dict[str, object]]]] = []
+        self._file = open(path, "wb")
+        header = {
+            "version": BPA_VERSION,
+            "command": command,
+            "baseline_run_id": baseline_run_id,
+            "started_at": time.time(),
+            "columns": [[name, _DTYPES[code]] for name, code in COLUMNS],
+        }
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        self._file.write(BPA_MAGIC + COUNT.pack(len(encoded)) + encoded)
+
+    def submit(self, sample: Dict[str, object]) -> None:
+        processes = sample.get("processes")
+        if processes:
+            self._processes.append((sample["ts"], processes))
+        self._rows.append(sample)
+        if len(self._rows) >= self.block_size:
+            self._write_block()
+
+    def finish(
+        self,
+        exit_code: int,
+        phases: Optional[List[Dict[str, object]]] = None,
+        totals: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self._write_block()
+        if phases:
+            self._write(b"M", json.dumps(phases, separators=(",", ":")).encode("utf-8"))
+        footer = {"exit_code": exit_code, "ended_at": time.time(), "samples": self.count}
+        if totals:
+            footer["totals"] = totals
+        self._write(b"F", json.dumps(footer, separators=(",", ":")).encode("utf-8"))
+        self._file.close()
+
+    def _write_block(self) -> None:
+        if self._rows:
+            parts = [COUNT.pack(len(self._rows))]
+            for name, code in COLUMNS:
+                values = array(code, (_number(row.get(name)) for row in self._rows))
+                if sys.byteorder != "little":
+                    values.byteswap()
+                parts.append(values.tobytes())
+            self._write(b"S", b"".join(parts))
+            self.count += len(self._rows)
+            self._rows.clear()
+        if self._processes:
+            self._write(b"P", json.dumps(self._processes, separators=(",", ":")).encode("utf-8"))
+            self._processes.clear()
+        self._file.flush()
+
+    def _write(self, tag: bytes, payload: bytes) -> None:
+        self._file.write(BLOCK_HEADER.pack(tag, len(payload)) + payload)
+
+
+def read_header(path: Path) -> Dict[str, object]:
+    with open(path, "rb") as reader:
+        if reader.read(len(BPA_MAGIC)) != BPA_MAGIC:
+            raise ValueError(f"{path} bir .bpa kaydı değil")
+        (length,) = COUNT.unpack(reader.read(COUNT.size))
+        return json.loads(reader.read(length))
+
+
+def _number(value: object) -> float:
+    return float("nan") if value is None else float(value)
@@ -0,0 +1,111 @@
+import time
+from typing import Dict, NamedTuple, Optional
+
+from .collectors import EXTENDED_COUNTERS
+
+ADAPTIVE_BACKOFF = 2.0
+ADAPTIVE_MAX_MERGE_SECONDS = 30.0
+DEFAULT_MAX_INTERVAL_SECONDS = 5.0
+DEFAULT_TOLERANCE = 0.05
+# absolute floors so near-zero readings do not count as changes
+CPU_TOLERANCE_FLOOR = 1.0
+RSS_TOLERANCE_FLOOR_MB = 1.0
+AVERAGED_FIELDS = ("cpu_percent", "rss_mb", "uss_mb", "pss_mb")
+
+
+class AdaptiveSettings(NamedTuple):
+    max_interval: float = DEFAULT_MAX_INTERVAL_SECONDS
+    tolerance: float = DEFAULT_TOLERANCE
+
+
+class Sampler:
+    """Drives one collector on a drift-free monotonic schedule.
+
+    Every sample carries ``interval_s``, the time it covers. In adaptive mode
+    the interval starts at ``interval`` and doubles (up to ``max_interval``)
+    while CPU and RSS stay within ``tolerance`` of the held sample; such
+    samples are merged into the held one instead of being sent, and any
+    change sends the held sample and drops back to the fast interval.
+    """
+
+    def __init__(self, collector, sink, interval: float, adaptive: Optional[AdaptiveSettings] = None):
+        self.collector = collector
+        self.sink = sink
+        self.min_interval = interval
+        self.adaptive = adaptive
+        self.interval = interval
+        now = time.monotonic()
+        self.next_due = now + interval
+        self._last_tick = now
+        self._held: Optional[Dict[str, float]] = None
+
+    def wait(self) -> None:
+        delay = self.next_due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def tick(self) -> None:
+        now = time.monotonic()
+        sample = self.collector.sample()
+        elapsed, self._last_tick = now - self._last_tick, now
+        changed = True
+        if sample:
+            sample["interval_s"] = round(elapsed, 4)
+            changed = self._accept(sample)
+
+        if self.adaptive is not None:
+            self.interval = self.min_interval if changed else min(self.interval * ADAPTIVE_BACKOFF, self.adaptive.max_interval)
+        # ticks missed by an overrun are skipped rather than bunched up
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = now + self.interval
+
+    def flush(self) -> None:
+        if self._held is not None:
+            self.sink.submit(self._held)
+            self._held = None
+
+    def _accept(self, sample: Dict[str, float]) -> bool:
+        if self.adaptive is None:
+            self.sink.submit(sample)
+            return True
+
+        held = self._held
+        if held is not None and held["interval_s"] < ADAPTIVE_MAX_MERGE_SECONDS and self._within_tolerance(held, sample):
+            merge_samples(held, sample)
+            return False
+        self.flush()
+        self._held = sample
+        return held is None or not self._within_tolerance(held, sample)
+
+    def _within_tolerance(self, held: Dict[str, float], sample: Dict[str, float]) -> bool:
+        tolerance = self.adaptive.tolerance
+        return _close(held["cpu_percent"], sample["cpu_percent"], tolerance, CPU_TOLERANCE_FLOOR) and _close(
+            held["rss_mb"], sample["rss_mb"], tolerance, RSS_TOLERANCE_FLOOR_MB
+        )
+
+
+def merge_samples(held: Dict[str, float], sample: Dict[str, float]) -> None:
+    """Fold ``sample`` into ``held``: gauges are duration-weighted, counters summed.
+
+    The merged sample takes the later ``ts``, so it still covers
+    ``(ts - interval_s, ts]`` like any other sample.
+    """
+    held_weight = held["interval_s"]
+    weight = sample["interval_s"]
+    total = held_weight + weight
+    for field in AVERAGED_FIELDS:
+        if field in held and field in sample and total > 0:
+            held[field] = round((held[field] * held_weight + sample[field] * weight) / total, 2)
+    for field in EXTENDED_COUNTERS:
+        if field in sample:
+            held[field] = held.get(field, 0) + sample[field]
+    for field in ("num_threads", "num_fds"):
+        if field in sample:
+            held[field] = max(held.get(field, 0), sample[field])
+    held["ts"] = sample["ts"]
+    held["interval_s"] = round(total, 4)
+
+
+def _close(reference: float, value: float, tolerance: float, floor: float) -> bool:
+    return abs(value - reference) <= max(tolerance * max(abs(reference), abs(value)), floor)
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: spools are not locked against concurrent replay
+    fcntl = None
+
+DEFAULT_SPOOL_DIR = Path.home() / ".bizim-performans-araci" / "spool"
+SPOOL_SUFFIX = ".jsonl"
+ACK_SUFFIX = ".ack"
+FINISH_SUFFIX = ".finish"
+
+
+def spool_directory(directory: Optional[str] = None) -> Path:
+    return Path(directory or os.getenv("BIZIM_SPOOL_DIR") or DEFAULT_SPOOL_DIR)
+
+
+class SpoolLocked(Exception):
+    """Raised when another CLI process still owns the spool."""
+
+
+class SampleSpool:
+    """Append-only JSON-lines file holding every sample of one run.
+
+    Samples are appended before they are queued for upload; the byte offset the
+    backend has acknowledged is kept in a sidecar ``.ack`` file, so anything
+    after it can be replayed later. The files are removed only once everything
+    is acknowledged and the run is finished.
+    """
+
+    def __init__(self, directory: Path, run_id: int):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id
+        self.path = directory / f"run-{run_id}{SPOOL_SUFFIX}"
+        self._ack_path = self.path.with_suffix(ACK_SUFFIX)
+        self._finish_path = self.path.with_suffix(FINISH_SUFFIX)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as exc:
+                self._file.close()
+                raise SpoolLocked(str(self.path)) from exc
+        self._size = self._file.seek(0, os.SEEK_END)
+        self._acked = self._read_ack()
+
+    @property
+    def acked(self) -> int:
+        return self._acked
+
+    def append(self, sample: Dict[str, float]) -> Tuple[int, int]:
+        """Append one sample and return its ``(start, end)`` byte offsets."""
+        line = (json.dumps(sample, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            start = self._size
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            return start, self._size
+
+    def ack(self, offset: int) -> None:
+        with self._lock:
+            if offset <= self._acked:
+                return
+            self._acked = offset
+        _write_atomic(self._ack_path, str(offset))
+
+    def read_pending(self, start: Optional[int] = None, limit: Optional[int] = None) -> List[Tuple[Dict[str, float], int]]:
+        """Return ``(sample, end_offset)`` pairs after ``start`` (default: the ack offset)."""
+        with self._lock:
+            end = self._size
+        offset = self._acked if start is None else start
+        entries: List[Tuple[Dict[str, float], int]] = []
+        with open(self.path, "rb") as reader:
+            reader.seek(offset)
+            while offset < end and (limit is None or len(entries) < limit):
+                line = reader.readline()
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crashed run
+                offset += len(line)
+                entries.append((json.loads(line), offset))
+        return entries
+
+    def is_drained(self) -> bool:
+        with self._lock:
+            return self._acked >= self._size
+
+    def record_finish(
+        self,
+        exit_code: int,
+        phases: Optional[List[Dict[str, object]]] = None,
+        totals: Optional[Dict[str, float]] = None,
+    ) -> None:
+        record = {"exit_code": exit_code, "phases": phases or [], "totals": totals}
+        _write_atomic(self._finish_path, json.dumps(record))
+
+    def finish_record(self) -> Optional[Dict[str, object]]:
+        """Return ``{"exit_code", "phases", "totals"}`` if the run ended before it could be finished."""
+        try:
+            record = json.loads(self._finish_path.read_text())
+            return {
+                "exit_code": int(record["exit_code"]),
+                "phases": record.get("phases") or [],
+                "totals": record.get("totals"),
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def remove(self) -> None:
+        self.close()
+        for path in (self.path, self._ack_path, self._finish_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _read_ack(self) -> int:
+        try:
+            return min(int(self._ack_path.read_text().strip() or 0), self._size)
+        except (OSError, ValueError):
+            return 0
+
+
+def list_spooled_runs(directory: Path) -> List[int]:
+    if not directory.is_dir():
+        return []
+    run_ids = []
+    for path in directory.glob(f"run-*{SPOOL_SUFFIX}"):
+        try:
+            run_ids.append(int(path.stem.split("-", 1)[1]))
+        except ValueError:
+            continue
+    return sorted(run_ids)
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
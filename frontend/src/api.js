@@ -5,8 +5,10 @@ export const api = axios.create({
   timeout: 8000,
 });
 
-export async function fetchRuns() {
-  const response = await api.get("/runs");
+// one page of runs, newest first: { items, next_cursor }; pass next_cursor
+// back as params.cursor for the next page
+export async function fetchRuns(params = {}) {
+  const response = await api.get("/runs", { params });
   return response.data;
 }
 
@@ -15,11 +17,32 @@ export async function fetchRun(runId) {
   return response.data;
 }
 
+// charts get at most this many samples per run, however long the run was
+export const CHART_MAX_POINTS = 1000;
+
 export async function fetchSamples(runId, params = {}) {
   const response = await api.get(`/runs/${runId}/samples`, { params });
   return response.data;
 }
 
+// Server-Sent Events of a running run: onSamples gets each committed batch as
+// sample objects, onFinished the final status. Returns a function that closes the stream.
+export function subscribeToRun(runId, { onSamples, onFinished }) {
+  const source = new EventSource(`${api.defaults.baseURL}/runs/${runId}/live`);
+  source.addEventListener("samples", (event) => {
+    const columns = JSON.parse(event.data);
+    const names = Object.keys(columns);
+    onSamples(
+      columns.ts.map((_, index) => Object.fromEntries(names.map((name) => [name, columns[name][index]])))
+    );
+  });
+  source.addEventListener("finished", (event) => {
+    source.close();
+    onFinished(JSON.parse(event.data));
+  });
+  return () => source.close();
+}
+
 export async function fetchComparison(currentId, baseline = "latest-success") {
   const response = await api.get("/compare", { params: { current: currentId, baseline } });
   return response.data;
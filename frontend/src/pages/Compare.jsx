@@ -9,7 +9,7 @@ import {
   Tooltip,
 } from "chart.js";
 import { Line } from "react-chartjs-2";
-import { fetchComparison, fetchRun, fetchRuns, fetchSamples } from "../api.js";
+import { CHART_MAX_POINTS, fetchComparison, fetchRun, fetchRuns, fetchSamples } from "../api.js";
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Legend, Tooltip);
 
@@ -35,12 +35,13 @@ export default function Compare() {
   const [currentSamples, setCurrentSamples] = useState([]);
   const [baselineSamples, setBaselineSamples] = useState([]);
   const [messages, setMessages] = useState([]);
+  const [phases, setPhases] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     let mounted = true;
     async function loadRuns() {
-      const latestRuns = await fetchRuns();
+      const { items: latestRuns } = await fetchRuns();
       if (!mounted) return;
       setRuns(latestRuns);
       if (latestRuns.length > 0) {
@@ -68,8 +69,8 @@ export default function Compare() {
         const [currentDetail, baselineDetail, currentSample, baselineSample] = await Promise.all([
           fetchRun(currentId),
           fetchRun(baselineId),
-          fetchSamples(currentId, { downsample: true, step: 2 }),
-          fetchSamples(baselineId, { downsample: true, step: 2 }),
+          fetchSamples(currentId, { max_points: CHART_MAX_POINTS }),
+          fetchSamples(baselineId, { max_points: CHART_MAX_POINTS }),
         ]);
         if (!cancelled) {
           setCurrentRun(currentDetail);
@@ -97,11 +98,13 @@ export default function Compare() {
         const comparison = await fetchComparison(currentId, baselineId);
         if (!cancelled) {
           setMessages(comparison.messages || []);
+          setPhases(comparison.phases || []);
         }
       } catch (err) {
         console.warn("Karşılaştırma API hatası", err);
         if (!cancelled) {
           setMessages([]);
+          setPhases([]);
         }
       }
     }
@@ -174,6 +177,13 @@ export default function Compare() {
           )}
         </div>
       </div>
+
+      {phases.length > 0 && (
+        <div style={panelStyle}>
+          <h3 style={{ marginTop: 0 }}>Aşama Karşılaştırması</h3>
+          <PhaseTable phases={phases} />
+        </div>
+      )}
     </div>
   );
 }
@@ -232,6 +242,44 @@ function MetricSummary({ current, baseline }) {
   );
 }
 
+function PhaseTable({ phases }) {
+  const columns = [
+    { key: "duration_s", label: "Süre (s)" },
+    { key: "avg_cpu", label: "Ort. CPU (%)" },
+    { key: "p95_rss_mb", label: "P95 RAM (MB)" },
+  ];
+  return (
+    <table>
+      <thead>
+        <tr>
+          <th>Aşama</th>
+          {columns.map((column) => (
+            <th key={column.key}>{column.label}</th>
+          ))}
+        </tr>
+      </thead>
+      <tbody>
+        {phases.map((phase) => (
+          <tr key={`${phase.name}-${phase.occurrence}`}>
+            <td>
+              {phase.name}
+              {phase.occurrence > 0 ? ` (${phase.occurrence + 1}.)` : ""}
+            </td>
+            {columns.map((column) => {
+              const metric = phase.metrics.find((item) => item.metric === column.key);
+              return (
+                <td key={column.key}>
+                  {formatNumber(metric?.baseline)} → {formatNumber(metric?.current)} ({formatRelative(metric?.relative_pct)})
+                </td>
+              );
+            })}
+          </tr>
+        ))}
+      </tbody>
+    </table>
+  );
+}
+
 function buildComparisonChart(currentSamples, baselineSamples, key, label, baselineColor = "#10b981") {
   const maxLength = Math.max(currentSamples.length, baselineSamples.length);
   const labels = Array.from({ length: maxLength }, (_, index) => index.toString());
@@ -309,6 +357,14 @@ function formatDelta(cur, base) {
   return `${sign}${delta.toFixed(1)}`;
 }
 
+function formatRelative(value) {
+  if (value === undefined || value === null) {
+    return "-";
+  }
+  const sign = value > 0 ? "+" : "";
+  return `${sign}${Number(value).toFixed(0)}%`;
+}
+
 function formatMessage(message) {
   if (!message) {
     return "";
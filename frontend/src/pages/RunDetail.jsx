@@ -10,7 +10,7 @@ import {
   Tooltip,
 } from "chart.js";
 import { Line } from "react-chartjs-2";
-import { fetchComparison, fetchRun, fetchSamples } from "../api.js";
+import { CHART_MAX_POINTS, fetchComparison, fetchRun, fetchSamples, subscribeToRun } from "../api.js";
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Legend, Tooltip);
 
@@ -26,6 +26,9 @@ const cardGridStyle = {
   gap: "1rem",
 };
 
+// live charts keep this many of the newest samples
+const LIVE_MAX_POINTS = 2000;
+
 const cardStyle = {
   backgroundColor: "#fff",
   padding: "1rem 1.25rem",
@@ -39,12 +42,13 @@ export default function RunDetail() {
   const [samples, setSamples] = useState([]);
   const [messages, setMessages] = useState([]);
   const [error, setError] = useState(null);
+  const [reloadKey, setReloadKey] = useState(0);
 
   useEffect(() => {
     let mounted = true;
     async function load() {
       try {
-        const [runDetail, sampleResponse] = await Promise.all([fetchRun(id), fetchSamples(id)]);
+        const [runDetail, sampleResponse] = await Promise.all([fetchRun(id), fetchSamples(id, { max_points: CHART_MAX_POINTS })]);
         if (mounted) {
           setRun(runDetail);
           setSamples(sampleResponse.samples);
@@ -60,7 +64,19 @@ export default function RunDetail() {
     return () => {
       mounted = false;
     };
-  }, [id]);
+  }, [id, reloadKey]);
+
+  const isRunning = run?.status === "running";
+  useEffect(() => {
+    if (!isRunning) {
+      return undefined;
+    }
+    return subscribeToRun(id, {
+      onSamples: (incoming) => setSamples((previous) => [...previous, ...incoming].slice(-LIVE_MAX_POINTS)),
+      // stats are computed at finish; load the final run
+      onFinished: () => setReloadKey((key) => key + 1),
+    });
+  }, [id, isRunning]);
 
   useEffect(() => {
     let mounted = true;
@@ -101,15 +117,24 @@ export default function RunDetail() {
       <div>
         <h2 style={{ marginBottom: "0.5rem" }}>Koşu #{run.id}</h2>
         <div style={{ color: "#52606d" }}>{run.command}</div>
+        {stats.approximate && (
+          <div style={{ color: "#9a6700", marginTop: "0.25rem" }}>Koşu devam ediyor; istatistikler yaklaşık değerlerdir.</div>
+        )}
       </div>
       <div style={cardGridStyle}>
         <StatCard label="Süre (s)" value={formatNumber(stats.duration_s)} />
         <StatCard label="Ort. CPU (%)" value={formatNumber(stats.avg_cpu)} />
         <StatCard label="P95 CPU (%)" value={formatNumber(stats.p95_cpu)} />
+        <StatCard label="P99 CPU (%)" value={formatNumber(stats.p99_cpu)} />
         <StatCard label="Max CPU (%)" value={formatNumber(stats.max_cpu)} />
         <StatCard label="Ort. RAM (MB)" value={formatNumber(stats.avg_rss_mb)} />
         <StatCard label="P95 RAM (MB)" value={formatNumber(stats.p95_rss_mb)} />
+        <StatCard label="P99 RAM (MB)" value={formatNumber(stats.p99_rss_mb)} />
         <StatCard label="Max RAM (MB)" value={formatNumber(stats.max_rss_mb)} />
+        <StatCard label="Ort. PSS (MB)" value={formatNumber(stats.avg_pss_mb)} />
+        <StatCard label="Disk Okuma (MB)" value={formatNumber(toMegabytes(stats.total_read_bytes))} />
+        <StatCard label="Disk Yazma (MB)" value={formatNumber(toMegabytes(stats.total_write_bytes))} />
+        <StatCard label="Max Thread" value={stats.max_threads ?? "-"} />
       </div>
       <div style={{ display: "grid", gap: "1.5rem", gridTemplateColumns: "2fr 1fr" }}>
         <div style={{ display: "grid", gap: "1.5rem" }}>
@@ -211,6 +236,13 @@ function formatNumber(value) {
   return value.toFixed(1);
 }
 
+function toMegabytes(bytes) {
+  if (bytes === undefined || bytes === null) {
+    return null;
+  }
+  return bytes / (1024 * 1024);
+}
+
 function formatMessage(message) {
   if (!message) {
     return "";
@@ -9,22 +9,37 @@ const tableWrapperStyle = {
   padding: "1.5rem",
 };
 
+const filterBarStyle = {
+  display: "flex",
+  gap: "0.75rem",
+  flexWrap: "wrap",
+  marginBottom: "1rem",
+};
+
 export default function RunList() {
   const [runs, setRuns] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [filters, setFilters] = useState({ status: "", command: "" });
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
 
   useEffect(() => {
     let mounted = true;
     async function load() {
+      setLoading(true);
       try {
-        const data = await fetchRuns();
+        const data = await fetchRuns(filterParams(filters));
         if (mounted) {
-          setRuns(data);
+          setRuns(data.items);
+          setNextCursor(data.next_cursor);
+          setError(null);
         }
       } catch (err) {
-        setError("Koşular yüklenemedi.");
+        if (mounted) {
+          setError("Koşular yüklenemedi.");
+        }
         console.error(err);
       } finally {
         if (mounted) {
@@ -36,10 +51,26 @@ export default function RunList() {
     return () => {
       mounted = false;
     };
-  }, []);
+  }, [filters]);
 
-  if (loading) {
-    return <div>Yükleniyor...</div>;
+  async function loadMore() {
+    setLoadingMore(true);
+    try {
+      const data = await fetchRuns({ ...filterParams(filters), cursor: nextCursor });
+      setRuns((current) => [...current, ...data.items]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError("Koşular yüklenemedi.");
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
+  function applyFilters(event) {
+    event.preventDefault();
+    const form = new FormData(event.currentTarget);
+    setFilters({ status: form.get("status"), command: form.get("command").trim() });
   }
 
   if (error) {
@@ -49,6 +80,17 @@ export default function RunList() {
   return (
     <div style={tableWrapperStyle}>
       <h2 style={{ marginTop: 0 }}>Son Koşular</h2>
+      <form style={filterBarStyle} onSubmit={applyFilters}>
+        <select name="status" defaultValue={filters.status}>
+          <option value="">Tüm durumlar</option>
+          <option value="completed">Tamamlandı</option>
+          <option value="failed">Hatalı</option>
+          <option value="running">Çalışıyor</option>
+        </select>
+        <input name="command" placeholder="Komutta ara" defaultValue={filters.command} />
+        <button type="submit">Filtrele</button>
+      </form>
+      {loading && <div>Yükleniyor...</div>}
       <div style={{ overflowX: "auto" }}>
         <table>
           <thead>
@@ -82,7 +124,7 @@ export default function RunList() {
                 <td>{run.stats?.avg_rss_mb ? run.stats.avg_rss_mb.toFixed(1) : "-"}</td>
               </tr>
             ))}
-            {runs.length === 0 && (
+            {!loading && runs.length === 0 && (
               <tr>
                 <td colSpan={8}>Henüz koşu bulunmuyor.</td>
               </tr>
@@ -90,10 +132,26 @@ export default function RunList() {
           </tbody>
         </table>
       </div>
+      {nextCursor && (
+        <button type="button" style={{ marginTop: "1rem" }} disabled={loadingMore} onClick={loadMore}>
+          {loadingMore ? "Yükleniyor..." : "Daha fazla göster"}
+        </button>
+      )}
     </div>
   );
 }
 
+function filterParams(filters) {
+  const params = {};
+  if (filters.status) {
+    params.status = filters.status;
+  }
+  if (filters.command) {
+    params.command = filters.command;
+  }
+  return params;
+}
+
 function formatDate(value) {
   if (!value) {
     return "-";